@@ -1,15 +1,42 @@
 from flask import Flask
 
+from .asgi import AsgiApp
+from .broker import Broker
+from .constants import ENV_POLL_INTERVAL, DEFAULT_POLL_INTERVAL, ENV_BROKER_ADDRESS
 
-def create_app(test_config: dict = None) -> Flask:
-    app = Flask(__name__)
+
+def load_config(app: Flask, test_config: dict = None) -> None:
     if test_config:
         app.config.from_mapping(test_config)
     else:
         app.config.from_pyfile('config.py')
 
+
+def create_app(test_config: dict = None) -> Flask:
+    app = Flask(__name__)
+    load_config(app, test_config)
+
     with app.app_context():
         from . import routes
         app.register_blueprint(routes.bp)
 
+        # With a broker configured polling is done by the broker process
+        polling = app.config.get(ENV_POLL_INTERVAL, DEFAULT_POLL_INTERVAL) > 0 and not app.config.get(ENV_BROKER_ADDRESS)
+        if polling and not routes.poller.is_alive():
+            routes.poller.start()
+
         return app
+
+
+def create_broker(test_config: dict = None) -> Broker:
+    app = Flask(__name__)
+    load_config(app, test_config)
+
+    return Broker(app)
+
+
+def create_asgi_app(test_config: dict = None) -> AsgiApp:
+    app = Flask(__name__)
+    load_config(app, test_config)
+
+    return AsgiApp(app)
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import time
+from typing import List, Dict, Tuple, Optional
+from urllib.parse import parse_qs
+
+import werkzeug.exceptions
+from flask import Flask, abort
+from pymodbus.exceptions import ModbusException
+
+from .constants import ENV_INVERTER_HOST, ENV_INVERTER_PORT, ENV_READ_MAX_GAP, DEFAULT_READ_MAX_GAP, ENV_PIPELINE_WINDOW, DEFAULT_PIPELINE_WINDOW
+from .modbus import AsyncModbusClient
+from .planner import plan_reads, ReadBlock, EquipmentRegister
+from .util import Util, with_age, get_error_message
+
+
+class AsgiApp:
+    """ASGI variant of the REST interface, serving the health endpoints, GET /registers and POST /register-values of the Flask blueprint with
+    asynchronous inverter I/O.
+
+    All requests share one Modbus TCP connection. Concurrent requests for identical read blocks share one in-flight read. With PIPELINE_WINDOW larger
+    than 1, the blocks of all requests are read with up to that many requests outstanding on the connection.
+    """
+    utilities: Util
+    client: AsyncModbusClient
+
+    def __init__(self, app: Flask):
+        # Util is used for configuration, validation and formatting only, inverter access is done by the asynchronous client
+        self.utilities = Util(app, use_broker=False, check_connection=False)
+        self.client = AsyncModbusClient(self.utilities.config[ENV_INVERTER_HOST], int(self.utilities.config[ENV_INVERTER_PORT]),
+                                        window=self.utilities.config.get(ENV_PIPELINE_WINDOW, DEFAULT_PIPELINE_WINDOW))
+        self._connect_lock = asyncio.Lock()
+        self._in_flight: Dict[tuple, asyncio.Future] = {}
+        self._warm_up: Optional[asyncio.Task] = None
+        self._last_read: Optional[float] = None
+
+    async def __call__(self, scope: dict, receive, send) -> None:
+        if scope['type'] == 'lifespan':
+            await self.handle_lifespan(receive, send)
+        elif scope['type'] == 'http':
+            status, body = await self.handle_request(scope, receive)
+            headers = [(b'content-type', b'application/json')] if body is not None else []
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': json.dumps(body).encode('utf-8') if body is not None else b''})
+
+    async def handle_lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Startup does not wait for the inverter, the connection is established in the background or by the first request
+                self._warm_up = asyncio.create_task(self.warm_up())
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.client.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def warm_up(self) -> None:
+        async with self._connect_lock:
+            if not await self.client.connect():
+                self.utilities.logger.warning('Connection to inverter could not be established, retrying on first request')
+
+    async def handle_request(self, scope: dict, receive) -> Tuple[int, Optional[dict]]:
+        method = scope['method']
+        path = scope['path']
+        self.utilities.logger.debug(f'{method} {path} called')
+        try:
+            if path == '/health' and method == 'GET':
+                return 200, self.get_health()
+            if path == '/health/live' and method == 'GET':
+                return 200, {'status': 'alive'}
+            if path == '/health/ready' and method == 'GET':
+                readiness = self.get_readiness()
+                return 200 if readiness['ready'] else 503, readiness
+
+            headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+            if path == '/registers' and method == 'GET':
+                self.utilities.validate_api_key(headers.get('x-api-key'))
+                query = parse_qs(scope['query_string'].decode('latin-1'))
+                return 200, self.get_registers(query.get('equipment', [None])[0])
+            if path == '/register-values' and method == 'POST':
+                self.utilities.validate_api_key(headers.get('x-api-key'))
+                return 200, await self.post_register_values(await self.read_body(receive))
+            if path in ('/health', '/health/live', '/health/ready', '/registers', '/register-values'):
+                abort(405)
+            abort(404)
+        except werkzeug.exceptions.HTTPException as error:
+            self.utilities.logger.debug(f'Handling error {error}')
+            return error.code, {'message': error.description}
+        except ModbusException as error:
+            self.utilities.logger.warning(f'Reading registers from inverter failed: {error}')
+            return 502, {'message': f'Reading registers from inverter failed: {get_error_message(error)}'}
+
+    def get_health(self) -> dict:
+        # Without a circuit breaker the health reflects whether the connection to the inverter is established
+        age = time.monotonic() - self._last_read if self._last_read is not None else None
+        return {'status': 'ok' if self.client.is_connected() else 'unavailable',
+                'inverters': [{'name': self.utilities.inverter.name, 'lastReadAge': round(age, 1) if age is not None else None}]}
+
+    def get_readiness(self) -> dict:
+        if not self.client.is_connected():
+            return {'ready': False, 'reason': 'Inverter not connected'}
+        return {'ready': True}
+
+    @staticmethod
+    async def read_body(receive) -> dict:
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body', False):
+                break
+
+        try:
+            request_json = json.loads(body)
+        except ValueError:
+            abort(400, 'Failed to decode JSON object')
+        if not isinstance(request_json, dict):
+            abort(400, 'Failed to decode JSON object')
+        return request_json
+
+    def get_registers(self, equipment_value: Optional[str]) -> dict:
+        equipment = self.utilities.validate_equipment(equipment_value)
+        return {'equipment': equipment.value, 'registers': list(self.utilities.catalogue.equipments[equipment.value].register_names)}
+
+    async def post_register_values(self, request_json: dict) -> dict:
+        if 'equipment' not in request_json:
+            abort(400, 'No value for equipment')
+        equipment = self.utilities.validate_equipment(request_json['equipment'])
+
+        if 'registers' not in request_json:
+            abort(400, 'No value for registers')
+        registers = self.utilities.validate_registers(equipment, request_json['registers'])
+
+        return {'equipment': equipment.value, 'registers': await self.get_registers_data(registers)}
+
+    async def get_registers_data(self, registers: List[EquipmentRegister]) -> List[dict]:
+        cache_entries = self.utilities.get_cache_entries(registers)
+        registers_data = {register: with_age(entry.data, entry.age()) for register, entry in cache_entries.items()}
+
+        missing_registers = [register for register in registers if register not in registers_data]
+        if len(missing_registers) > 0:
+            registers_data.update((register, with_age(register_data, 0)) for register, register_data in
+                                  zip(missing_registers, await self.read_registers_data(missing_registers)))
+
+        return [registers_data[register] for register in registers]
+
+    async def read_registers_data(self, registers: List[EquipmentRegister]) -> List[dict]:
+        blocks = plan_reads(registers, self.utilities.config.get(ENV_READ_MAX_GAP, DEFAULT_READ_MAX_GAP))
+        payloads = await asyncio.gather(*(self.read_block(block) for block in blocks))
+
+        raw_values = {}
+        for block, payload in zip(blocks, payloads):
+            for register in block.registers:
+                raw_values[register] = block.decode(payload, register)
+
+        registers_data = []
+        for register in registers:
+            register_data = self.utilities.get_register_data(register, raw_values[register])
+            self.utilities.cache.put(register, register_data)
+            registers_data.append(register_data)
+
+        return registers_data
+
+    async def read_block(self, block: ReadBlock) -> bytes:
+        # Concurrent requests share in-flight reads of identical blocks
+        if block.key in self._in_flight:
+            return await asyncio.shield(self._in_flight[block.key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[block.key] = future
+        try:
+            await self.ensure_connected()
+            self.utilities.logger.debug(f'Reading block of {block.quantity} registers starting at address {block.address}')
+            future.set_result(await self.client.read_holding_registers(block.address, block.quantity))
+            self._last_read = time.monotonic()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case no other request joined the read
+            future.exception()
+        finally:
+            del self._in_flight[block.key]
+
+        return future.result()
+
+    async def ensure_connected(self) -> None:
+        async with self._connect_lock:
+            if not await self.client.connect():
+                abort(502, 'Connection to inverter could not be established')
@@ -0,0 +1,77 @@
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Callable, Optional
+
+
+class BreakerState(Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+
+
+class CircuitBreaker:
+    """Circuit breaker guarding the reads of one inverter.
+
+    The breaker opens after threshold consecutive failures, requests are failing fast while it is open. Once open, probe is called every probe_interval
+    seconds in the background, the breaker is closed again as soon as a probe succeeds.
+    """
+    threshold: int
+    probe_interval: float
+    state: BreakerState
+    failures: int
+    last_success: Optional[float]
+
+    def __init__(self, threshold: int, probe_interval: float, probe: Callable[[], bool]):
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.last_success = None
+
+        self.logger = logging.getLogger()
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._closed.set()
+
+    def is_open(self) -> bool:
+        return self.state == BreakerState.OPEN
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.last_success = time.monotonic()
+            if self.state == BreakerState.OPEN:
+                self._close()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == BreakerState.CLOSED and self.threshold > 0 and self.failures >= self.threshold:
+                self.logger.warning(f'Opening circuit breaker after {self.failures} consecutive failures, probing every {self.probe_interval} seconds')
+                self.state = BreakerState.OPEN
+                self._closed.clear()
+                threading.Thread(target=self.run_probes, name='sun2000-breaker-probe', daemon=True).start()
+
+    def _close(self) -> None:
+        self.logger.info('Closing circuit breaker')
+        self.state = BreakerState.CLOSED
+        self._closed.set()
+
+    def run_probes(self) -> None:
+        while not self._closed.wait(self.probe_interval):
+            try:
+                succeeded = self._probe()
+            except Exception as e:
+                self.logger.debug(f'Probing inverter failed: {e}')
+                succeeded = False
+            if succeeded:
+                self.record_success()
+
+    def last_success_age(self) -> Optional[float]:
+        return time.monotonic() - self.last_success if self.last_success is not None else None
+
+    def snapshot(self) -> dict:
+        age = self.last_success_age()
+        return {'breaker': self.state.value, 'failures': self.failures, 'lastReadAge': round(age, 1) if age is not None else None}
@@ -0,0 +1,139 @@
+import logging
+import os
+import socket
+import threading
+from multiprocessing.connection import Listener, Client, Connection, AuthenticationError
+from multiprocessing.reduction import ForkingPickler
+from typing import Any, List
+
+import werkzeug.exceptions
+from flask import Flask, abort
+from sun2000_modbus.registers import InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister
+
+from .constants import ENV_BROKER_ADDRESS, ENV_ACCEPTED_API_KEYS, ENV_POLL_INTERVAL, DEFAULT_POLL_INTERVAL
+
+# Util methods workers may invoke on the broker
+BROKERED_METHODS = ('get_registers_data', 'get_registers_changes', 'get_inverters_registers_data', 'get_instrumentation', 'get_register_history',
+                    'get_health', 'get_readiness', 'get_preset_changes', 'get_presets', 'define_preset')
+
+
+def reduce_register(register):
+    # Registers are pickled by value per default, which does not compare equal after unpickling, so they are transferred by name instead
+    return getattr, (type(register), register.name)
+
+
+for register_type in (InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister):
+    ForkingPickler.register(register_type, reduce_register)
+
+
+def get_authkey(config: dict) -> bytes:
+    # Broker and workers share the configuration, the API keys are used as shared secret for authenticating workers
+    return ','.join(config[ENV_ACCEPTED_API_KEYS]).encode('utf-8')
+
+
+class Broker:
+    """Process owning the single inverter connection and read cache, serving the uWSGI workers over a local socket.
+
+    Requests are tuples of a method name out of BROKERED_METHODS and its arguments, responses are tuples of HTTP status code and either the method's result
+    or an error message.
+    """
+    address: str
+    authkey: bytes
+
+    def __init__(self, app: Flask):
+        from .poller import Poller
+        from .util import Util
+
+        self.address = app.config[ENV_BROKER_ADDRESS]
+        self.authkey = get_authkey(app.config)
+        self.utilities = Util(app, use_broker=False)
+        self.poller = Poller(self.utilities)
+        self.logger = logging.getLogger()
+        self._stopped = threading.Event()
+
+    def serve_forever(self) -> None:
+        if self.utilities.config.get(ENV_POLL_INTERVAL, DEFAULT_POLL_INTERVAL) > 0:
+            self.poller.start()
+
+        if os.path.exists(self.address):
+            os.remove(self.address)
+
+        with Listener(self.address, family='AF_UNIX', authkey=self.authkey) as listener:
+            self.logger.info(f'Inverter broker listening on {self.address}')
+            while not self._stopped.is_set():
+                try:
+                    connection = listener.accept()
+                except (OSError, EOFError, AuthenticationError) as e:
+                    if not self._stopped.is_set():
+                        self.logger.warning(f'Rejected broker client: {e}')
+                    continue
+                threading.Thread(target=self.handle, args=(connection,), daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.poller.stop()
+        # Wake up the listener waiting for the next client
+        with socket.socket(socket.AF_UNIX) as wakeup:
+            wakeup.connect(self.address)
+
+    def handle(self, connection: Connection) -> None:
+        with connection:
+            while True:
+                try:
+                    method, args = connection.recv()
+                except (OSError, EOFError):
+                    return
+                connection.send(self.dispatch(method, args))
+
+    def dispatch(self, method: str, args: tuple) -> tuple:
+        if method not in BROKERED_METHODS:
+            return 400, f'Method {method} is not brokered'
+
+        try:
+            return 200, getattr(self.utilities, method)(*args)
+        except werkzeug.exceptions.HTTPException as e:
+            return e.code, e.description
+        except Exception as e:
+            self.logger.error(f'Brokered call of {method} failed: {e}')
+            return 500, str(e)
+
+
+class BrokerClient:
+    """Worker side connection to the broker, forwarding calls of BROKERED_METHODS.
+
+    Each call takes an idle connection out of a pool or opens a new one, so threads of the worker calling at the same time do not wait for each other.
+    """
+    address: str
+    authkey: bytes
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._idle: List[Connection] = []
+        self._lock = threading.Lock()
+
+    def call(self, method: str, *args) -> Any:
+        with self._lock:
+            connection = self._idle.pop() if len(self._idle) > 0 else None
+        try:
+            if connection is None:
+                connection = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            connection.send((method, args))
+            status, result = connection.recv()
+        except (OSError, EOFError, AuthenticationError):
+            if connection is not None:
+                connection.close()
+            abort(502, 'Inverter broker could not be reached')
+
+        with self._lock:
+            self._idle.append(connection)
+
+        if status != 200:
+            abort(status, result)
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
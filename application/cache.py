@@ -0,0 +1,86 @@
+import secrets
+import threading
+import time
+from typing import Dict, Optional, List, Tuple
+
+from .planner import EquipmentRegister
+
+
+class CacheEntry:
+    data: dict
+    timestamp: float
+    sequence: int
+
+    def __init__(self, data: dict, timestamp: float, sequence: int = 0):
+        self.data = data
+        self.timestamp = timestamp
+        self.sequence = sequence
+
+    def age(self, now: float = None) -> float:
+        return (now if now is not None else time.monotonic()) - self.timestamp
+
+
+class SnapshotCache:
+    """Thread-safe store of the most recently read data per register.
+
+    Each change of the data of a register is numbered by an increasing sequence. The version of a set of registers, made up of a random epoch and the
+    latest sequence among them, tells clients which changes they have seen, the epoch distinguishes caches of other processes or before a restart. Changes
+    of other registers leave the version untouched.
+    """
+    entries: Dict[EquipmentRegister, CacheEntry]
+    epoch: str
+    sequence: int
+
+    def __init__(self):
+        self.entries = {}
+        self.epoch = secrets.token_hex(4)
+        self.sequence = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        return self.format_version(self.sequence)
+
+    def format_version(self, sequence: int) -> str:
+        return f'{self.epoch}-{sequence}'
+
+    def put(self, register: EquipmentRegister, data: dict, timestamp: float = None) -> None:
+        timestamp = timestamp if timestamp is not None else time.monotonic()
+        with self._lock:
+            previous = self.entries.get(register)
+            if previous is None or previous.data != data:
+                self.sequence += 1
+                sequence = self.sequence
+            else:
+                sequence = previous.sequence
+            self.entries[register] = CacheEntry(data, timestamp, sequence)
+
+    def get(self, register: EquipmentRegister, max_age: float) -> Optional[dict]:
+        """Return the cached data of the given register, or None if there is none or it is older than max_age seconds."""
+        entry = self.get_entry(register, max_age)
+        return entry.data if entry is not None else None
+
+    def get_entry(self, register: EquipmentRegister, max_age: float) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self.entries.get(register)
+        if entry is None or entry.age() > max_age:
+            return None
+
+        return entry
+
+    def get_versioned_entries(self, registers: List[EquipmentRegister]) -> Tuple[str, List[Optional[CacheEntry]]]:
+        """Return the version of the given registers along with their entries regardless of their age, None if there is none."""
+        with self._lock:
+            entries = [self.entries.get(register) for register in registers]
+        return self.format_version(max((entry.sequence for entry in entries if entry is not None), default=0)), entries
+
+    def parse_sequence(self, version: str) -> Optional[int]:
+        """Return the sequence of the given version, None if it is invalid or of another epoch."""
+        epoch, _, sequence = version.partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
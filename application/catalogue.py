@@ -0,0 +1,52 @@
+import hashlib
+import json
+from enum import Enum
+from typing import Dict, Tuple, FrozenSet, Type
+
+from sun2000_modbus.datatypes import DataType
+
+from .planner import EquipmentRegister
+
+NUMBER_DATA_TYPES = (DataType.INT16_BE, DataType.UINT16_BE, DataType.INT32_BE, DataType.UINT32_BE)
+
+
+def get_register_template(register: EquipmentRegister) -> dict:
+    """Return the register data not depending on the value read, i.e. name, type, gain and unit."""
+    register_definition = register.value
+    template = {'name': register.name, 'type': 'number' if register_definition.data_type in NUMBER_DATA_TYPES else 'string'}
+    if register_definition.gain is not None:
+        template['gain'] = register_definition.gain
+    if register_definition.unit is not None:
+        template['unit'] = register_definition.unit
+    return template
+
+
+class EquipmentCatalogue:
+    """Immutable lookup tables of the registers of one equipment."""
+    register_names: Tuple[str, ...]
+    registers: Dict[str, EquipmentRegister]
+    registers_body: bytes
+    registers_etag: str
+    templates: Dict[EquipmentRegister, dict]
+
+    def __init__(self, equipment_value: str, register_type: Type[Enum]):
+        self.register_names = tuple(item.name for item in register_type)
+        self.registers = dict(register_type.__members__)
+        self.templates = {register: get_register_template(register) for register in register_type}
+
+        # Pre-serialized response of GET /registers
+        self.registers_body = json.dumps({'equipment': equipment_value, 'registers': list(self.register_names)}, separators=(',', ':')).encode('utf-8')
+        self.registers_etag = hashlib.sha1(self.registers_body).hexdigest()
+
+
+class Catalogue:
+    """Register catalogue of all equipments, built once at startup."""
+    equipment_values: FrozenSet[str]
+    equipments: Dict[str, EquipmentCatalogue]
+    templates: Dict[EquipmentRegister, dict]
+
+    def __init__(self, equipment_registers: Dict[Enum, Type[Enum]]):
+        self.equipments = {equipment.value: EquipmentCatalogue(equipment.value, register_type) for equipment, register_type in equipment_registers.items()}
+        self.equipment_values = frozenset(self.equipments)
+        self.templates = {register: template for equipment_catalogue in self.equipments.values()
+                          for register, template in equipment_catalogue.templates.items()}
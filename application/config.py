@@ -1,6 +1,16 @@
 import os
 
-from application.constants import ENV_INVERTER_HOST, ENV_INVERTER_PORT, ENV_ACCEPTED_API_KEYS, ENV_LOG_LEVEL
+from application.constants import ENV_INVERTER_HOST, ENV_INVERTER_PORT, ENV_ACCEPTED_API_KEYS, ENV_LOG_LEVEL, ENV_READ_MAX_GAP, DEFAULT_READ_MAX_GAP, \
+    ENV_POLL_INTERVAL, DEFAULT_POLL_INTERVAL, ENV_POLL_INVERTER_REGISTERS, ENV_POLL_BATTERY_REGISTERS, ENV_POLL_METER_REGISTERS, \
+    ENV_CACHE_MAX_AGE, DEFAULT_CACHE_MAX_AGE, ENV_INVERTER_KEEP_ALIVE, DEFAULT_INVERTER_KEEP_ALIVE, ENV_RECONNECT_BACKOFF, DEFAULT_RECONNECT_BACKOFF, \
+    ENV_RECONNECT_MAX_BACKOFF, DEFAULT_RECONNECT_MAX_BACKOFF, ENV_BROKER_ADDRESS, ENV_STREAM_INTERVAL, DEFAULT_STREAM_INTERVAL, \
+    ENV_HISTORY_SIZE, DEFAULT_HISTORY_SIZE, ENV_HISTORY_PATH, ENV_CACHE_SLOW_TTL, DEFAULT_CACHE_SLOW_TTL, ENV_CACHE_FAST_TTL, DEFAULT_CACHE_FAST_TTL, \
+    ENV_CACHE_VOLATILITY, ENV_INVERTERS, ENV_TIMING_ENABLED, DEFAULT_TIMING_ENABLED, ENV_TIMING_WINDOW, DEFAULT_TIMING_WINDOW, ENV_PROFILE_SAMPLE_RATE, \
+    DEFAULT_PROFILE_SAMPLE_RATE, ENV_BREAKER_THRESHOLD, DEFAULT_BREAKER_THRESHOLD, ENV_BREAKER_PROBE_INTERVAL, DEFAULT_BREAKER_PROBE_INTERVAL, \
+    ENV_BREAKER_SERVE_STALE, DEFAULT_BREAKER_SERVE_STALE, ENV_PRESETS, ENV_EXPORT_INFLUX_URL, ENV_EXPORT_INFLUX_TOKEN, ENV_EXPORT_MQTT_ADDRESS, \
+    ENV_EXPORT_MQTT_TOPIC, DEFAULT_EXPORT_MQTT_TOPIC, ENV_EXPORT_BATCH_SIZE, DEFAULT_EXPORT_BATCH_SIZE, ENV_EXPORT_QUEUE_SIZE, DEFAULT_EXPORT_QUEUE_SIZE, \
+    ENV_EXPORT_BUFFER_PATH, ENV_EXPORT_BUFFER_SIZE, DEFAULT_EXPORT_BUFFER_SIZE, ENV_PIPELINE_WINDOW, DEFAULT_PIPELINE_WINDOW, \
+    ENV_STREAM_MAX_SUBSCRIPTIONS, DEFAULT_STREAM_MAX_SUBSCRIPTIONS, ENV_EXPORT_MQTT_CLIENT_ID
 
 # INVERTER_HOST
 INVERTER_HOST = '192.168.200.1'
@@ -21,3 +31,162 @@ else:
 
 # LOG_LEVEL
 LOG_LEVEL = os.getenv(ENV_LOG_LEVEL, 'INFO')
+
+# READ_MAX_GAP
+READ_MAX_GAP = DEFAULT_READ_MAX_GAP
+if os.getenv(ENV_READ_MAX_GAP):
+    READ_MAX_GAP = int(os.getenv(ENV_READ_MAX_GAP))
+
+# POLL_INTERVAL
+POLL_INTERVAL = DEFAULT_POLL_INTERVAL
+if os.getenv(ENV_POLL_INTERVAL):
+    POLL_INTERVAL = float(os.getenv(ENV_POLL_INTERVAL))
+
+# POLL_INVERTER_REGISTERS
+POLL_INVERTER_REGISTERS = []
+if os.getenv(ENV_POLL_INVERTER_REGISTERS):
+    POLL_INVERTER_REGISTERS = os.getenv(ENV_POLL_INVERTER_REGISTERS).split(',')
+
+# POLL_BATTERY_REGISTERS
+POLL_BATTERY_REGISTERS = []
+if os.getenv(ENV_POLL_BATTERY_REGISTERS):
+    POLL_BATTERY_REGISTERS = os.getenv(ENV_POLL_BATTERY_REGISTERS).split(',')
+
+# POLL_METER_REGISTERS
+POLL_METER_REGISTERS = []
+if os.getenv(ENV_POLL_METER_REGISTERS):
+    POLL_METER_REGISTERS = os.getenv(ENV_POLL_METER_REGISTERS).split(',')
+
+# CACHE_MAX_AGE
+CACHE_MAX_AGE = DEFAULT_CACHE_MAX_AGE
+if os.getenv(ENV_CACHE_MAX_AGE):
+    CACHE_MAX_AGE = float(os.getenv(ENV_CACHE_MAX_AGE))
+
+# INVERTER_KEEP_ALIVE
+INVERTER_KEEP_ALIVE = DEFAULT_INVERTER_KEEP_ALIVE
+if os.getenv(ENV_INVERTER_KEEP_ALIVE):
+    INVERTER_KEEP_ALIVE = os.getenv(ENV_INVERTER_KEEP_ALIVE).lower() == 'true'
+
+# RECONNECT_BACKOFF
+RECONNECT_BACKOFF = DEFAULT_RECONNECT_BACKOFF
+if os.getenv(ENV_RECONNECT_BACKOFF):
+    RECONNECT_BACKOFF = float(os.getenv(ENV_RECONNECT_BACKOFF))
+
+# RECONNECT_MAX_BACKOFF
+RECONNECT_MAX_BACKOFF = DEFAULT_RECONNECT_MAX_BACKOFF
+if os.getenv(ENV_RECONNECT_MAX_BACKOFF):
+    RECONNECT_MAX_BACKOFF = float(os.getenv(ENV_RECONNECT_MAX_BACKOFF))
+
+# BROKER_ADDRESS
+BROKER_ADDRESS = os.getenv(ENV_BROKER_ADDRESS)
+
+# STREAM_INTERVAL
+STREAM_INTERVAL = DEFAULT_STREAM_INTERVAL
+if os.getenv(ENV_STREAM_INTERVAL):
+    STREAM_INTERVAL = float(os.getenv(ENV_STREAM_INTERVAL))
+
+# STREAM_MAX_SUBSCRIPTIONS
+STREAM_MAX_SUBSCRIPTIONS = DEFAULT_STREAM_MAX_SUBSCRIPTIONS
+if os.getenv(ENV_STREAM_MAX_SUBSCRIPTIONS):
+    STREAM_MAX_SUBSCRIPTIONS = int(os.getenv(ENV_STREAM_MAX_SUBSCRIPTIONS))
+
+# HISTORY_SIZE
+HISTORY_SIZE = DEFAULT_HISTORY_SIZE
+if os.getenv(ENV_HISTORY_SIZE):
+    HISTORY_SIZE = int(os.getenv(ENV_HISTORY_SIZE))
+
+# HISTORY_PATH
+HISTORY_PATH = os.getenv(ENV_HISTORY_PATH)
+
+# CACHE_SLOW_TTL
+CACHE_SLOW_TTL = DEFAULT_CACHE_SLOW_TTL
+if os.getenv(ENV_CACHE_SLOW_TTL):
+    CACHE_SLOW_TTL = float(os.getenv(ENV_CACHE_SLOW_TTL))
+
+# CACHE_FAST_TTL
+CACHE_FAST_TTL = DEFAULT_CACHE_FAST_TTL
+if os.getenv(ENV_CACHE_FAST_TTL):
+    CACHE_FAST_TTL = float(os.getenv(ENV_CACHE_FAST_TTL))
+
+# CACHE_VOLATILITY
+CACHE_VOLATILITY = []
+if os.getenv(ENV_CACHE_VOLATILITY):
+    CACHE_VOLATILITY = os.getenv(ENV_CACHE_VOLATILITY).split(',')
+
+# INVERTERS
+INVERTERS = []
+if os.getenv(ENV_INVERTERS):
+    INVERTERS = os.getenv(ENV_INVERTERS).split(',')
+
+# TIMING_ENABLED
+TIMING_ENABLED = DEFAULT_TIMING_ENABLED
+if os.getenv(ENV_TIMING_ENABLED):
+    TIMING_ENABLED = os.getenv(ENV_TIMING_ENABLED).lower() == 'true'
+
+# TIMING_WINDOW
+TIMING_WINDOW = DEFAULT_TIMING_WINDOW
+if os.getenv(ENV_TIMING_WINDOW):
+    TIMING_WINDOW = float(os.getenv(ENV_TIMING_WINDOW))
+
+# PROFILE_SAMPLE_RATE
+PROFILE_SAMPLE_RATE = DEFAULT_PROFILE_SAMPLE_RATE
+if os.getenv(ENV_PROFILE_SAMPLE_RATE):
+    PROFILE_SAMPLE_RATE = float(os.getenv(ENV_PROFILE_SAMPLE_RATE))
+
+# BREAKER_THRESHOLD
+BREAKER_THRESHOLD = DEFAULT_BREAKER_THRESHOLD
+if os.getenv(ENV_BREAKER_THRESHOLD):
+    BREAKER_THRESHOLD = int(os.getenv(ENV_BREAKER_THRESHOLD))
+
+# BREAKER_PROBE_INTERVAL
+BREAKER_PROBE_INTERVAL = DEFAULT_BREAKER_PROBE_INTERVAL
+if os.getenv(ENV_BREAKER_PROBE_INTERVAL):
+    BREAKER_PROBE_INTERVAL = float(os.getenv(ENV_BREAKER_PROBE_INTERVAL))
+
+# BREAKER_SERVE_STALE
+BREAKER_SERVE_STALE = DEFAULT_BREAKER_SERVE_STALE
+if os.getenv(ENV_BREAKER_SERVE_STALE):
+    BREAKER_SERVE_STALE = os.getenv(ENV_BREAKER_SERVE_STALE).lower() == 'true'
+
+# PRESETS
+PRESETS = []
+if os.getenv(ENV_PRESETS):
+    PRESETS = os.getenv(ENV_PRESETS).split(',')
+
+# EXPORT_INFLUX_URL
+EXPORT_INFLUX_URL = os.getenv(ENV_EXPORT_INFLUX_URL)
+
+# EXPORT_INFLUX_TOKEN
+EXPORT_INFLUX_TOKEN = os.getenv(ENV_EXPORT_INFLUX_TOKEN)
+
+# EXPORT_MQTT_ADDRESS
+EXPORT_MQTT_ADDRESS = os.getenv(ENV_EXPORT_MQTT_ADDRESS)
+
+# EXPORT_MQTT_TOPIC
+EXPORT_MQTT_TOPIC = os.getenv(ENV_EXPORT_MQTT_TOPIC, DEFAULT_EXPORT_MQTT_TOPIC)
+
+# EXPORT_MQTT_CLIENT_ID
+EXPORT_MQTT_CLIENT_ID = os.getenv(ENV_EXPORT_MQTT_CLIENT_ID)
+
+# EXPORT_BATCH_SIZE
+EXPORT_BATCH_SIZE = DEFAULT_EXPORT_BATCH_SIZE
+if os.getenv(ENV_EXPORT_BATCH_SIZE):
+    EXPORT_BATCH_SIZE = int(os.getenv(ENV_EXPORT_BATCH_SIZE))
+
+# EXPORT_QUEUE_SIZE
+EXPORT_QUEUE_SIZE = DEFAULT_EXPORT_QUEUE_SIZE
+if os.getenv(ENV_EXPORT_QUEUE_SIZE):
+    EXPORT_QUEUE_SIZE = int(os.getenv(ENV_EXPORT_QUEUE_SIZE))
+
+# EXPORT_BUFFER_PATH
+EXPORT_BUFFER_PATH = os.getenv(ENV_EXPORT_BUFFER_PATH)
+
+# EXPORT_BUFFER_SIZE
+EXPORT_BUFFER_SIZE = DEFAULT_EXPORT_BUFFER_SIZE
+if os.getenv(ENV_EXPORT_BUFFER_SIZE):
+    EXPORT_BUFFER_SIZE = int(os.getenv(ENV_EXPORT_BUFFER_SIZE))
+
+# PIPELINE_WINDOW
+PIPELINE_WINDOW = DEFAULT_PIPELINE_WINDOW
+if os.getenv(ENV_PIPELINE_WINDOW):
+    PIPELINE_WINDOW = int(os.getenv(ENV_PIPELINE_WINDOW))
@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from flask import abort
+from pymodbus.exceptions import ConnectionException
+from sun2000_modbus import inverter
+from sun2000_modbus.inverter import Sun2000
+from sun2000_modbus.registers import InverterEquipmentRegister
+
+from .breaker import CircuitBreaker
+from .timing import phase
+
+# Register read to probe whether the inverter answers again
+PROBE_REGISTER = InverterEquipmentRegister.DeviceStatus
+
+
+class InverterConnection:
+    """Long-lived connection to the Sun2000 inverter shared by all consumers.
+
+    Access is serialized through session(). The connection is established on first use, kept open between sessions (unless keep_alive is disabled) and
+    re-established after it was lost. Failed connection attempts are retried with exponential backoff, failing fast in between. After breaker_threshold
+    consecutive failures the breaker opens and sessions fail fast until a probe of the inverter in the background succeeds.
+    """
+    sun2000: Sun2000
+    keep_alive: bool
+    backoff: float
+    max_backoff: float
+    metrics: Dict[str, int]
+    breaker: CircuitBreaker
+
+    def __init__(self, host: str, port: int, keep_alive: bool = True, backoff: float = 1, max_backoff: float = 60, unit: int = 0,
+                 breaker_threshold: int = 0, probe_interval: float = 10):
+        self.sun2000 = inverter.Sun2000(host, port, unit=unit)
+        self.keep_alive = keep_alive
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.metrics = {'connects': 0, 'reconnects': 0, 'reuses': 0, 'failures': 0}
+        self.breaker = CircuitBreaker(breaker_threshold, probe_interval, self.probe)
+
+        self.logger = logging.getLogger()
+        self._lock = threading.RLock()
+        self._was_connected = False
+        self._reused = False
+        self._current_backoff = backoff
+        self._next_attempt = 0.0
+
+    def connect(self) -> bool:
+        """Make sure the connection is established, return False if it could not be established or reconnecting is backed off."""
+        with self._lock:
+            if self.sun2000.isConnected():
+                self.metrics['reuses'] += 1
+                self._reused = True
+                return True
+
+            now = time.monotonic()
+            if now < self._next_attempt:
+                self.logger.debug(f'Reconnecting to inverter backed off for another {self._next_attempt - now:.1f} seconds')
+                return False
+
+            self.sun2000.connect()
+            if not self.sun2000.isConnected():
+                self.metrics['failures'] += 1
+                self._next_attempt = now + self._current_backoff
+                self._current_backoff = min(self._current_backoff * 2, self.max_backoff)
+                return False
+
+            self.metrics['reconnects' if self._was_connected else 'connects'] += 1
+            self._was_connected = True
+            self._reused = False
+            self._current_backoff = self.backoff
+            self._next_attempt = 0.0
+            return True
+
+    def disconnect(self) -> None:
+        with self._lock:
+            self.sun2000.disconnect()
+
+    def probe(self) -> bool:
+        """Connect regardless of the backoff and read a single register, return whether the inverter answered."""
+        with self._lock:
+            self._next_attempt = 0.0
+            if not self.connect():
+                return False
+
+            try:
+                self.sun2000.read_range(PROBE_REGISTER.value.address, quantity=PROBE_REGISTER.value.quantity)
+            except Exception:
+                self.sun2000.disconnect()
+                raise
+            finally:
+                if not self.keep_alive:
+                    self.sun2000.disconnect()
+            return True
+
+    def read_range(self, address: int, quantity: int) -> bytes:
+        """Read quantity registers starting at address within a session.
+
+        The inverter (or its dongle) closes idle connections, which shows only on the first read of a kept-alive connection. In that case the connection
+        is re-established and the read retried once.
+        """
+        try:
+            return self.sun2000.read_range(address, quantity=quantity)
+        except ConnectionException as e:
+            if not self._reused:
+                raise
+            self.logger.info(f'Kept-alive connection to inverter was closed, reconnecting: {e}')
+            self._reused = False
+            self.sun2000.disconnect()
+            if not self.connect():
+                raise
+            return self.sun2000.read_range(address, quantity=quantity)
+
+    @contextmanager
+    def session(self) -> Iterator['InverterConnection']:
+        """Provide exclusive access to the connected inverter, aborting with 502 if no connection could be established or the breaker is open."""
+        if self.breaker.is_open():
+            abort(502, 'Connection to inverter interrupted, circuit breaker is open')
+
+        with self._lock:
+            with phase('connect'):
+                connected = self.connect()
+            if not connected:
+                self.breaker.record_failure()
+                abort(502, 'Connection to inverter could not be established')
+
+            try:
+                yield self
+            except ConnectionException:
+                # The connection is considered broken, it will be re-established by the next session. Other errors like registers not answered by the
+                # inverter leave the connection and the breaker untouched
+                self.sun2000.disconnect()
+                self.breaker.record_failure()
+                raise
+            finally:
+                if not self.keep_alive:
+                    self.sun2000.disconnect()
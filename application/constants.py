@@ -2,3 +2,62 @@ ENV_INVERTER_HOST = 'INVERTER_HOST'
 ENV_INVERTER_PORT = 'INVERTER_PORT'
 ENV_ACCEPTED_API_KEYS = 'ACCEPTED_API_KEYS'
 ENV_LOG_LEVEL = 'LOG_LEVEL'
+ENV_READ_MAX_GAP = 'READ_MAX_GAP'
+ENV_POLL_INTERVAL = 'POLL_INTERVAL'
+ENV_POLL_INVERTER_REGISTERS = 'POLL_INVERTER_REGISTERS'
+ENV_POLL_BATTERY_REGISTERS = 'POLL_BATTERY_REGISTERS'
+ENV_POLL_METER_REGISTERS = 'POLL_METER_REGISTERS'
+ENV_CACHE_MAX_AGE = 'CACHE_MAX_AGE'
+ENV_INVERTER_KEEP_ALIVE = 'INVERTER_KEEP_ALIVE'
+ENV_RECONNECT_BACKOFF = 'RECONNECT_BACKOFF'
+ENV_RECONNECT_MAX_BACKOFF = 'RECONNECT_MAX_BACKOFF'
+ENV_BROKER_ADDRESS = 'BROKER_ADDRESS'
+ENV_STREAM_INTERVAL = 'STREAM_INTERVAL'
+ENV_HISTORY_SIZE = 'HISTORY_SIZE'
+ENV_HISTORY_PATH = 'HISTORY_PATH'
+ENV_CACHE_SLOW_TTL = 'CACHE_SLOW_TTL'
+ENV_CACHE_FAST_TTL = 'CACHE_FAST_TTL'
+ENV_CACHE_VOLATILITY = 'CACHE_VOLATILITY'
+ENV_INVERTERS = 'INVERTERS'
+ENV_TIMING_ENABLED = 'TIMING_ENABLED'
+ENV_TIMING_WINDOW = 'TIMING_WINDOW'
+ENV_PROFILE_SAMPLE_RATE = 'PROFILE_SAMPLE_RATE'
+ENV_BREAKER_THRESHOLD = 'BREAKER_THRESHOLD'
+ENV_BREAKER_PROBE_INTERVAL = 'BREAKER_PROBE_INTERVAL'
+ENV_BREAKER_SERVE_STALE = 'BREAKER_SERVE_STALE'
+ENV_PRESETS = 'PRESETS'
+ENV_EXPORT_INFLUX_URL = 'EXPORT_INFLUX_URL'
+ENV_EXPORT_INFLUX_TOKEN = 'EXPORT_INFLUX_TOKEN'
+ENV_EXPORT_MQTT_ADDRESS = 'EXPORT_MQTT_ADDRESS'
+ENV_EXPORT_MQTT_TOPIC = 'EXPORT_MQTT_TOPIC'
+ENV_EXPORT_MQTT_CLIENT_ID = 'EXPORT_MQTT_CLIENT_ID'
+ENV_EXPORT_BATCH_SIZE = 'EXPORT_BATCH_SIZE'
+ENV_EXPORT_QUEUE_SIZE = 'EXPORT_QUEUE_SIZE'
+ENV_EXPORT_BUFFER_PATH = 'EXPORT_BUFFER_PATH'
+ENV_EXPORT_BUFFER_SIZE = 'EXPORT_BUFFER_SIZE'
+ENV_PIPELINE_WINDOW = 'PIPELINE_WINDOW'
+ENV_STREAM_MAX_SUBSCRIPTIONS = 'STREAM_MAX_SUBSCRIPTIONS'
+
+DEFAULT_READ_MAX_GAP = 0
+DEFAULT_POLL_INTERVAL = 0
+DEFAULT_CACHE_MAX_AGE = 10
+DEFAULT_INVERTER_KEEP_ALIVE = True
+DEFAULT_RECONNECT_BACKOFF = 1
+DEFAULT_RECONNECT_MAX_BACKOFF = 60
+DEFAULT_STREAM_INTERVAL = 5
+DEFAULT_HISTORY_SIZE = 17280
+DEFAULT_CACHE_SLOW_TTL = 0
+DEFAULT_CACHE_FAST_TTL = 0
+DEFAULT_INVERTER_NAME = 'default'
+DEFAULT_TIMING_ENABLED = False
+DEFAULT_TIMING_WINDOW = 300
+DEFAULT_PROFILE_SAMPLE_RATE = 0
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_PROBE_INTERVAL = 10
+DEFAULT_BREAKER_SERVE_STALE = False
+DEFAULT_EXPORT_MQTT_TOPIC = 'sun2000'
+DEFAULT_EXPORT_BATCH_SIZE = 50
+DEFAULT_EXPORT_QUEUE_SIZE = 1000
+DEFAULT_EXPORT_BUFFER_SIZE = 10485760
+DEFAULT_PIPELINE_WINDOW = 1
+DEFAULT_STREAM_MAX_SUBSCRIPTIONS = 2
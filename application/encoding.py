@@ -0,0 +1,61 @@
+import json
+import zlib
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from .planner import EquipmentRegister
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.sun2000.columnar+json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+# Response formats of POST /register-values in order of preference, MessagePack is available if the msgpack package is installed
+MIMETYPES = (JSON_MIMETYPE, COLUMNAR_MIMETYPE) + ((MSGPACK_MIMETYPE,) if msgpack is not None else ())
+
+
+@lru_cache(maxsize=256)
+def get_registers_digest(equipment_value: str, registers: Tuple[EquipmentRegister, ...], mimetype: str) -> str:
+    """Return a digest of the requested registers and response format, distinguishing the ETags of different register lists and representations of the
+    same version."""
+    return f'{zlib.crc32(",".join([mimetype, equipment_value] + [register.name for register in registers]).encode("utf-8")):08x}'
+
+
+@lru_cache(maxsize=256)
+def get_columnar_template(equipment_value: str, registers: Tuple[EquipmentRegister, ...]) -> dict:
+    """Return the columns not depending on the values read, along with the JSON document serialized up to the values column."""
+    template = {
+        'equipment': equipment_value,
+        'registers': [register.name for register in registers],
+        'gains': [register.value.gain for register in registers],
+        'units': [register.value.unit for register in registers]
+    }
+    return {'columns': template, 'prefix': json.dumps(template, separators=(',', ':'))[:-1] + ',"values":['}
+
+
+def encode_columnar_json(equipment_value: str, registers: List[EquipmentRegister], registers_data: List[dict], envelope: Optional[dict] = None) -> bytes:
+    """Encode the register values in columnar layout, serializing only the values on top of the prebuilt template of the requested registers. The
+    envelope holds the fields returned alongside the registers, like inverter and version."""
+    template = get_columnar_template(equipment_value, tuple(registers))
+    # Numeric values are kept as decimal strings, they are valid JSON numbers already
+    values = ','.join(register_data['value'] if register_data['type'] == 'number' else json.dumps(register_data['value']) for register_data in registers_data)
+    mapped_values = json.dumps([register_data.get('mappedValue') for register_data in registers_data], separators=(',', ':'))
+    ages = json.dumps([register_data.get('age') for register_data in registers_data], separators=(',', ':'))
+    stale = json.dumps([register_data.get('stale', False) for register_data in registers_data])
+    fields = ''.join(f',{json.dumps(key)}:{json.dumps(value)}' for key, value in (envelope or {}).items())
+    return f'{template["prefix"]}{values}],"mappedValues":{mapped_values},"ages":{ages},"stale":{stale}{fields}}}'.encode('utf-8')
+
+
+def encode_msgpack(equipment_value: str, registers: List[EquipmentRegister], registers_data: List[dict], envelope: Optional[dict] = None) -> bytes:
+    """Encode the register values in columnar layout as MessagePack."""
+    columns = dict(get_columnar_template(equipment_value, tuple(registers))['columns'])
+    columns['values'] = [int(register_data['value']) if register_data['type'] == 'number' else register_data['value'] for register_data in registers_data]
+    columns['mappedValues'] = [register_data.get('mappedValue') for register_data in registers_data]
+    columns['ages'] = [register_data.get('age') for register_data in registers_data]
+    columns['stale'] = [register_data.get('stale', False) for register_data in registers_data]
+    columns.update(envelope or {})
+    return msgpack.packb(columns)
@@ -0,0 +1,409 @@
+import collections
+import fcntl
+import json
+import logging
+import os
+import queue
+import socket
+import struct
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import List, Optional
+
+from .constants import ENV_EXPORT_INFLUX_URL, ENV_EXPORT_INFLUX_TOKEN, ENV_EXPORT_MQTT_ADDRESS, ENV_EXPORT_MQTT_TOPIC, DEFAULT_EXPORT_MQTT_TOPIC, \
+    ENV_EXPORT_BATCH_SIZE, DEFAULT_EXPORT_BATCH_SIZE, ENV_EXPORT_QUEUE_SIZE, DEFAULT_EXPORT_QUEUE_SIZE, ENV_EXPORT_BUFFER_PATH, ENV_EXPORT_BUFFER_SIZE, \
+    DEFAULT_EXPORT_BUFFER_SIZE, ENV_RECONNECT_BACKOFF, DEFAULT_RECONNECT_BACKOFF, ENV_RECONNECT_MAX_BACKOFF, DEFAULT_RECONNECT_MAX_BACKOFF, \
+    ENV_EXPORT_MQTT_CLIENT_ID
+
+# Records exported are dicts of the read cycle's timestamp, the inverter name and the register values as lists of equipment value, register name and
+# value, i.e. {'timestamp': 1672531200.0, 'inverter': 'default', 'values': [['inverter', 'ActivePower', 1.234]]}
+
+DEFAULT_MQTT_PORT = 1883
+# File locked by the process exporting, in the buffer directory if configured
+EXPORT_LOCK_FILE = 'sun2000-rest-export.lock'
+# Seconds to wait for a sink to respond
+SINK_TIMEOUT = 5
+
+
+def escape_key(value: str) -> str:
+    return value.replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+def format_field_value(value) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(float(value))
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def format_line_protocol(records: List[dict]) -> List[str]:
+    """Format records in InfluxDB line protocol, as one line of measurement sun2000 per record and equipment with the registers as fields."""
+    lines = []
+    for record in records:
+        fields = {}
+        for equipment_value, register_name, value in record['values']:
+            fields.setdefault(equipment_value, []).append(f'{escape_key(register_name)}={format_field_value(value)}')
+        timestamp = int(record['timestamp'] * 1_000_000_000)
+        for equipment_value, equipment_fields in fields.items():
+            lines.append(f'sun2000,inverter={escape_key(record["inverter"])},equipment={escape_key(equipment_value)} {",".join(equipment_fields)} {timestamp}')
+    return lines
+
+
+class InfluxSink:
+    """Writes records in line protocol to the InfluxDB write endpoint given by url, e.g. http://influxdb:8086/api/v2/write?org=home&bucket=solar."""
+    name = 'influx'
+    url: str
+    token: Optional[str]
+
+    def __init__(self, url: str, token: str = None):
+        self.url = url
+        self.token = token
+
+    def send(self, records: List[dict]) -> None:
+        headers = {'Content-Type': 'text/plain; charset=utf-8'}
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        request = urllib.request.Request(self.url, data='\n'.join(format_line_protocol(records)).encode(), headers=headers, method='POST')
+        # Responses with an error status raise HTTPError
+        with urllib.request.urlopen(request, timeout=SINK_TIMEOUT):
+            pass
+
+    def close(self) -> None:
+        pass
+
+
+def encode_string(value: str) -> bytes:
+    encoded = value.encode()
+    return struct.pack('>H', len(encoded)) + encoded
+
+
+def encode_packet(packet_type: int, body: bytes) -> bytes:
+    # Fixed header of an MQTT packet, the remaining length is encoded in 7 bit groups
+    header = bytearray([packet_type])
+    length = len(body)
+    while True:
+        length, digit = divmod(length, 128)
+        header.append(digit | (0x80 if length > 0 else 0))
+        if length == 0:
+            return bytes(header) + body
+
+
+class MqttSink:
+    """Publishes each register value retained to <topic>/<inverter>/<equipment>/<register> of an MQTT 3.1.1 broker.
+
+    Values are published with QoS 1, a batch is delivered once the broker acknowledged all of its messages. The client id defaults to one derived from
+    the host name and process id, as brokers disconnect the other client if a second one connects with the same id.
+    """
+    name = 'mqtt'
+    host: str
+    port: int
+    topic: str
+
+    def __init__(self, host: str, port: int = DEFAULT_MQTT_PORT, topic: str = DEFAULT_EXPORT_MQTT_TOPIC, client_id: str = None):
+        self.host = host
+        self.port = port
+        self.topic = topic
+        self._client_id = client_id
+        self._socket: Optional[socket.socket] = None
+        self._packet_id = 0
+
+    @property
+    def client_id(self) -> str:
+        # Derived when connecting, sinks might be created before the workers are forked
+        return self._client_id or f'sun2000-rest-{socket.gethostname()}-{os.getpid()}'
+
+    def connect(self) -> None:
+        self._socket = socket.create_connection((self.host, self.port), timeout=SINK_TIMEOUT)
+        # Protocol level 4 (3.1.1), clean session and keep alive disabled
+        self._socket.sendall(encode_packet(0x10, encode_string('MQTT') + bytes([4, 0x02]) + struct.pack('>H', 0) + encode_string(self.client_id)))
+        packet_type, body = self.read_packet()
+        if packet_type != 0x20 or len(body) < 2 or body[1] != 0:
+            raise ConnectionError(f'MQTT broker refused connection with return code {body[1] if len(body) > 1 else None}')
+
+    def read_packet(self) -> tuple:
+        packet_type = self.read_exactly(1)[0]
+        length = 0
+        for shift in range(0, 28, 7):
+            digit = self.read_exactly(1)[0]
+            length |= (digit & 0x7F) << shift
+            if digit & 0x80 == 0:
+                break
+        return packet_type, self.read_exactly(length)
+
+    def read_exactly(self, size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = self._socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('Connection to MQTT broker closed')
+            data += chunk
+        return data
+
+    def send(self, records: List[dict]) -> None:
+        try:
+            if self._socket is None:
+                self.connect()
+            # All messages of the batch are sent before waiting for their acknowledgements
+            pending = set()
+            messages = []
+            for record in records:
+                for equipment_value, register_name, value in record['values']:
+                    self._packet_id = self._packet_id % 0xFFFF + 1
+                    pending.add(self._packet_id)
+                    topic = f'{self.topic}/{record["inverter"]}/{equipment_value}/{register_name}'
+                    # QoS 1 and retained
+                    messages.append(encode_packet(0x33, encode_string(topic) + struct.pack('>H', self._packet_id) + str(value).encode()))
+            self._socket.sendall(b''.join(messages))
+
+            while len(pending) > 0:
+                packet_type, body = self.read_packet()
+                if packet_type & 0xF0 == 0x40:
+                    pending.discard(struct.unpack('>H', body[:2])[0])
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+
+
+class DiskBuffer:
+    """File of records that could not be delivered yet, stored as one JSON document per line and limited to max_size bytes."""
+    path: str
+    max_size: int
+
+    def __init__(self, path: str, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self._count = 0
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                self._count = sum(1 for _ in file)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, records: List[dict]) -> int:
+        """Append the records, return the amount of records appended before the buffer was full."""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        lines = []
+        for record in records:
+            line = json.dumps(record, separators=(',', ':')) + '\n'
+            if size + len(line) > self.max_size:
+                break
+            size += len(line)
+            lines.append(line)
+        if len(lines) > 0:
+            with open(self.path, 'a') as file:
+                file.writelines(lines)
+            self._count += len(lines)
+        return len(lines)
+
+    def load(self) -> List[dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    def replace(self, records: List[dict]) -> None:
+        if len(records) == 0:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._count = 0
+            return
+        with open(self.path + '.tmp', 'w') as file:
+            file.writelines(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+        os.replace(self.path + '.tmp', self.path)
+        self._count = len(records)
+
+
+class Exporter(threading.Thread):
+    """Background thread delivering the records submitted by the poller to one sink in batches of up to batch_size records.
+
+    Records are queued in memory up to queue_size records, submitting blocks while the queue is full. While the sink is down, records not delivered are
+    kept in memory as long as the queue has room, beyond that the oldest of them are appended to the disk buffer if given and dropped otherwise.
+    Delivery is retried with exponential backoff, kept and buffered records are delivered first once the sink is up again.
+    """
+    sink: object
+    batch_size: int
+    queue: queue.Queue
+    buffer: Optional[DiskBuffer]
+    sent: int
+    dropped: int
+    failures: int
+
+    def __init__(self, sink, batch_size: int = DEFAULT_EXPORT_BATCH_SIZE, queue_size: int = DEFAULT_EXPORT_QUEUE_SIZE, buffer: DiskBuffer = None,
+                 backoff: float = 1, max_backoff: float = 60):
+        super().__init__(name=f'sun2000-exporter-{sink.name}', daemon=True)
+        self.sink = sink
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.buffer = buffer
+        self.sent = 0
+        self.dropped = 0
+        self.failures = 0
+
+        self.logger = logging.getLogger()
+        # Records not delivered yet, held by the exporter thread in order
+        self._retained = collections.deque()
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._delay = backoff
+        self._retry_at = 0.0
+        self._stopped = threading.Event()
+
+    def submit(self, record: dict, timeout: float = 0) -> bool:
+        """Queue the record for delivery, waiting up to timeout seconds for the queue to have room. Return False if the queue stayed full and the record
+        was buffered on disk or dropped instead."""
+        try:
+            if timeout > 0:
+                self.queue.put(record, timeout=timeout)
+            else:
+                self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.spill([record])
+            return False
+
+    def run(self) -> None:
+        self.logger.info(f'Exporting polled registers to {self.sink.name} in batches of up to {self.batch_size} records')
+        while not self._stopped.is_set():
+            try:
+                record = self.queue.get(timeout=max(self._retry_at - time.monotonic(), 0.1) if self.is_pending() else 1)
+            except queue.Empty:
+                if self.is_pending() and time.monotonic() >= self._retry_at:
+                    self.replay()
+                continue
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.deliver(batch)
+
+        # Records still queued are kept for the next start if buffered on disk
+        remaining = list(self._retained)
+        self._retained.clear()
+        while not self.queue.empty():
+            remaining.append(self.queue.get_nowait())
+        self.spill(remaining)
+        self.sink.close()
+
+    def is_pending(self) -> bool:
+        return len(self._retained) > 0 or (self.buffer is not None and len(self.buffer) > 0)
+
+    def deliver(self, batch: List[dict]) -> None:
+        # Kept and buffered records are delivered first to keep the records in order
+        if time.monotonic() < self._retry_at or (self.is_pending() and not self.replay()):
+            self.retain(batch)
+            return
+        if not self.send(batch):
+            self.retain(batch)
+
+    def replay(self) -> bool:
+        # Records are spilled to disk oldest first, so buffered records precede the ones kept in memory
+        if self.buffer is not None and len(self.buffer) > 0:
+            records = self.buffer.load()
+            self.logger.info(f'Delivering {len(records)} records buffered for {self.sink.name}')
+            for offset in range(0, len(records), self.batch_size):
+                if not self.send(records[offset:offset + self.batch_size]):
+                    self.buffer.replace(records[offset:])
+                    return False
+            self.buffer.replace([])
+
+        while len(self._retained) > 0:
+            batch = [self._retained[index] for index in range(min(self.batch_size, len(self._retained)))]
+            if not self.send(batch):
+                return False
+            for _ in batch:
+                self._retained.popleft()
+        return True
+
+    def retain(self, batch: List[dict]) -> None:
+        """Keep the records for the next delivery attempt, spilling the oldest records kept beyond the room left in the queue."""
+        self._retained.extend(batch)
+        if self.queue.maxsize <= 0:
+            return
+        overflow = min(len(self._retained) + self.queue.qsize() - self.queue.maxsize, len(self._retained))
+        if overflow > 0:
+            self.spill([self._retained.popleft() for _ in range(overflow)])
+
+    def send(self, batch: List[dict]) -> bool:
+        try:
+            self.sink.send(batch)
+        except Exception as e:
+            self.failures += 1
+            self._retry_at = time.monotonic() + self._delay
+            self.logger.warning(f'Exporting {len(batch)} records to {self.sink.name} failed, retrying in {self._delay} seconds: {e}')
+            self._delay = min(self._delay * 2, self._max_backoff)
+            return False
+
+        self.sent += len(batch)
+        self._delay = self._backoff
+        return True
+
+    def spill(self, records: List[dict]) -> None:
+        if len(records) == 0:
+            return
+        appended = self.buffer.append(records) if self.buffer is not None else 0
+        if appended < len(records):
+            self.dropped += len(records) - appended
+            self.logger.warning(f'Dropped {len(records) - appended} records not delivered to {self.sink.name}')
+
+    def snapshot(self) -> dict:
+        return {'sink': self.sink.name, 'queued': self.queue.qsize() + len(self._retained), 'buffered': len(self.buffer) if self.buffer is not None else 0,
+                'sent': self.sent, 'dropped': self.dropped, 'failures': self.failures}
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def create_sinks(config) -> list:
+    """Create the sinks configured, exiting on an invalid configuration."""
+    sinks = []
+    if config.get(ENV_EXPORT_INFLUX_URL):
+        sinks.append(InfluxSink(config.get(ENV_EXPORT_INFLUX_URL), config.get(ENV_EXPORT_INFLUX_TOKEN)))
+    if config.get(ENV_EXPORT_MQTT_ADDRESS):
+        host, _, port = config.get(ENV_EXPORT_MQTT_ADDRESS).partition(':')
+        if len(host) == 0 or (len(port) > 0 and not port.isdigit()):
+            exit(f'Error: Invalid MQTT broker address {config.get(ENV_EXPORT_MQTT_ADDRESS)} configured')
+        sinks.append(MqttSink(host, int(port) if len(port) > 0 else DEFAULT_MQTT_PORT, config.get(ENV_EXPORT_MQTT_TOPIC, DEFAULT_EXPORT_MQTT_TOPIC),
+                              config.get(ENV_EXPORT_MQTT_CLIENT_ID)))
+    return sinks
+
+
+def acquire_export_lock(config):
+    """Lock the export of the configured sinks for this process, return the locked file or None if another process holds the lock.
+
+    Workers polling without a broker share the sinks and the buffer files, only one of them may export.
+    """
+    directory = config.get(ENV_EXPORT_BUFFER_PATH) or tempfile.gettempdir()
+    os.makedirs(directory, exist_ok=True)
+    file = open(os.path.join(directory, EXPORT_LOCK_FILE), 'a')
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        file.close()
+        return None
+    return file
+
+
+def create_exporters(config, sinks: list) -> List[Exporter]:
+    """Create an exporter per sink, buffering on disk if configured."""
+    buffer_path = config.get(ENV_EXPORT_BUFFER_PATH)
+    if buffer_path:
+        os.makedirs(buffer_path, exist_ok=True)
+    return [Exporter(sink,
+                     batch_size=config.get(ENV_EXPORT_BATCH_SIZE, DEFAULT_EXPORT_BATCH_SIZE),
+                     queue_size=config.get(ENV_EXPORT_QUEUE_SIZE, DEFAULT_EXPORT_QUEUE_SIZE),
+                     buffer=DiskBuffer(os.path.join(buffer_path, f'{sink.name}.jsonl'),
+                                       config.get(ENV_EXPORT_BUFFER_SIZE, DEFAULT_EXPORT_BUFFER_SIZE)) if buffer_path else None,
+                     backoff=config.get(ENV_RECONNECT_BACKOFF, DEFAULT_RECONNECT_BACKOFF),
+                     max_backoff=config.get(ENV_RECONNECT_MAX_BACKOFF, DEFAULT_RECONNECT_MAX_BACKOFF))
+            for sink in sinks]
@@ -0,0 +1,140 @@
+import fcntl
+import mmap
+import os
+import threading
+from typing import Dict, List, Optional, Union
+
+from .planner import EquipmentRegister
+
+# Header of each ring buffer: index of the next slot to write and amount of slots written, as unsigned 64 bit integers
+HEADER_SIZE = 16
+# Each slot holds a timestamp and a value, as 64 bit floats
+SLOT_SIZE = 16
+# File in the history directory locked by the process recording values
+WRITER_LOCK_FILE = '.writer.lock'
+
+
+class RingBuffer:
+    """Fixed-size buffer of timestamp and value pairs, overwriting the oldest pair when full, optionally backed by a memory-mapped file."""
+    capacity: int
+
+    def __init__(self, capacity: int, path: str = None):
+        if capacity <= 0:
+            raise ValueError('Capacity of ring buffer must be positive')
+        self.capacity = capacity
+        size = HEADER_SIZE + capacity * SLOT_SIZE
+
+        if path is None:
+            self._buffer: Union[bytearray, mmap.mmap] = bytearray(size)
+        else:
+            with open(path, 'a+b') as file:
+                if os.fstat(file.fileno()).st_size != size:
+                    # New file or capacity changed, start from scratch
+                    file.truncate(0)
+                    file.truncate(size)
+                self._buffer = mmap.mmap(file.fileno(), size)
+
+        self._header = memoryview(self._buffer)[:HEADER_SIZE].cast('Q')
+        self._slots = memoryview(self._buffer)[HEADER_SIZE:].cast('d')
+        if self._header[0] >= capacity or self._header[1] > capacity:
+            self._header[0] = self._header[1] = 0
+
+    def __len__(self) -> int:
+        return self._header[1]
+
+    def append(self, timestamp: float, value: float) -> None:
+        index = self._header[0]
+        self._slots[index * 2] = timestamp
+        self._slots[index * 2 + 1] = value
+        self._header[0] = (index + 1) % self.capacity
+        self._header[1] = min(self._header[1] + 1, self.capacity)
+
+    def points(self, start: float, end: float) -> List[tuple]:
+        """Return the timestamp and value pairs between start and end in chronological order."""
+        count = self._header[1]
+        first = (self._header[0] - count) % self.capacity
+        points = []
+        for offset in range(count):
+            index = (first + offset) % self.capacity
+            timestamp = self._slots[index * 2]
+            if start <= timestamp <= end:
+                points.append((timestamp, self._slots[index * 2 + 1]))
+        return points
+
+
+def downsample(points: List[tuple], start: float, step: float) -> List[dict]:
+    """Aggregate the given chronological points into buckets of step seconds, starting at start."""
+    buckets = []
+    for timestamp, value in points:
+        bucket_start = start + (timestamp - start) // step * step
+        if len(buckets) == 0 or buckets[-1]['timestamp'] != bucket_start:
+            buckets.append({'timestamp': bucket_start, 'min': value, 'max': value, 'sum': value, 'count': 1})
+        else:
+            bucket = buckets[-1]
+            bucket['min'] = min(bucket['min'], value)
+            bucket['max'] = max(bucket['max'], value)
+            bucket['sum'] += value
+            bucket['count'] += 1
+
+    return [{'timestamp': bucket['timestamp'], 'min': bucket['min'], 'max': bucket['max'], 'avg': bucket['sum'] / bucket['count']} for bucket in buckets]
+
+
+class HistoryStore:
+    """Ring buffers of the values read per register, created on first record of a register. A capacity of 0 disables the history.
+
+    If persisted, several processes (e.g. workers polling without a broker) share the files. Only the process holding the writer lock of the directory
+    records values, another process takes over once it exits.
+    """
+    capacity: int
+    path: Optional[str]
+    buffers: Dict[EquipmentRegister, RingBuffer]
+
+    def __init__(self, capacity: int, path: str = None):
+        self.capacity = capacity
+        self.path = path
+        self.buffers = {}
+        self._lock = threading.Lock()
+        self._writer_lock = None
+        if path is not None and capacity > 0:
+            os.makedirs(path, exist_ok=True)
+
+    def is_writer(self) -> bool:
+        if self.path is None or self._writer_lock is not None:
+            return True
+        file = open(os.path.join(self.path, WRITER_LOCK_FILE), 'a')
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+        self._writer_lock = file
+        return True
+
+    def get_buffer(self, register: EquipmentRegister, create: bool) -> Optional[RingBuffer]:
+        if self.capacity <= 0:
+            return None
+        buffer = self.buffers.get(register)
+        if buffer is None:
+            path = os.path.join(self.path, f'{type(register).__name__}.{register.name}') if self.path is not None else None
+            # Buffers persisted by a previous run are opened on first access
+            if create or (path is not None and os.path.exists(path)):
+                buffer = self.buffers[register] = RingBuffer(self.capacity, path)
+        return buffer
+
+    def record(self, register: EquipmentRegister, timestamp: float, value: float) -> None:
+        with self._lock:
+            if self.capacity <= 0 or not self.is_writer():
+                return
+            self.get_buffer(register, True).append(timestamp, value)
+
+    def query(self, register: EquipmentRegister, start: float, end: float, step: float = None) -> Optional[List[dict]]:
+        """Return the values of the given register between start and end, downsampled to buckets of step seconds if given, or None if not recorded."""
+        with self._lock:
+            buffer = self.get_buffer(register, False)
+            if buffer is None:
+                return None
+            points = buffer.points(start, end)
+
+        if step is None:
+            return [{'timestamp': timestamp, 'value': value} for timestamp, value in points]
+        return downsample(points, start, step)
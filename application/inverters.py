@@ -0,0 +1,56 @@
+from typing import List
+
+from .cache import SnapshotCache
+from .connection import InverterConnection
+from .metrics import ReadMetrics
+from .singleflight import SingleFlight
+
+
+class Inverter:
+    """One configured inverter with its own connection, snapshot cache and in-flight reads."""
+    name: str
+    host: str
+    port: int
+    unit: int
+    connection: InverterConnection
+    cache: SnapshotCache
+    flights: SingleFlight
+    read_metrics: ReadMetrics
+
+    def __init__(self, name: str, host: str, port: int, unit: int = 0, keep_alive: bool = True, backoff: float = 1, max_backoff: float = 60,
+                 breaker_threshold: int = 0, probe_interval: float = 10):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.unit = unit
+        self.connection = InverterConnection(host, port, keep_alive=keep_alive, backoff=backoff, max_backoff=max_backoff, unit=unit,
+                                             breaker_threshold=breaker_threshold, probe_interval=probe_interval)
+        self.cache = SnapshotCache()
+        self.flights = SingleFlight()
+        self.read_metrics = ReadMetrics()
+
+    def describe(self) -> dict:
+        return {'name': self.name, 'host': self.host, 'port': self.port, 'unit': self.unit}
+
+    def health(self) -> dict:
+        health = {'name': self.name}
+        health.update(self.connection.breaker.snapshot())
+        return health
+
+
+def parse_inverters(entries: List[str], default_port: int) -> List[tuple]:
+    """Parse inverters configured as <name>=<host>[:<port>[:<unit>]] to tuples of name, host, port and unit, raising ValueError on invalid entries."""
+    inverters = []
+    for entry in entries:
+        name, _, address = entry.partition('=')
+        parts = address.split(':')
+        try:
+            if len(name) == 0 or len(parts[0]) == 0 or len(parts) > 3:
+                raise ValueError()
+            inverters.append((name, parts[0], int(parts[1]) if len(parts) > 1 else default_port, int(parts[2]) if len(parts) > 2 else 0))
+        except ValueError:
+            raise ValueError(f'Invalid inverter {entry} configured')
+
+    if len(set(inverter[0] for inverter in inverters)) != len(inverters):
+        raise ValueError('Inverter names configured are not unique')
+    return inverters
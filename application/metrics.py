@@ -0,0 +1,119 @@
+import threading
+from typing import Tuple, Iterable
+
+from .planner import EquipmentRegister
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds in seconds of the Modbus read latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    buckets: Tuple[float, ...]
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * len(buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            for index, bucket in enumerate(self.buckets):
+                if value <= bucket:
+                    self._counts[index] += 1
+                    break
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        """Return cumulative bucket counts, sum and count of all observed values."""
+        with self._lock:
+            cumulative = []
+            total = 0
+            for bucket, count in zip(self.buckets, self._counts):
+                total += count
+                cumulative.append((bucket, total))
+            return {'buckets': cumulative, 'sum': self._sum, 'count': self._count}
+
+
+class ReadMetrics:
+    """Instrumentation of the Modbus reads sent to the inverter."""
+    latency: Histogram
+    reads: int
+    errors: int
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.reads = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, duration: float, error: bool = False) -> None:
+        self.latency.observe(duration)
+        with self._lock:
+            self.reads += 1
+            if error:
+                self.errors += 1
+
+    def snapshot(self) -> dict:
+        return {'read_latency': self.latency.snapshot(), 'reads': self.reads, 'read_errors': self.errors}
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def render(registers_data: Iterable[Tuple[str, EquipmentRegister, dict]], instrumentation: dict, up: bool = True) -> str:
+    """Render register values, given as tuples of equipment value, register and register data, and the instrumentation in text exposition format.
+    up tells whether reading the registers succeeded."""
+    lines = [
+        '# HELP sun2000_up Whether reading the registers from the inverter succeeded',
+        '# TYPE sun2000_up gauge',
+        f'sun2000_up {1 if up else 0}',
+        '# HELP sun2000_register_value Value of a numeric Sun2000 register with gain applied',
+        '# TYPE sun2000_register_value gauge'
+    ]
+    for equipment_value, register, register_data in registers_data:
+        if register_data['type'] != 'number':
+            continue
+        value = float(register_data['value'])
+        if register.value.gain is not None:
+            value /= register.value.gain
+        labels = f'equipment="{equipment_value}",register="{register.name}"'
+        if register.value.unit is not None:
+            labels += f',unit="{escape_label_value(register.value.unit)}"'
+        lines.append(f'sun2000_register_value{{{labels}}} {value!r}')
+
+    read_latency = instrumentation['read_latency']
+    lines += [
+        '# HELP sun2000_modbus_read_duration_seconds Duration of Modbus reads sent to the inverter',
+        '# TYPE sun2000_modbus_read_duration_seconds histogram'
+    ]
+    lines += [f'sun2000_modbus_read_duration_seconds_bucket{{le="{bucket}"}} {count}' for bucket, count in read_latency['buckets']]
+    lines += [
+        f'sun2000_modbus_read_duration_seconds_bucket{{le="+Inf"}} {read_latency["count"]}',
+        f'sun2000_modbus_read_duration_seconds_sum {read_latency["sum"]!r}',
+        f'sun2000_modbus_read_duration_seconds_count {read_latency["count"]}',
+        '# HELP sun2000_modbus_reads_total Modbus reads sent to the inverter',
+        '# TYPE sun2000_modbus_reads_total counter',
+        f'sun2000_modbus_reads_total {instrumentation["reads"]}',
+        '# HELP sun2000_modbus_read_errors_total Modbus reads sent to the inverter that failed',
+        '# TYPE sun2000_modbus_read_errors_total counter',
+        f'sun2000_modbus_read_errors_total {instrumentation["read_errors"]}',
+        '# HELP sun2000_connection_events_total Connection events of the inverter connection',
+        '# TYPE sun2000_connection_events_total counter'
+    ]
+    lines += [f'sun2000_connection_events_total{{event="{event}"}} {count}' for event, count in instrumentation['connection'].items()]
+
+    for name, metric_type, description, key in (('sun2000_export_queued', 'gauge', 'Records waiting in memory for delivery to the sink', 'queued'),
+                                                ('sun2000_export_buffered', 'gauge', 'Records buffered on disk for delivery to the sink', 'buffered'),
+                                                ('sun2000_export_sent_total', 'counter', 'Records delivered to the sink', 'sent'),
+                                                ('sun2000_export_dropped_total', 'counter', 'Records dropped as neither queue nor buffer had room', 'dropped'),
+                                                ('sun2000_export_failures_total', 'counter', 'Failed deliveries to the sink', 'failures')):
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {metric_type}']
+        lines += [f'{name}{{sink="{exporter["sink"]}"}} {exporter[key]}' for exporter in instrumentation['exporters']]
+
+    return '\n'.join(lines) + '\n'
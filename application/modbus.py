@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import struct
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, AsyncContextManager, AsyncIterator
+
+from pymodbus.exceptions import ModbusIOException, ConnectionException
+
+READ_HOLDING_REGISTERS = 0x03
+
+
+class PipeliningRejected(ConnectionException):
+    """Raised if the connection failed while several requests were outstanding, i.e. the inverter might not support pipelined requests. generation
+    identifies the connection that failed."""
+    generation: int
+
+    def __init__(self, message: str, generation: int):
+        super().__init__(message)
+        self.generation = generation
+
+
+class AsyncModbusClient:
+    """Minimal asyncio Modbus TCP client, implementing the read holding registers function used for reading Sun2000 registers.
+
+    With a window larger than 1, up to window requests are sent before their responses arrive, the responses are matched to the requests by their
+    transaction id. If the connection fails while several requests are outstanding, the request is repeated alone on a fresh connection. Once that
+    confirmed max_rejections connections in a row, the client falls back to sending one request at a time and probes pipelining again after
+    probe_interval seconds.
+    """
+    host: str
+    port: int
+    unit: int
+    timeout: float
+    wait: float
+    window: int
+    max_rejections: int
+    probe_interval: float
+    pipelining: bool
+
+    def __init__(self, host: str, port: int, unit: int = 0, timeout: float = 5, wait: float = 2, window: int = 1, max_rejections: int = 3,
+                 probe_interval: float = 300):
+        self.host = host
+        self.port = port
+        self.unit = unit
+        self.timeout = timeout
+        # Like Sun2000.connect, wait for the inverter to accept requests after the connection was established
+        self.wait = wait
+        self.window = window
+        self.max_rejections = max_rejections
+        self.probe_interval = probe_interval
+        self.pipelining = window > 1
+
+        self.logger = logging.getLogger()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+        self._connect_lock = asyncio.Lock()
+        self._transaction_id = 0
+        self._slots = asyncio.Semaphore(max(window, 1))
+        # Slot of requests sent one at a time while pipelining is rejected, responses are still received by the receiver task. Repeated requests take it
+        # before all of the slots
+        self._single_slot = asyncio.Semaphore(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._receiver: Optional[asyncio.Task] = None
+        self._generation = 0
+        self._rejections = 0
+        self._rejected_generation = 0
+        self._probe_at = 0.0
+
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> bool:
+        async with self._connect_lock:
+            if self.is_connected():
+                return True
+
+            try:
+                self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                self.logger.error(f'Connection to inverter failed: {e}')
+                return False
+
+            self._generation += 1
+            await asyncio.sleep(self.wait)
+            self.logger.info('Successfully connected to inverter')
+            return True
+
+    async def close(self) -> None:
+        receiver, self._receiver = self._receiver, None
+        if receiver is not None:
+            receiver.cancel()
+            # The receiver has to stop reading before the connection is replaced
+            await asyncio.wait([receiver])
+        self.fail_pending(ConnectionException('Connection to inverter closed'))
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+        self._reader = None
+        self._writer = None
+
+    def next_transaction_id(self) -> int:
+        self._transaction_id = (self._transaction_id + 1) % 0x10000
+        return self._transaction_id
+
+    def request(self, transaction_id: int, address: int, quantity: int) -> bytes:
+        # MBAP header (transaction id, protocol id, length, unit id) followed by the request PDU
+        return struct.pack('>HHHBBHH', transaction_id, 0, 6, self.unit, READ_HOLDING_REGISTERS, address, quantity)
+
+    @staticmethod
+    def parse_response(pdu: bytes) -> bytes:
+        if pdu[0] & 0x80:
+            raise ModbusIOException(f'Inverter responded with exception code {pdu[1]}')
+        return pdu[2:2 + pdu[1]]
+
+    async def read_holding_registers(self, address: int, quantity: int) -> bytes:
+        """Read quantity registers starting at address, returning their raw content."""
+        if self.window <= 1:
+            return await self.read_sequential(address, quantity)
+
+        if not self.pipelining and time.monotonic() >= self._probe_at:
+            self.logger.info('Probing pipelined requests again')
+            self.pipelining = True
+            # A single confirmed rejection falls back again
+            self._rejections = self.max_rejections - 1
+
+        try:
+            return await self.read_pipelined(address, quantity, self._slots if self.pipelining else self._single_slot)
+        except PipeliningRejected as e:
+            rejection = e
+
+        # The request is repeated alone on a fresh connection, telling a rejection of pipelining from a connection failure
+        if self._generation == rejection.generation:
+            await self.close()
+        if not await self.connect():
+            raise ConnectionException('Connection to inverter could not be established')
+        pdu = await self.read_pipelined(address, quantity, self.exclusive())
+
+        # Requests failing together count as one rejection of their connection
+        if self._rejected_generation != rejection.generation:
+            self._rejected_generation = rejection.generation
+            self._rejections += 1
+            if self.pipelining and self._rejections >= self.max_rejections:
+                self.logger.warning(f'Inverter does not support pipelined requests, falling back to sequential requests for {self.probe_interval} seconds: '
+                                    f'{rejection}')
+                self.pipelining = False
+                self._probe_at = time.monotonic() + self.probe_interval
+        return pdu
+
+    @asynccontextmanager
+    async def exclusive(self) -> AsyncIterator[None]:
+        """Hold every slot, so a repeated request is the only one outstanding on the connection."""
+        async with self._single_slot:
+            acquired = 0
+            try:
+                while acquired < self.window:
+                    await self._slots.acquire()
+                    acquired += 1
+                yield
+            finally:
+                for _ in range(acquired):
+                    self._slots.release()
+
+    async def read_sequential(self, address: int, quantity: int) -> bytes:
+        if not self.is_connected():
+            raise ConnectionException('Inverter is not connected')
+
+        async with self._lock:
+            transaction_id = self.next_transaction_id()
+            self._writer.write(self.request(transaction_id, address, quantity))
+            try:
+                await self._writer.drain()
+                header = await asyncio.wait_for(self._reader.readexactly(7), self.timeout)
+                response_transaction_id, _, length, _ = struct.unpack('>HHHB', header)
+                pdu = await asyncio.wait_for(self._reader.readexactly(length - 1), self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                await self.close()
+                raise ConnectionException(f'Reading registers from inverter failed: {e!r}')
+
+        if response_transaction_id != transaction_id:
+            await self.close()
+            raise ConnectionException(f'Unexpected transaction id {response_transaction_id}, expected {transaction_id}')
+        return self.parse_response(pdu)
+
+    async def read_pipelined(self, address: int, quantity: int, slots: AsyncContextManager) -> bytes:
+        async with slots:
+            if not self.is_connected():
+                raise ConnectionException('Inverter is not connected')
+            generation = self._generation
+            if self._receiver is None or self._receiver.done():
+                self._receiver = asyncio.create_task(self.receive_responses(self._reader, generation))
+
+            transaction_id = self.next_transaction_id()
+            future = asyncio.get_running_loop().create_future()
+            self._pending[transaction_id] = future
+            pipelined = self.outstanding() > 1
+            self._writer.write(self.request(transaction_id, address, quantity))
+            try:
+                await self._writer.drain()
+                pdu = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                # A request timing out while others are outstanding is taken as the inverter not answering pipelined requests
+                error = self.create_error(f'Reading registers from inverter failed: {e!r}', generation)
+                self.fail_pending(error)
+                await self.close()
+                raise error
+            finally:
+                self._pending.pop(transaction_id, None)
+
+        # Pipelined requests were answered, earlier rejections were glitches
+        if pipelined:
+            self._rejections = 0
+        return self.parse_response(pdu)
+
+    def create_error(self, message: str, generation: int) -> ConnectionException:
+        return PipeliningRejected(message, generation) if self.outstanding() > 1 else ConnectionException(message)
+
+    async def receive_responses(self, reader: asyncio.StreamReader, generation: int) -> None:
+        """Resolve the pending requests with the responses received, until the connection fails."""
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                response_transaction_id, _, length, _ = struct.unpack('>HHHB', header)
+                pdu = await reader.readexactly(length - 1)
+                future = self._pending.get(response_transaction_id)
+                if future is None:
+                    raise ConnectionException(f'Unexpected transaction id {response_transaction_id}')
+                if not future.done():
+                    future.set_result(pdu)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.fail_pending(self.create_error(f'Reading registers from inverter failed: {e!r}', generation))
+            if self._writer is not None and self._generation == generation:
+                self._writer.close()
+
+    def outstanding(self) -> int:
+        return sum(1 for future in self._pending.values() if not future.done())
+
+    def fail_pending(self, error: Exception) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+                # Marked as retrieved in case the request already gave up waiting
+                future.exception()
+        self._pending.clear()
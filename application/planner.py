@@ -0,0 +1,78 @@
+import heapq
+from typing import List, Union, Any, Dict, Tuple
+
+from sun2000_modbus import datatypes
+from sun2000_modbus.registers import InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister
+
+# Maximum amount of registers a single Modbus read holding registers request may return
+MAX_BLOCK_QUANTITY = 125
+
+EquipmentRegister = Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]
+
+
+def address_key(register: EquipmentRegister) -> tuple:
+    return register.value.address, register.value.quantity
+
+
+# Registers of each equipment sorted by address once, reads are planned by picking the requested registers in this order
+SORTED_REGISTERS: Dict[type, Tuple[EquipmentRegister, ...]] = {
+    register_type: tuple(sorted(register_type, key=address_key))
+    for register_type in (InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister)
+}
+
+
+class ReadBlock:
+    address: int
+    quantity: int
+    registers: List[EquipmentRegister]
+
+    def __init__(self, register: EquipmentRegister):
+        self.address = register.value.address
+        self.quantity = register.value.quantity
+        self.registers = [register]
+
+    @property
+    def key(self) -> tuple:
+        return self.address, self.quantity
+
+    @property
+    def end_address(self) -> int:
+        return self.address + self.quantity
+
+    def can_include(self, register: EquipmentRegister, max_gap: int) -> bool:
+        register_end_address = register.value.address + register.value.quantity
+        if register.value.address - self.end_address > max_gap:
+            return False
+
+        return max(self.end_address, register_end_address) - self.address <= MAX_BLOCK_QUANTITY
+
+    def include(self, register: EquipmentRegister) -> None:
+        register_end_address = register.value.address + register.value.quantity
+        self.quantity = max(self.end_address, register_end_address) - self.address
+        self.registers.append(register)
+
+    def decode(self, payload: bytes, register: EquipmentRegister) -> Any:
+        offset = (register.value.address - self.address) * 2
+        return datatypes.decode(payload[offset:offset + register.value.quantity * 2], register.value.data_type)
+
+
+def plan_reads(registers: List[EquipmentRegister], max_gap: int = 0) -> List[ReadBlock]:
+    """Group the given registers into as few block reads as possible.
+
+    Registers are taken in address order and merged into one block as long as the gap to the previous register does not exceed max_gap and the block does not
+    exceed MAX_BLOCK_QUANTITY registers. Duplicate registers are read only once.
+    """
+    requested = set(registers)
+    register_types = dict.fromkeys(type(register) for register in requested)
+    sorted_registers = [[register for register in SORTED_REGISTERS[register_type] if register in requested] for register_type in register_types]
+    # Registers of several equipments share the address space of the inverter
+    unique_registers = sorted_registers[0] if len(sorted_registers) == 1 else heapq.merge(*sorted_registers, key=address_key)
+
+    blocks = []
+    for register in unique_registers:
+        if len(blocks) > 0 and blocks[-1].can_include(register, max_gap):
+            blocks[-1].include(register)
+        else:
+            blocks.append(ReadBlock(register))
+
+    return blocks
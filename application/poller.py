@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import List
+
+from .constants import ENV_POLL_INTERVAL, DEFAULT_POLL_INTERVAL, ENV_POLL_INVERTER_REGISTERS, ENV_POLL_BATTERY_REGISTERS, ENV_POLL_METER_REGISTERS
+from .exporter import Exporter, create_sinks, create_exporters, acquire_export_lock
+from .planner import EquipmentRegister
+from .util import Util, Equipment, EQUIPMENT_REGISTERS, get_equipment
+
+
+class Poller(threading.Thread):
+    """Background thread reading the configured registers on a fixed interval, keeping the snapshot cache of the given Util up to date."""
+    utilities: Util
+    interval: float
+    registers: List[EquipmentRegister]
+    exporters: List[Exporter]
+
+    def __init__(self, utilities: Util):
+        super().__init__(name='sun2000-poller', daemon=True)
+        self.utilities = utilities
+        self.interval = utilities.config.get(ENV_POLL_INTERVAL, DEFAULT_POLL_INTERVAL)
+        self._stopped = threading.Event()
+
+        self.registers = []
+        for equipment, config_key in ((Equipment.INVERTER, ENV_POLL_INVERTER_REGISTERS),
+                                      (Equipment.BATTERY, ENV_POLL_BATTERY_REGISTERS),
+                                      (Equipment.METER, ENV_POLL_METER_REGISTERS)):
+            register_members = EQUIPMENT_REGISTERS[equipment].__members__
+            for register_name in utilities.config.get(config_key, []):
+                if register_name not in register_members:
+                    exit(f'Error: Invalid register {register_name} configured for polling equipment {equipment.value}')
+                self.registers.append(register_members[register_name])
+
+        # The values read are pushed to the export sinks configured, instead of each consumer polling the API. Exporters are created once polling
+        self.sinks = create_sinks(utilities.config)
+        self.exporters = []
+        self._export_lock = None
+
+    def run(self) -> None:
+        self.utilities.logger.info(f'Polling {len(self.registers)} registers every {self.interval} seconds')
+        while not self._stopped.is_set():
+            self.poll()
+            self._stopped.wait(self.interval)
+
+    def poll(self) -> None:
+        if len(self.registers) == 0:
+            return
+
+        try:
+            registers_data = self.utilities.read_registers_data(self.registers)
+        except Exception as e:
+            self.utilities.logger.warning(f'Polling registers failed: {e}')
+            return
+
+        timestamp = time.time()
+        # Numeric values are recorded to the history
+        if self.utilities.history.capacity > 0:
+            for register, register_data in zip(self.registers, registers_data):
+                if register_data['type'] == 'number':
+                    self.utilities.history.record(register, timestamp, float(register_data['value']))
+
+        if self.is_exporting():
+            record = self.get_export_record(timestamp, registers_data)
+            for exporter in self.exporters:
+                # Waiting for a full queue is bounded by the interval to not delay the next read cycle
+                exporter.submit(record, timeout=self.interval)
+
+    def is_exporting(self) -> bool:
+        """Return whether this process exports, starting the exporters once it acquired the export lock. Without a broker every worker polls, only the
+        one holding the lock exports and another one takes over once it exits."""
+        if self._export_lock is None and len(self.sinks) > 0:
+            self._export_lock = acquire_export_lock(self.utilities.config)
+            if self._export_lock is not None:
+                self.exporters = create_exporters(self.utilities.config, self.sinks)
+                self.utilities.exporters = self.exporters
+                for exporter in self.exporters:
+                    exporter.start()
+        return self._export_lock is not None
+
+    def get_export_record(self, timestamp: float, registers_data: List[dict]) -> dict:
+        values = []
+        for register, register_data in zip(self.registers, registers_data):
+            if 'error' in register_data:
+                continue
+            value = register_data['value']
+            if register_data['type'] == 'number':
+                value = float(value) / register.value.gain if register.value.gain is not None else float(value)
+            values.append([get_equipment(register).value, register.name, value])
+        return {'timestamp': timestamp, 'inverter': self.utilities.inverter.name, 'values': values}
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for exporter in self.exporters:
+            exporter.stop()
+        if self._export_lock is not None:
+            self._export_lock.close()
+            self._export_lock = None
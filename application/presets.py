@@ -0,0 +1,37 @@
+from typing import List, Tuple
+
+from .planner import EquipmentRegister, ReadBlock, plan_reads
+
+
+class Preset:
+    """Named list of registers of one equipment, validated and planned once instead of per request."""
+    name: str
+    equipment_value: str
+    registers: List[EquipmentRegister]
+    blocks: List[ReadBlock]
+
+    def __init__(self, name: str, equipment_value: str, registers: List[EquipmentRegister], max_gap: int = 0):
+        self.name = name
+        self.equipment_value = equipment_value
+        self.registers = list(registers)
+        self.blocks = plan_reads(self.registers, max_gap)
+
+    def describe(self) -> dict:
+        return {'name': self.name, 'equipment': self.equipment_value, 'registers': [register.name for register in self.registers]}
+
+
+def is_valid_preset_name(name) -> bool:
+    return isinstance(name, str) and 0 < len(name) <= 64 and all(character.isalnum() or character in '-_.' for character in name)
+
+
+def parse_presets(entries: List[str]) -> List[Tuple[str, str, List[str]]]:
+    """Parse presets configured as <name>=<equipment>:<register>[;<register>...] to tuples of name, equipment value and register names, raising
+    ValueError on invalid entries."""
+    presets = []
+    for entry in entries:
+        name, _, definition = entry.partition('=')
+        equipment_value, _, register_names = definition.partition(':')
+        if not is_valid_preset_name(name) or len(equipment_value) == 0 or len(register_names) == 0:
+            raise ValueError(f'Invalid preset {entry} configured')
+        presets.append((name, equipment_value, register_names.split(';')))
+    return presets
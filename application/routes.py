@@ -1,34 +1,62 @@
+import json
 import logging
+import math
+import time
+from typing import Optional
 
 import werkzeug.exceptions
-from flask import Blueprint, jsonify, request, Response, abort
+from flask import Blueprint, jsonify, request, Response, abort, g
 from flask import current_app as app
-from sun2000_modbus.registers import InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister
 
-from application.util import Util, Equipment
+from application import encoding, metrics, timing
+from application.constants import ENV_STREAM_INTERVAL, DEFAULT_STREAM_INTERVAL, ENV_STREAM_MAX_SUBSCRIPTIONS, DEFAULT_STREAM_MAX_SUBSCRIPTIONS
+from application.poller import Poller
+from application.streaming import StreamHub, Subscription
+from application.util import Util, Equipment, get_equipment
 
 utilities = Util(app)
+poller = Poller(utilities)
+hub = StreamHub(utilities, utilities.config.get(ENV_STREAM_INTERVAL, DEFAULT_STREAM_INTERVAL),
+                utilities.config.get(ENV_STREAM_MAX_SUBSCRIPTIONS, DEFAULT_STREAM_MAX_SUBSCRIPTIONS))
 bp = Blueprint('routes', __name__)
 
 
+@bp.before_request
+def start_timing() -> None:
+    g.profile = utilities.profiler.start()
+    if utilities.timing_enabled:
+        g.timing = timing.RequestTiming()
+        g.timing_token = timing.current_timing.set(g.timing)
+
+
+@bp.after_request
+def finish_timing(response: Response) -> Response:
+    if 'timing' in g:
+        total = time.perf_counter() - g.timing.started
+        response.headers['Server-Timing'] = g.timing.server_timing(total)
+        utilities.timing_stats.record(request.url_rule.rule if request.url_rule is not None else request.path, g.timing, total)
+    return response
+
+
+@bp.teardown_request
+def stop_timing(error) -> None:
+    if g.get('profile') is not None:
+        utilities.profiler.stop(g.profile)
+    if 'timing_token' in g:
+        timing.current_timing.reset(g.timing_token)
+
+
 @bp.get('/registers')
 def get_registers() -> Response:
     utilities.logger.debug('GET /registers called')
     utilities.validate_auth_header()
 
     equipment = utilities.validate_equipment(request.args.get('equipment'))
+    equipment_catalogue = utilities.catalogue.equipments[equipment.value]
 
-    registers = []
-    if equipment == Equipment.INVERTER:
-        registers = [item.name for item in InverterEquipmentRegister]
-    elif equipment == Equipment.BATTERY:
-        registers = [item.name for item in BatteryEquipmentRegister]
-    elif equipment == Equipment.METER:
-        registers = [item.name for item in MeterEquipmentRegister]
-
-    response = {'equipment': equipment.value, 'registers': registers}
-
-    return jsonify(response)
+    response = Response(equipment_catalogue.registers_body, mimetype='application/json')
+    response.set_etag(equipment_catalogue.registers_etag)
+    return response.make_conditional(request)
 
 
 @bp.post('/register-values')
@@ -36,21 +64,291 @@ def post_register_values() -> Response:
     utilities.logger.debug('POST /register-values called')
     utilities.validate_auth_header()
 
-    if 'equipment' not in request.get_json():
+    body = utilities.validate_body(request.get_json())
+    inverter_name = utilities.validate_inverter(body.get('inverter'))
+
+    # Clients passing the version of their last response receive the registers changed since only
+    since = body.get('since')
+    if since is not None and not isinstance(since, str):
+        abort(400, 'Invalid value for since')
+
+    if 'preset' in body:
+        if not isinstance(body['preset'], str):
+            abort(400, 'Invalid value for preset')
+        # Registers of presets are validated and their reads planned once
+        equipment_value, registers, version, changed_registers, registers_data = \
+            utilities.get_preset_changes(body['preset'], since, inverter_name)
+    else:
+        if 'equipment' not in body:
+            abort(400, 'No value for equipment')
+        equipment_value = utilities.validate_equipment(body['equipment']).value
+
+        if 'registers' not in body:
+            abort(400, 'No value for registers')
+        register_names = body['registers']
+        registers = utilities.validate_registers(Equipment(equipment_value), register_names)
+
+        version, changed_registers, registers_data = utilities.get_registers_changes(registers, since, inverter_name)
+
+    # Compact formats are opt-in through the Accept header, each format has its own ETag
+    mimetype = request.accept_mimetypes.best_match(encoding.MIMETYPES, default=encoding.JSON_MIMETYPE)
+    etag = f'{encoding.get_registers_digest(equipment_value, tuple(registers), mimetype)}-{version}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept'
+        return response
+
+    envelope = {}
+    if inverter_name is not None:
+        envelope.update({'inverter': inverter_name})
+    if 'since' in body:
+        envelope.update({'version': version})
+
+    with timing.phase('serialize'):
+        if mimetype == encoding.COLUMNAR_MIMETYPE:
+            response = Response(encoding.encode_columnar_json(equipment_value, changed_registers, registers_data, envelope), mimetype=mimetype)
+        elif mimetype == encoding.MSGPACK_MIMETYPE:
+            response = Response(encoding.encode_msgpack(equipment_value, changed_registers, registers_data, envelope), mimetype=mimetype)
+        else:
+            response = jsonify({'equipment': equipment_value, 'registers': registers_data, **envelope})
+
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept'
+    response.headers['X-Registers-Version'] = version
+    return response
+
+
+@bp.post('/register-values/batch')
+def post_register_values_batch() -> Response:
+    utilities.logger.debug('POST /register-values/batch called')
+    utilities.validate_auth_header()
+
+    body = utilities.validate_body(request.get_json())
+    equipment_requests = body.get('equipments')
+    if not isinstance(equipment_requests, list) or len(equipment_requests) == 0:
+        abort(400, 'No value for equipments')
+    if not all(isinstance(equipment_request, dict) for equipment_request in equipment_requests):
+        abort(400, 'Invalid value for equipments')
+    inverter_name = utilities.validate_inverter(body.get('inverter'))
+
+    # Invalid equipments and registers are reported per item, the valid registers of all equipments are read together
+    responses = []
+    registers = {}
+    for equipment_request in equipment_requests:
+        try:
+            equipment = utilities.validate_equipment(equipment_request.get('equipment'))
+        except werkzeug.exceptions.HTTPException as e:
+            responses.append({'equipment': equipment_request.get('equipment'), 'error': e.description})
+            continue
+
+        register_names = equipment_request.get('registers')
+        if not isinstance(register_names, list) or len(register_names) == 0:
+            responses.append({'equipment': equipment.value, 'error': 'No value for registers'})
+            continue
+
+        register_members = utilities.catalogue.equipments[equipment.value].registers
+        equipment_registers = [register_members.get(register_name) if isinstance(register_name, str) else None for register_name in register_names]
+        registers.update(dict.fromkeys(register for register in equipment_registers if register is not None))
+        responses.append({'equipment': equipment.value, 'registers': list(zip(register_names, equipment_registers))})
+
+    registers_data = {}
+    if len(registers) > 0:
+        registers_data = dict(zip(registers, utilities.get_registers_data(list(registers), partial=True, report_age=True, inverter_name=inverter_name)))
+
+    for response in responses:
+        if 'registers' in response:
+            response['registers'] = [registers_data[register] if register is not None else {'name': register_name, 'error': 'Invalid register'}
+                                     for register_name, register in response['registers']]
+
+    response = {'equipments': responses}
+    if inverter_name is not None:
+        response.update({'inverter': inverter_name})
+    with timing.phase('serialize'):
+        return jsonify(response)
+
+
+@bp.get('/presets')
+def get_presets() -> Response:
+    utilities.logger.debug('GET /presets called')
+    utilities.validate_auth_header()
+
+    return jsonify({'presets': utilities.get_presets()})
+
+
+@bp.put('/presets/<name>')
+def put_preset(name: str) -> Response:
+    utilities.logger.debug(f'PUT /presets/{name} called')
+    utilities.validate_auth_header()
+
+    body = utilities.validate_body(request.get_json())
+    if 'equipment' not in body:
+        abort(400, 'No value for equipment')
+    equipment = utilities.validate_equipment(body['equipment'])
+
+    if 'registers' not in body:
+        abort(400, 'No value for registers')
+    registers = utilities.validate_registers(equipment, body['registers'])
+
+    return jsonify(utilities.define_preset(name, registers))
+
+
+@bp.get('/inverters')
+def get_inverters() -> Response:
+    utilities.logger.debug('GET /inverters called')
+    utilities.validate_auth_header()
+
+    return jsonify({'inverters': [inverter.describe() for inverter in utilities.inverters.values()]})
+
+
+@bp.post('/inverters/register-values')
+def post_inverters_register_values() -> Response:
+    utilities.logger.debug('POST /inverters/register-values called')
+    utilities.validate_auth_header()
+
+    body = utilities.validate_body(request.get_json())
+    if 'equipment' not in body:
         abort(400, 'No value for equipment')
-    equipment = utilities.validate_equipment(request.get_json()['equipment'])
+    equipment = utilities.validate_equipment(body['equipment'])
 
-    if 'registers' not in request.get_json():
+    if 'registers' not in body:
         abort(400, 'No value for registers')
-    register_names = request.get_json()['registers']
+    registers = utilities.validate_registers(equipment, body['registers'])
+
+    # All inverters are read concurrently, registers that could not be read carry an error message
+    inverters_registers_data = utilities.get_inverters_registers_data(registers)
+    response = {
+        'equipment': equipment.value,
+        'inverters': [{'inverter': inverter_name, 'registers': registers_data} for inverter_name, registers_data in inverters_registers_data.items()]
+    }
+
+    with timing.phase('serialize'):
+        return jsonify(response)
+
+
+@bp.get('/register-values/stream')
+def get_register_values_stream() -> Response:
+    utilities.logger.debug('GET /register-values/stream called')
+    utilities.validate_auth_header()
+
+    equipment = utilities.validate_equipment(request.args.get('equipment'))
+
+    register_names = [register_name for register_name in request.args.get('registers', '').split(',') if len(register_name) > 0]
     registers = utilities.validate_registers(equipment, register_names)
 
-    registers_data = utilities.get_registers_data(registers)
-    response = {'equipment': equipment.value, 'registers': registers_data}
+    interval = parse_number_arg('interval', None)
+    if interval is not None and interval <= 0:
+        abort(400, 'Invalid value for interval')
+
+    subscription = Subscription(equipment, registers, interval)
+    if not hub.subscribe(subscription):
+        abort(503, 'Maximum amount of streaming clients reached')
+
+    def events():
+        try:
+            while True:
+                event = subscription.next_event(hub.interval * 2)
+                if event is None:
+                    # Comment lines keep the connection open and detect disconnected clients
+                    yield ': keep-alive\n\n'
+                else:
+                    yield f'event: {event[0]}\ndata: {json.dumps(event[1])}\n\n'
+        finally:
+            hub.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+@bp.get('/register-history')
+def get_register_history() -> Response:
+    utilities.logger.debug('GET /register-history called')
+    utilities.validate_auth_header()
+
+    equipment = utilities.validate_equipment(request.args.get('equipment'))
+
+    if not request.args.get('register'):
+        abort(400, 'No value for register')
+    register = utilities.validate_registers(equipment, [request.args.get('register')])[0]
+
+    end = parse_number_arg('end', time.time())
+    start = parse_number_arg('start', end - 86400)
+    step = parse_number_arg('step', None)
+    if step is not None and step <= 0:
+        abort(400, 'Invalid value for step')
+
+    values = utilities.get_register_history(register, start, end, step)
+    if values is None:
+        abort(404, 'No history recorded for register')
+
+    response = {'equipment': equipment.value, 'register': register.name, 'values': values}
+    if register.value.gain is not None:
+        response.update({'gain': register.value.gain})
+    if register.value.unit is not None:
+        response.update({'unit': register.value.unit})
 
     return jsonify(response)
 
 
+def parse_number_arg(name: str, default: Optional[float]) -> Optional[float]:
+    if not request.args.get(name):
+        return default
+
+    try:
+        value = float(request.args.get(name))
+    except ValueError:
+        abort(400, f'Invalid value for {name}')
+    # float accepts nan and inf, which no number argument allows
+    if not math.isfinite(value):
+        abort(400, f'Invalid value for {name}')
+    return value
+
+
+@bp.get('/metrics')
+def get_metrics() -> Response:
+    utilities.logger.debug('GET /metrics called')
+    utilities.validate_auth_header()
+
+    # The numeric registers configured for polling are exported, served from the snapshot cache if polling is enabled
+    registers = [register for register in poller.registers if register.value.gain is not None]
+    registers_data = []
+    up = True
+    if len(registers) > 0:
+        # The instrumentation is rendered regardless of the inverter being readable
+        try:
+            registers_data = utilities.get_registers_data(registers)
+        except werkzeug.exceptions.HTTPException as e:
+            utilities.logger.warning(f'Reading registers for metrics failed: {e.description}')
+            up = False
+        except Exception as e:
+            utilities.logger.warning(f'Reading registers for metrics failed: {e}')
+            up = False
+
+    exported_registers = [(get_equipment(register).value, register, register_data) for register, register_data in zip(registers, registers_data)]
+    return Response(metrics.render(exported_registers, utilities.get_instrumentation(), up), content_type=metrics.CONTENT_TYPE)
+
+
+@bp.get('/stats')
+def get_stats() -> Response:
+    utilities.logger.debug('GET /stats called')
+    utilities.validate_auth_header()
+
+    stats = utilities.timing_stats.snapshot()
+    stats.update({'enabled': utilities.timing_enabled})
+    return jsonify(stats)
+
+
+@bp.get('/stats/profile')
+def get_stats_profile() -> Response:
+    utilities.logger.debug('GET /stats/profile called')
+    utilities.validate_auth_header()
+
+    limit = parse_number_arg('limit', 30)
+    if limit < 1:
+        abort(400, 'Invalid value for limit')
+
+    return Response(utilities.profiler.report(int(limit)), mimetype='text/plain')
+
+
 @bp.errorhandler(werkzeug.exceptions.HTTPException)
 def handle_bad_request(error) -> Response:
     utilities.logger.debug(f'Handling error {error}')
@@ -61,4 +359,22 @@ def handle_bad_request(error) -> Response:
 
 @bp.get('/health')
 def get_health() -> Response:
-    return Response(status=204)
+    return jsonify(utilities.get_health())
+
+
+@bp.get('/health/live')
+def get_health_live() -> Response:
+    # Liveness does not depend on the inverter, the process answering is sufficient
+    return jsonify({'status': 'alive'})
+
+
+@bp.get('/health/ready')
+def get_health_ready() -> Response:
+    try:
+        readiness = utilities.get_readiness()
+    except werkzeug.exceptions.HTTPException as e:
+        readiness = {'ready': False, 'reason': e.description}
+
+    response = jsonify(readiness)
+    response.status_code = 200 if readiness['ready'] else 503
+    return response
@@ -0,0 +1,55 @@
+import threading
+from typing import Any, Dict, Hashable, List, Tuple
+
+
+class Flight:
+    """A single in-flight call, shared by all callers asking for the same key in the meantime."""
+    result: Any
+    error: BaseException
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    def land(self, result: Any = None, error: BaseException = None) -> None:
+        self.result = result
+        self.error = error
+        self._done.set()
+
+    def wait(self) -> Any:
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same keys into one call per key.
+
+    Callers join a set of keys at once and lead the flights of all keys that are not in flight yet. They must land all led flights before waiting for the
+    joined ones, so flights never wait for each other in a cycle.
+    """
+    flights: Dict[Hashable, Flight]
+
+    def __init__(self):
+        self.flights = {}
+        self._lock = threading.Lock()
+
+    def join(self, keys: List[Hashable]) -> Tuple[Dict[Hashable, Flight], Dict[Hashable, Flight]]:
+        """Return the flights led by the caller and the flights of other callers joined, each by key."""
+        led = {}
+        joined = {}
+        with self._lock:
+            for key in keys:
+                if key in self.flights:
+                    joined[key] = self.flights[key]
+                else:
+                    led[key] = self.flights[key] = Flight()
+
+        return led, joined
+
+    def land(self, key: Hashable, result: Any = None, error: BaseException = None) -> None:
+        with self._lock:
+            flight = self.flights.pop(key)
+        flight.land(result, error)
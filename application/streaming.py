@@ -0,0 +1,125 @@
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
+
+import werkzeug.exceptions
+
+from .planner import EquipmentRegister
+from .util import Util, Equipment
+
+
+class Subscription:
+    """Registers of one equipment a streaming client subscribed to, holding the latest values read for them."""
+    equipment: Equipment
+    registers: List[EquipmentRegister]
+    interval: Optional[float]
+
+    def __init__(self, equipment: Equipment, registers: List[EquipmentRegister], interval: Optional[float] = None):
+        self.equipment = equipment
+        self.registers = registers
+        # Without interval only changed values are sent, otherwise all values are sent at least every interval seconds
+        self.interval = interval
+
+        self._condition = threading.Condition()
+        self._version = 0
+        self._sent_version = 0
+        self._registers_data: Dict[str, dict] = {}
+        self._error: Optional[str] = None
+        self._sent_registers_data: Dict[str, dict] = {}
+        self._last_sent = 0.0
+
+    def publish(self, registers_data: List[dict] = None, error: str = None) -> None:
+        with self._condition:
+            if registers_data is not None:
+                self._registers_data = {register_data['name']: register_data for register_data in registers_data}
+            self._error = error
+            self._version += 1
+            self._condition.notify_all()
+
+    def next_event(self, timeout: float) -> Optional[Tuple[str, dict]]:
+        """Wait up to timeout seconds for the next event to send, returned as tuple of event type and data."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._version != self._sent_version or self.interval_elapsed(), timeout)
+            self._sent_version = self._version
+
+            if self._error is not None:
+                error, self._error = self._error, None
+                return 'error', {'message': error}
+
+            if self.interval_elapsed():
+                registers_data = [self._registers_data[register.name] for register in self.registers if register.name in self._registers_data]
+            else:
+                registers_data = [self._registers_data[register.name] for register in self.registers
+                                  if register.name in self._registers_data
+                                  and self._registers_data[register.name] != self._sent_registers_data.get(register.name)]
+            if len(registers_data) == 0:
+                return None
+
+            self._sent_registers_data.update((register_data['name'], register_data) for register_data in registers_data)
+            self._last_sent = time.monotonic()
+            return 'values', {'equipment': self.equipment.value, 'registers': registers_data}
+
+    def interval_elapsed(self) -> bool:
+        return self.interval is not None and len(self._registers_data) > 0 and time.monotonic() - self._last_sent >= self.interval
+
+
+class StreamHub:
+    """Single poll loop reading the registers of all subscriptions at once and publishing the values to the subscriptions.
+
+    Each subscription occupies a thread of the WSGI server for as long as it is open, so at most max_subscriptions are accepted.
+    """
+    utilities: Util
+    interval: float
+    max_subscriptions: int
+    subscriptions: List[Subscription]
+
+    def __init__(self, utilities: Util, interval: float, max_subscriptions: int):
+        self.utilities = utilities
+        self.interval = interval
+        self.max_subscriptions = max_subscriptions
+        self.subscriptions = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, subscription: Subscription) -> bool:
+        """Add the subscription, return False if the maximum amount of subscriptions is reached."""
+        with self._lock:
+            if len(self.subscriptions) >= self.max_subscriptions:
+                return False
+            self.subscriptions.append(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name='sun2000-stream-hub', daemon=True)
+                self._thread.start()
+            return True
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self.subscriptions.remove(subscription)
+
+    def run(self) -> None:
+        while True:
+            with self._lock:
+                if len(self.subscriptions) == 0:
+                    self._thread = None
+                    return
+                subscriptions = list(self.subscriptions)
+
+            self.poll(subscriptions)
+            time.sleep(self.interval)
+
+    def poll(self, subscriptions: List[Subscription]) -> None:
+        registers = list(dict.fromkeys(register for subscription in subscriptions for register in subscription.registers))
+        try:
+            registers_data = dict(zip(registers, self.utilities.get_registers_data(registers)))
+        except werkzeug.exceptions.HTTPException as e:
+            for subscription in subscriptions:
+                subscription.publish(error=e.description)
+            return
+        except Exception as e:
+            self.utilities.logger.warning(f'Reading registers for streaming failed: {e}')
+            for subscription in subscriptions:
+                subscription.publish(error='Reading registers from inverter failed')
+            return
+
+        for subscription in subscriptions:
+            subscription.publish([registers_data[register] for register in subscription.registers])
@@ -0,0 +1,197 @@
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds in seconds of the phase duration histogram buckets
+PHASE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Timing of the request handled in the current context, None if timing is disabled
+current_timing: ContextVar[Optional['RequestTiming']] = ContextVar('current_timing', default=None)
+
+_NO_PHASE = nullcontext()
+
+
+class Phase:
+    timing: 'RequestTiming'
+    name: str
+
+    def __init__(self, timing: 'RequestTiming', name: str):
+        self.timing = timing
+        self.name = name
+        self._started = 0.0
+
+    def __enter__(self) -> 'Phase':
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.timing.add(self.name, time.perf_counter() - self._started)
+
+
+class RequestTiming:
+    """Durations of the phases of one request, a phase entered several times (e.g. reading several blocks) is observed each time."""
+    started: float
+    observations: List[Tuple[str, float]]
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.observations = []
+        self._lock = threading.Lock()
+
+    def phase(self, name: str) -> Phase:
+        return Phase(self, name)
+
+    def add(self, name: str, duration: float) -> None:
+        with self._lock:
+            self.observations.append((name, duration))
+
+    def totals(self) -> Dict[str, Tuple[float, int]]:
+        """Return the summed duration and count of observations per phase, in order of first observation."""
+        totals = {}
+        with self._lock:
+            for name, duration in self.observations:
+                total, count = totals.get(name, (0.0, 0))
+                totals[name] = (total + duration, count + 1)
+        return totals
+
+    def server_timing(self, total: float) -> str:
+        metrics = [f'{name};dur={duration * 1000:.2f}' + (f';desc="{count}x"' if count > 1 else '') for name, (duration, count) in self.totals().items()]
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+def phase(name: str):
+    """Return a context manager timing the named phase of the current request, doing nothing if timing is disabled."""
+    timing = current_timing.get()
+    if timing is None:
+        return _NO_PHASE
+    return timing.phase(name)
+
+
+class RollingHistogram:
+    """Histogram of the values observed within the last window seconds, kept as one bucket count per slot of window / slots seconds."""
+    buckets: Tuple[float, ...]
+    window: float
+
+    def __init__(self, window: float, slots: int = 10, buckets: Tuple[float, ...] = PHASE_BUCKETS):
+        self.buckets = buckets
+        self.window = window
+        self._slot_duration = window / slots
+        self._slots: List[Optional[list]] = [None] * slots
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, now: float = None) -> None:
+        slot_id = int((now if now is not None else time.monotonic()) / self._slot_duration)
+        index = next((index for index, bucket in enumerate(self.buckets) if value <= bucket), len(self.buckets))
+        with self._lock:
+            slot = self._slots[slot_id % len(self._slots)]
+            if slot is None or slot[0] != slot_id:
+                # The slot is reused after a whole window passed
+                slot = [slot_id, [0] * (len(self.buckets) + 1), 0.0]
+                self._slots[slot_id % len(self._slots)] = slot
+            slot[1][index] += 1
+            slot[2] += value
+
+    def snapshot(self, now: float = None) -> dict:
+        """Return count, sum, estimated percentiles and cumulative bucket counts of the values observed within the window."""
+        slot_id = int((now if now is not None else time.monotonic()) / self._slot_duration)
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        with self._lock:
+            for slot in self._slots:
+                if slot is not None and slot_id - slot[0] < len(self._slots):
+                    counts = [count + slot_count for count, slot_count in zip(counts, slot[1])]
+                    total += slot[2]
+
+        count = sum(counts)
+        cumulative = []
+        running = 0
+        for bucket, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative.append((bucket, running))
+
+        snapshot = {'count': count, 'sum': total, 'buckets': cumulative}
+        for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+            snapshot[name] = self.percentile(cumulative, count, fraction)
+        return snapshot
+
+    @staticmethod
+    def percentile(cumulative: List[Tuple[float, int]], count: int, fraction: float) -> Optional[float]:
+        # Estimated as the upper bound of the bucket holding the percentile, None if it is beyond the largest bucket
+        if count == 0:
+            return None
+        return next((bucket for bucket, running in cumulative if running >= fraction * count), None)
+
+
+class TimingStats:
+    """Rolling histograms of the phase durations per request path."""
+    window: float
+    histograms: Dict[Tuple[str, str], RollingHistogram]
+
+    def __init__(self, window: float):
+        self.window = window
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, path: str, timing: RequestTiming, total: float) -> None:
+        for name, duration in timing.observations + [('total', total)]:
+            histogram = self.histograms.get((path, name))
+            if histogram is None:
+                with self._lock:
+                    histogram = self.histograms.setdefault((path, name), RollingHistogram(self.window))
+            histogram.observe(duration)
+
+    def snapshot(self) -> dict:
+        paths = {}
+        for (path, name), histogram in list(self.histograms.items()):
+            paths.setdefault(path, {})[name] = histogram.snapshot()
+        return {'window': self.window, 'paths': paths}
+
+
+class Profiler:
+    """Profiles a random sample of requests, aggregating the profiles of all sampled requests."""
+    sample_rate: float
+    samples: int
+
+    def __init__(self, sample_rate: float):
+        self.sample_rate = sample_rate
+        self.samples = 0
+        self._stats: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Start profiling the current request if sampled, return the running profile or None."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in this thread
+            return None
+        return profile
+
+    def stop(self, profile: cProfile.Profile) -> None:
+        profile.disable()
+        with self._lock:
+            self.samples += 1
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    def report(self, limit: int = 30) -> str:
+        """Return the functions of the sampled requests taking most time cumulatively, as printed by pstats."""
+        with self._lock:
+            if self._stats is None:
+                return f'No requests profiled, sample rate is {self.sample_rate}\n'
+            output = io.StringIO()
+            self._stats.stream = output
+            self._stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+            return f'{self.samples} requests profiled\n' + output.getvalue()
@@ -1,15 +1,37 @@
 import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import List, Union
+from typing import List, Union, Any, Optional, Dict, Tuple
 
+import werkzeug.exceptions
 from flask import Flask, Config
 from flask import request, abort
-from sun2000_modbus import inverter
+from pymodbus.exceptions import ConnectionException
 from sun2000_modbus.datatypes import DataType
-from sun2000_modbus.inverter import Sun2000
 from sun2000_modbus.registers import InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister
 
-from .constants import ENV_INVERTER_HOST, ENV_INVERTER_PORT, ENV_ACCEPTED_API_KEYS, ENV_LOG_LEVEL
+from .broker import BrokerClient, get_authkey
+from .cache import SnapshotCache, CacheEntry
+from .catalogue import Catalogue
+from .connection import InverterConnection
+from .inverters import Inverter, parse_inverters
+from .history import HistoryStore
+from .metrics import ReadMetrics
+from .constants import ENV_INVERTER_HOST, ENV_INVERTER_PORT, ENV_ACCEPTED_API_KEYS, ENV_LOG_LEVEL, ENV_READ_MAX_GAP, DEFAULT_READ_MAX_GAP, ENV_POLL_INTERVAL, \
+    DEFAULT_POLL_INTERVAL, ENV_CACHE_MAX_AGE, DEFAULT_CACHE_MAX_AGE, ENV_INVERTER_KEEP_ALIVE, DEFAULT_INVERTER_KEEP_ALIVE, ENV_RECONNECT_BACKOFF, \
+    DEFAULT_RECONNECT_BACKOFF, ENV_RECONNECT_MAX_BACKOFF, DEFAULT_RECONNECT_MAX_BACKOFF, ENV_BROKER_ADDRESS, ENV_HISTORY_SIZE, DEFAULT_HISTORY_SIZE, \
+    ENV_HISTORY_PATH, ENV_CACHE_SLOW_TTL, DEFAULT_CACHE_SLOW_TTL, ENV_CACHE_FAST_TTL, DEFAULT_CACHE_FAST_TTL, ENV_CACHE_VOLATILITY, \
+    ENV_INVERTERS, DEFAULT_INVERTER_NAME, ENV_TIMING_ENABLED, DEFAULT_TIMING_ENABLED, ENV_TIMING_WINDOW, DEFAULT_TIMING_WINDOW, ENV_PROFILE_SAMPLE_RATE, \
+    DEFAULT_PROFILE_SAMPLE_RATE, ENV_BREAKER_THRESHOLD, DEFAULT_BREAKER_THRESHOLD, ENV_BREAKER_PROBE_INTERVAL, DEFAULT_BREAKER_PROBE_INTERVAL, \
+    ENV_BREAKER_SERVE_STALE, DEFAULT_BREAKER_SERVE_STALE, ENV_PRESETS
+from .planner import plan_reads, ReadBlock
+from .presets import Preset, parse_presets, is_valid_preset_name
+from .singleflight import SingleFlight
+from .timing import TimingStats, Profiler, phase
+from .volatility import CachePolicy, Volatility
 
 
 class Equipment(Enum):
@@ -18,107 +40,471 @@ class Equipment(Enum):
     METER = 'meter'
 
 
+EQUIPMENT_REGISTERS = {
+    Equipment.INVERTER: InverterEquipmentRegister,
+    Equipment.BATTERY: BatteryEquipmentRegister,
+    Equipment.METER: MeterEquipmentRegister
+}
+
+
+def get_equipment(register: Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]) -> Equipment:
+    return next(equipment for equipment, register_type in EQUIPMENT_REGISTERS.items() if isinstance(register, register_type))
+
+
+def get_error_message(error: Exception) -> str:
+    if isinstance(error, werkzeug.exceptions.HTTPException):
+        return error.description
+    return str(error) or type(error).__name__
+
+
+def with_age(register_data: dict, age: float) -> dict:
+    if 'error' in register_data:
+        return register_data
+    return dict(register_data, age=round(age, 1))
+
+
 class Util:
     config: Config
     logger: logging.Logger
-    sun2000: Sun2000
+    inverters: Dict[str, Inverter]
+    inverter: Inverter
+    connection: InverterConnection
+    cache: SnapshotCache
+    broker: Optional[BrokerClient]
+    flights: SingleFlight
+    read_metrics: ReadMetrics
+    catalogue: Catalogue
+    history: HistoryStore
+    exporters: list
+    cache_policy: CachePolicy
+    executor: ThreadPoolExecutor
+    timing_enabled: bool
+    timing_stats: TimingStats
+    profiler: Profiler
+    warm_up: threading.Thread
+    warmed_up: threading.Event
+    presets: Dict[str, Preset]
 
-    def __init__(self, app: Flask):
+    def __init__(self, app: Flask, use_broker: bool = True, check_connection: bool = True):
         self.config = app.config
+        self.catalogue = Catalogue(EQUIPMENT_REGISTERS)
+        self.history = HistoryStore(self.config.get(ENV_HISTORY_SIZE, DEFAULT_HISTORY_SIZE), self.config.get(ENV_HISTORY_PATH))
+        # Set by the poller once this process exports
+        self.exporters = []
+        self.cache_policy = CachePolicy(EQUIPMENT_REGISTERS.values(), self.config.get(ENV_CACHE_SLOW_TTL, DEFAULT_CACHE_SLOW_TTL),
+                                        self.config.get(ENV_CACHE_FAST_TTL, DEFAULT_CACHE_FAST_TTL), self.get_volatility_overrides())
+        self.timing_enabled = self.config.get(ENV_TIMING_ENABLED, DEFAULT_TIMING_ENABLED)
+        self.timing_stats = TimingStats(self.config.get(ENV_TIMING_WINDOW, DEFAULT_TIMING_WINDOW))
+        self.profiler = Profiler(self.config.get(ENV_PROFILE_SAMPLE_RATE, DEFAULT_PROFILE_SAMPLE_RATE))
+        self.presets = self.get_configured_presets()
 
         self.logger = logging.getLogger()
         self.logger.setLevel(self.config[ENV_LOG_LEVEL])
         self.logger.info('Initializing REST interface for Sun2000 inverter')
-        self.logger.info(f'Inverter will be contacted on: host = {self.config[ENV_INVERTER_HOST]}, port = {self.config[ENV_INVERTER_PORT]}')
         self.logger.info(f'Log level set to {self.config[ENV_LOG_LEVEL]}')
 
-        self.sun2000 = inverter.Sun2000(self.config[ENV_INVERTER_HOST], self.config[ENV_INVERTER_PORT])
-        self.check_inverter_connection()
+        inverters = [(DEFAULT_INVERTER_NAME, self.config[ENV_INVERTER_HOST], self.config[ENV_INVERTER_PORT], 0)]
+        if self.config.get(ENV_INVERTERS):
+            try:
+                inverters = parse_inverters(self.config[ENV_INVERTERS], self.config[ENV_INVERTER_PORT])
+            except ValueError as e:
+                exit(f'Error: {e}')
+
+        self.inverters = {}
+        for name, host, port, unit in inverters:
+            self.logger.info(f'Inverter {name} will be contacted on: host = {host}, port = {port}, unit = {unit}')
+            self.inverters[name] = Inverter(name, host, port, unit,
+                                            keep_alive=self.config.get(ENV_INVERTER_KEEP_ALIVE, DEFAULT_INVERTER_KEEP_ALIVE),
+                                            backoff=self.config.get(ENV_RECONNECT_BACKOFF, DEFAULT_RECONNECT_BACKOFF),
+                                            max_backoff=self.config.get(ENV_RECONNECT_MAX_BACKOFF, DEFAULT_RECONNECT_MAX_BACKOFF),
+                                            breaker_threshold=self.config.get(ENV_BREAKER_THRESHOLD, DEFAULT_BREAKER_THRESHOLD),
+                                            probe_interval=self.config.get(ENV_BREAKER_PROBE_INTERVAL, DEFAULT_BREAKER_PROBE_INTERVAL))
+        self.executor = ThreadPoolExecutor(max_workers=len(self.inverters), thread_name_prefix='sun2000-fan-out')
+
+        # The first inverter is addressed unless another one is requested, polling, history and metrics are kept for it only
+        self.inverter = next(iter(self.inverters.values()))
+        self.connection = self.inverter.connection
+        self.cache = self.inverter.cache
+        self.flights = self.inverter.flights
+        self.read_metrics = self.inverter.read_metrics
+
+        # Connections are established in the background, startup does not depend on the inverters being reachable
+        self.warmed_up = threading.Event()
+        self._warm_up_stopped = threading.Event()
+        self.warm_up = threading.Thread(target=self.warm_up_inverters, name='sun2000-warm-up', daemon=True)
+
+        # Workers delegate inverter access to the broker process, which checks the connection itself
+        self.broker = None
+        if use_broker and self.config.get(ENV_BROKER_ADDRESS):
+            self.logger.info(f'Inverter will be accessed through broker on: {self.config[ENV_BROKER_ADDRESS]}')
+            self.broker = BrokerClient(self.config[ENV_BROKER_ADDRESS], get_authkey(self.config))
+        elif check_connection:
+            self.warm_up.start()
 
         self.logger.info('Ready to accept requests')
 
-    def check_inverter_connection(self) -> None:
-        self.sun2000.connect()
-        if not self.sun2000.isConnected():
-            exit('Connection to inverter could not be established')
-        self.sun2000.disconnect()
+    def get_volatility_overrides(self) -> Dict[Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister], Volatility]:
+        # Overrides are configured as <equipment>.<register>=<volatility>
+        overrides = {}
+        for override in self.config.get(ENV_CACHE_VOLATILITY, []):
+            register_path, _, volatility_value = override.partition('=')
+            equipment_value, _, register_name = register_path.partition('.')
+            try:
+                overrides[self.catalogue.equipments[equipment_value].registers[register_name]] = Volatility(volatility_value)
+            except (KeyError, ValueError):
+                exit(f'Error: Invalid cache volatility {override} configured')
+        return overrides
+
+    def get_configured_presets(self) -> Dict[str, Preset]:
+        presets = {}
+        try:
+            for name, equipment_value, register_names in parse_presets(self.config.get(ENV_PRESETS, [])):
+                register_members = self.catalogue.equipments[equipment_value].registers
+                registers = [register_members[register_name] for register_name in register_names]
+                presets[name] = Preset(name, equipment_value, registers, self.config.get(ENV_READ_MAX_GAP, DEFAULT_READ_MAX_GAP))
+        except ValueError as e:
+            exit(f'Error: {e}')
+        except KeyError as e:
+            exit(f'Error: Invalid equipment or register {e} configured for presets')
+        return presets
+
+    def warm_up_inverters(self) -> None:
+        """Connect to all inverters, retrying the unreachable ones every BREAKER_PROBE_INTERVAL seconds until each of them was reached once. warmed_up is
+        set after the first attempt."""
+        pending = list(self.inverters.values())
+        while True:
+            pending = [inverter for inverter in pending if not self.check_inverter_connection(inverter)]
+            self.warmed_up.set()
+            if len(pending) == 0:
+                return
+            if self._warm_up_stopped.wait(self.config.get(ENV_BREAKER_PROBE_INTERVAL, DEFAULT_BREAKER_PROBE_INTERVAL)):
+                return
+
+    def stop_warm_up(self) -> None:
+        """Stop retrying unreachable inverters in the background and wait for the current attempt to finish."""
+        self._warm_up_stopped.set()
+        if self.warm_up.is_alive():
+            self.warm_up.join()
+
+    def check_inverter_connection(self, inverter: Inverter) -> bool:
+        if not inverter.connection.connect():
+            self.logger.warning(f'Connection to inverter {inverter.name} could not be established, retrying in the background')
+            return False
+
+        # Static device information is read once and kept, battery and meter might not be installed so theirs is read on first request
+        static_registers = [register for register in self.cache_policy.registers(Volatility.STATIC) if isinstance(register, InverterEquipmentRegister)]
+        try:
+            self.read_registers_data(static_registers, partial=True, inverter=inverter)
+        except Exception as e:
+            self.logger.warning(f'Reading static registers of inverter {inverter.name} failed: {e}')
+
+        if not inverter.connection.keep_alive:
+            inverter.connection.disconnect()
+        return True
 
     def validate_auth_header(self) -> None:
-        api_key = request.headers.get('x-api-key')
+        with phase('auth'):
+            api_key = request.headers.get('x-api-key')
+            # Scrapers like Prometheus can only be configured to send the API-key as bearer token
+            authorization = request.headers.get('authorization', '')
+            if api_key is None and authorization.startswith('Bearer '):
+                api_key = authorization[len('Bearer '):]
+            self.validate_api_key(api_key)
+
+    def validate_api_key(self, api_key: Optional[str]) -> None:
         if api_key is None or api_key not in self.config[ENV_ACCEPTED_API_KEYS]:
             abort(401, 'No or invalid API-key provided')
 
+    def validate_body(self, body: Any) -> dict:
+        if not isinstance(body, dict):
+            abort(400, 'Invalid request body')
+        return body
+
     def validate_equipment(self, equipment_value: str) -> Equipment:
         self.logger.debug(f'Validating equipment value: {equipment_value}')
-        if equipment_value is None or len(equipment_value) == 0:
-            abort(400, 'No value for equipment')
+        with phase('validation'):
+            if equipment_value is None or equipment_value == '':
+                abort(400, 'No value for equipment')
 
-        if equipment_value not in set(item.value for item in Equipment):
-            abort(400, 'Invalid value for equipment')
+            if not isinstance(equipment_value, str) or equipment_value not in self.catalogue.equipment_values:
+                abort(400, 'Invalid value for equipment')
 
-        return Equipment(equipment_value)
+            return Equipment(equipment_value)
 
     def validate_registers(self, equipment: Equipment, register_names: List[str]) -> List[Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]]:
         self.logger.debug(f'Validating registers for equipment {equipment}: {register_names}')
-        if len(register_names) == 0:
-            abort(400, 'No value for registers')
+        with phase('validation'):
+            if register_names is None or register_names == []:
+                abort(400, 'No value for registers')
 
-        if equipment == Equipment.INVERTER:
-            register_members = InverterEquipmentRegister.__members__
-        elif equipment == Equipment.BATTERY:
-            register_members = BatteryEquipmentRegister.__members__
-        else:
-            register_members = MeterEquipmentRegister.__members__
+            if not isinstance(register_names, list) or not all(isinstance(register_name, str) for register_name in register_names):
+                abort(400, 'At least one invalid register passed')
 
-        registers = []
-        for register_name in register_names:
-            if register_name not in register_members:
+            register_members = self.catalogue.equipments[equipment.value].registers
+            try:
+                return [register_members[register_name] for register_name in register_names]
+            except KeyError:
                 abort(400, 'At least one invalid register passed')
-            registers.append(register_members.__getitem__(register_name))
 
-        return registers
+    def validate_inverter(self, inverter_name: Optional[str]) -> Optional[str]:
+        if inverter_name is not None and (not isinstance(inverter_name, str) or inverter_name not in self.inverters):
+            abort(400, 'Invalid value for inverter')
+        return inverter_name
+
+    def get_registers_data(self, registers: List[Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]],
+                           partial: bool = False, report_age: bool = False, inverter_name: str = None, plan: List[ReadBlock] = None) -> List[dict]:
+        """Return the data of the given registers of the named or the default inverter. If partial, registers that could not be read carry an error message
+        instead of failing all registers. If report_age, the data contains the age in seconds of each value. The reads planned in advance for the given
+        registers are used if none of them is cached."""
+        if self.broker is not None:
+            with phase('broker'):
+                return self.broker.call('get_registers_data', registers, partial, report_age, inverter_name, plan)
+
+        inverter = self.inverters[inverter_name] if inverter_name is not None else self.inverter
+        with phase('cache'):
+            cache_entries = self.get_cache_entries(registers, inverter)
+        registers_data = {register: entry.data for register, entry in cache_entries.items()}
+
+        missing_registers = [register for register in registers if register not in registers_data]
+        if len(missing_registers) > 0 and inverter.connection.breaker.is_open() and self.config.get(ENV_BREAKER_SERVE_STALE, DEFAULT_BREAKER_SERVE_STALE):
+            # While the inverter is unreachable the last values read are served regardless of their age, marked as stale
+            for register in missing_registers:
+                entry = inverter.cache.get_entry(register, math.inf)
+                if entry is not None:
+                    cache_entries[register] = entry
+                    registers_data[register] = dict(entry.data, stale=True)
+            missing_registers = [register for register in missing_registers if register not in registers_data]
+
+        if len(missing_registers) > 0:
+            plan = plan if len(missing_registers) == len(registers) else None
+            registers_data.update(zip(missing_registers, self.read_registers_data(missing_registers, partial, inverter, plan)))
+
+        if report_age:
+            return [with_age(registers_data[register], cache_entries[register].age() if register in cache_entries else 0) for register in registers]
+        return [registers_data[register] for register in registers]
+
+    def get_registers_changes(self, registers: List[Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]],
+                              since: Optional[str] = None, inverter_name: str = None, plan: List[ReadBlock] = None) \
+            -> Tuple[str, List[Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]], List[dict]]:
+        """Return the version of the given registers along with those of them changed after version since and their data. All registers are returned if
+        since is None or of another cache epoch."""
+        if self.broker is not None:
+            with phase('broker'):
+                return self.broker.call('get_registers_changes', registers, since, inverter_name, plan)
+
+        cache = (self.inverters[inverter_name] if inverter_name is not None else self.inverter).cache
+        version, _ = cache.get_versioned_entries(registers)
+        registers_data = self.get_registers_data(registers, report_age=True, inverter_name=inverter_name, plan=plan)
+
+        # If none of the registers changed meanwhile the latest version is reported, otherwise the version before reading, reporting changes once more
+        latest_version, entries = cache.get_versioned_entries(registers)
+        if all(entry is not None and entry.data.get('value') == register_data.get('value') for entry, register_data in zip(entries, registers_data)):
+            version = latest_version
 
-    def get_registers_data(self, registers: List[Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]]) -> List[dict]:
-        self.sun2000.connect()
-        if not self.sun2000.isConnected():
-            abort(502, 'Connection to inverter could not be established')
+        since_sequence = cache.parse_sequence(since) if since is not None else None
+        if since_sequence is None:
+            return version, registers, registers_data
 
-        registers_data = []
+        changes = [(register, register_data) for register, register_data, entry in zip(registers, registers_data, entries)
+                   if entry is None or entry.sequence > since_sequence]
+        return version, [register for register, _ in changes], [register_data for _, register_data in changes]
+
+    def get_preset_changes(self, name: str, since: Optional[str] = None, inverter_name: str = None) -> Tuple[str, List[Any], str, List[Any], List[dict]]:
+        """Return equipment value and registers of the named preset, followed by version, changed registers and their data as by get_registers_changes.
+        The reads planned for the preset are executed."""
+        if self.broker is not None:
+            with phase('broker'):
+                return self.broker.call('get_preset_changes', name, since, inverter_name)
+
+        preset = self.presets.get(name)
+        if preset is None:
+            abort(400, 'Invalid value for preset')
+        return (preset.equipment_value, preset.registers) + self.get_registers_changes(preset.registers, since, inverter_name, preset.blocks)
+
+    def get_presets(self) -> List[dict]:
+        if self.broker is not None:
+            return self.broker.call('get_presets')
+
+        return [preset.describe() for preset in self.presets.values()]
+
+    def define_preset(self, name: str, registers: List[Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]]) -> dict:
+        """Store the given registers as preset of the given name, replacing a preset of the same name. Presets are kept where the inverters are read,
+        i.e. by the broker if configured."""
+        if self.broker is not None:
+            return self.broker.call('define_preset', name, registers)
+
+        if not is_valid_preset_name(name):
+            abort(400, 'Invalid value for preset')
+        preset = Preset(name, get_equipment(registers[0]).value, registers, self.config.get(ENV_READ_MAX_GAP, DEFAULT_READ_MAX_GAP))
+        self.presets[name] = preset
+        return preset.describe()
+
+    def get_inverters_registers_data(self, registers: List[Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]]) \
+            -> Dict[str, List[dict]]:
+        """Return the data of the given registers of all inverters by name, read concurrently. Registers that could not be read carry an error message."""
+        if self.broker is not None:
+            return self.broker.call('get_inverters_registers_data', registers)
+
+        with phase('fan-out'):
+            futures = {name: self.executor.submit(self.get_registers_data, registers, True, True, name) for name in self.inverters}
+            return {name: future.result() for name, future in futures.items()}
+
+    def get_cache_entries(self, registers: List[Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]],
+                          inverter: Inverter = None) -> Dict[Any, CacheEntry]:
+        # Values are served from the snapshot cache as long as they are fresh according to the cache policy, or kept up to date by the poller
+        poll_max_age = self.config.get(ENV_CACHE_MAX_AGE, DEFAULT_CACHE_MAX_AGE) if self.config.get(ENV_POLL_INTERVAL, DEFAULT_POLL_INTERVAL) > 0 else 0
+        cache = (inverter or self.inverter).cache
+        cache_entries = {}
         for register in registers:
-            registers_data.append(self.get_register_data(register))
+            max_age = max(self.cache_policy.max_ages[register], poll_max_age)
+            entry = cache.get_entry(register, max_age) if max_age > 0 else None
+            if entry is not None:
+                cache_entries[register] = entry
+        return cache_entries
+
+    def read_registers_data(self, registers: List[Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]],
+                            partial: bool = False, inverter: Inverter = None, plan: List[ReadBlock] = None) -> List[dict]:
+        inverter = inverter or self.inverter
+        blocks = plan if plan is not None else plan_reads(registers, self.config.get(ENV_READ_MAX_GAP, DEFAULT_READ_MAX_GAP))
+        payloads = self.read_blocks(blocks, partial, inverter)
+
+        with phase('decode'):
+            raw_values = {}
+            for block in blocks:
+                payload = payloads[block.key]
+                for register in block.registers:
+                    raw_values[register] = payload if isinstance(payload, Exception) else block.decode(payload, register)
+
+            registers_data = []
+            for register in registers:
+                if isinstance(raw_values[register], Exception):
+                    registers_data.append({'name': register.name, 'error': get_error_message(raw_values[register])})
+                    continue
+                register_data = self.get_register_data(register, raw_values[register])
+                inverter.cache.put(register, register_data)
+                registers_data.append(register_data)
+
+            return registers_data
+
+    def read_blocks(self, blocks: List[ReadBlock], partial: bool = False, inverter: Inverter = None) -> Dict[tuple, Union[bytes, Exception]]:
+        inverter = inverter or self.inverter
+        # Concurrent requests share in-flight reads of identical blocks instead of reading them once per request
+        led, joined = inverter.flights.join([block.key for block in blocks])
+
+        # If partial, blocks that could not be read map to the error instead of failing all blocks
+        payloads = {}
+        try:
+            if len(led) > 0:
+                with inverter.connection.session() as connection:
+                    for block in blocks:
+                        if block.key not in led or block.key in payloads:
+                            continue
+                        self.logger.debug(f'Reading block of {block.quantity} registers starting at address {block.address}')
+                        started = time.perf_counter()
+                        try:
+                            with phase('read'):
+                                payloads[block.key] = connection.read_range(block.address, block.quantity)
+                        except Exception as e:
+                            inverter.read_metrics.observe(time.perf_counter() - started, error=True)
+                            if not partial:
+                                raise
+                            self.logger.warning(f'Reading block of {block.quantity} registers starting at address {block.address} failed: {e}')
+                            if isinstance(e, ConnectionException):
+                                # The connection is considered broken as by session(), it is re-established for the remaining blocks
+                                inverter.connection.breaker.record_failure()
+                                inverter.connection.disconnect()
+                                inverter.connection.connect()
+                            payloads[block.key] = e
+                            inverter.flights.land(block.key, error=e)
+                            continue
+                        inverter.read_metrics.observe(time.perf_counter() - started)
+                        inverter.connection.breaker.record_success()
+                        inverter.flights.land(block.key, payloads[block.key])
+        except BaseException as e:
+            for key in led:
+                if key not in payloads:
+                    inverter.flights.land(key, error=e)
+            if not partial or not isinstance(e, Exception):
+                raise
+            for key in led:
+                payloads.setdefault(key, e)
 
-        self.sun2000.disconnect()
+        for key, flight in joined.items():
+            self.logger.debug(f'Sharing in-flight read of block {key}')
+            try:
+                with phase('shared-read'):
+                    payloads[key] = flight.wait()
+            except Exception as e:
+                if not partial:
+                    raise
+                payloads[key] = e
 
-        return registers_data
+        return payloads
 
-    def get_register_data(self, register: Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister]) -> dict:
-        self.logger.debug(f'Reading data for register {register.name}')
+    def get_register_history(self, register: Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister], start: float, end: float,
+                             step: Optional[float]) -> Optional[List[dict]]:
+        if self.broker is not None:
+            return self.broker.call('get_register_history', register, start, end, step)
+
+        return self.history.query(register, start, end, step)
+
+    def get_health(self) -> dict:
+        """Return the breaker state and the age of the last successful read of each inverter, the status is unavailable while the breaker of the default
+        inverter is open."""
+        if self.broker is not None:
+            return self.broker.call('get_health')
+
+        status = 'unavailable' if self.connection.breaker.is_open() else 'ok'
+        return {'status': status, 'inverters': [inverter.health() for inverter in self.inverters.values()]}
+
+    def get_readiness(self) -> dict:
+        """Return whether requests can be answered, which is the case once the default inverter was read successfully and as long as its breaker is
+        closed or stale values are served."""
+        if self.broker is not None:
+            return self.broker.call('get_readiness')
+
+        breaker = self.connection.breaker
+        if breaker.last_success is None:
+            return {'ready': False, 'reason': 'Inverter not read yet'}
+        if breaker.is_open() and not self.config.get(ENV_BREAKER_SERVE_STALE, DEFAULT_BREAKER_SERVE_STALE):
+            return {'ready': False, 'reason': 'Circuit breaker is open'}
+        return {'ready': True}
+
+    def get_instrumentation(self) -> dict:
+        if self.broker is not None:
+            return self.broker.call('get_instrumentation')
+
+        instrumentation = self.read_metrics.snapshot()
+        instrumentation.update({'connection': dict(self.connection.metrics), 'exporters': [exporter.snapshot() for exporter in self.exporters]})
+        return instrumentation
+
+    def get_register_data(self, register: Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister], raw_value: Any) -> dict:
+        self.logger.debug(f'Decoding data for register {register.name}')
         register_definition = register.value
 
-        # name
-        register_data = {'name': register.name}
+        # name, type, gain and unit are prebuilt per register
+        register_data = dict(self.catalogue.templates[register])
 
-        # type and value
+        # value
         if register_definition.data_type == DataType.MULTIDATA:
-            register_data.update({'type': 'string'})
-            register_data.update({'value': self.sun2000.read_raw_value(register).hex()})
-        elif register_definition.data_type in (DataType.INT16_BE, DataType.UINT16_BE, DataType.INT32_BE, DataType.UINT32_BE):
-            register_data.update({'type': 'number'})
-            register_data.update({'value': str(self.sun2000.read_raw_value(register))})
+            register_data['value'] = raw_value.hex()
+        elif register_data['type'] == 'number':
+            register_data['value'] = str(raw_value)
         else:
-            register_data.update({'type': 'string'})
-            register_data.update({'value': self.sun2000.read_raw_value(register)})
-
-        # gain
-        if register_definition.gain is not None:
-            register_data.update({'gain': register_definition.gain})
-
-        # unit
-        if register_definition.unit is not None:
-            register_data.update({'unit': register_definition.unit})
+            register_data['value'] = raw_value
 
         # mappedValue
         if register_definition.mapping is not None:
-            register_data.update({'mappedValue': self.sun2000.read_formatted(register)})
+            register_data['mappedValue'] = self.get_mapped_value(register, raw_value)
 
         return register_data
+
+    @staticmethod
+    def get_mapped_value(register: Union[InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister], raw_value: Any) -> Any:
+        # Mirrors Sun2000.read_formatted without reading the register from the inverter again
+        register_definition = register.value
+        value = raw_value if register_definition.gain is None else raw_value / register_definition.gain
+
+        if register_definition.unit is not None:
+            return f'{value} {register_definition.unit}'
+        return register_definition.mapping.get(value, 'undefined')
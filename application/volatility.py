@@ -0,0 +1,53 @@
+import math
+from enum import Enum
+from typing import Dict, Iterable, Type
+
+from sun2000_modbus.datatypes import DataType
+from sun2000_modbus.registers import InverterEquipmentRegister, AccessType
+
+from .planner import EquipmentRegister
+
+# Inverter registers below this address hold device information like model, serial number and rated power
+INVERTER_DEVICE_INFO_END = 32000
+
+# Units of accumulated or slowly drifting values
+SLOW_UNITS = frozenset(('kWh', 'Wh', '°C', '%', 'MOhm', 'min', 'minutes', 's'))
+
+
+class Volatility(Enum):
+    STATIC = 'static'
+    SLOW = 'slow'
+    FAST = 'fast'
+
+
+def classify(register: EquipmentRegister) -> Volatility:
+    """Derive how often the value of the given register changes from its definition."""
+    register_definition = register.value
+    if register_definition.access_type != AccessType.RO:
+        # Settings only change when written
+        return Volatility.SLOW
+    if register_definition.data_type == DataType.STRING:
+        return Volatility.STATIC
+    if isinstance(register, InverterEquipmentRegister) and register_definition.address < INVERTER_DEVICE_INFO_END:
+        return Volatility.STATIC
+    if register_definition.unit in SLOW_UNITS:
+        return Volatility.SLOW
+
+    # Electrical values, states and alarms
+    return Volatility.FAST
+
+
+class CachePolicy:
+    """Maximum age of cached values per register, derived from the register's volatility. Values of static registers never expire."""
+    volatilities: Dict[EquipmentRegister, Volatility]
+    max_ages: Dict[EquipmentRegister, float]
+
+    def __init__(self, register_types: Iterable[Type[Enum]], slow_ttl: float, fast_ttl: float, overrides: Dict[EquipmentRegister, Volatility] = None):
+        ttls = {Volatility.STATIC: math.inf, Volatility.SLOW: slow_ttl, Volatility.FAST: fast_ttl}
+        overrides = overrides or {}
+
+        self.volatilities = {register: overrides.get(register) or classify(register) for register_type in register_types for register in register_type}
+        self.max_ages = {register: ttls[volatility] for register, volatility in self.volatilities.items()}
+
+    def registers(self, volatility: Volatility) -> list:
+        return [register for register, register_volatility in self.volatilities.items() if register_volatility == volatility]
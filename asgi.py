@@ -0,0 +1,3 @@
+from application import create_asgi_app
+
+app = create_asgi_app()
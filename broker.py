@@ -0,0 +1,6 @@
+from application import create_broker
+
+broker = create_broker()
+
+if __name__ == '__main__':
+    broker.serve_forever()
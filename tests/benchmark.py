@@ -0,0 +1,186 @@
+"""Load test of POST /register-values against the simulated inverter, reporting latency percentiles, throughput and inverter reads per request.
+
+Run from the repository root, e.g.: PYTHONPATH=. python tests/benchmark.py --concurrency 8 --requests 500 --latency 0.02
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import logging
+import math
+import sys
+import threading
+import time
+from typing import List
+
+from werkzeug.serving import make_server
+
+from simulator import ModbusSimulator
+
+DEFAULT_REGISTERS = 'Model,RatedPower,ActivePower,PhaseAVoltage,PhaseBVoltage,PhaseCVoltage,DeviceStatus,DailyEnergyYield'
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of the given values."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def run_benchmark(host: str, port: int, body: dict, concurrency: int, requests: int, api_key: str, path: str = '/register-values') -> dict:
+    """Send requests POST requests of the given body from concurrency clients, returning latency percentiles in seconds and throughput per second."""
+    payload = json.dumps(body)
+    latencies = []
+    errors = []
+    remaining = [requests]
+    lock = threading.Lock()
+
+    def client() -> None:
+        connection = http.client.HTTPConnection(host, port)
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    break
+                remaining[0] -= 1
+
+            started = time.perf_counter()
+            connection.request('POST', path, body=payload, headers={'Content-Type': 'application/json', 'X-Api-Key': api_key})
+            response = connection.getresponse()
+            response.read()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                if response.status != 200:
+                    errors.append(response.status)
+        connection.close()
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99),
+        'throughput': requests / elapsed
+    }
+
+
+def run_modbus_benchmark(host: str, port: int, blocks: list, window: int, rounds: int) -> dict:
+    """Read the given blocks rounds times with the asynchronous Modbus client, all blocks of a round at once, returning latency percentiles of a round in
+    seconds and rounds per second."""
+    from application.modbus import AsyncModbusClient
+
+    async def read() -> dict:
+        client = AsyncModbusClient(host, port, wait=0, window=window)
+        await client.connect()
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(rounds):
+            round_started = time.perf_counter()
+            await asyncio.gather(*(client.read_holding_registers(block.address, block.quantity) for block in blocks))
+            latencies.append(time.perf_counter() - round_started)
+        elapsed = time.perf_counter() - started
+        await client.close()
+        return {'window': window, 'pipelining': client.pipelining, 'blocks': len(blocks), 'rounds': rounds, 'p50': percentile(latencies, 0.5),
+                'p99': percentile(latencies, 0.99), 'throughput': rounds / elapsed}
+
+    return asyncio.run(read())
+
+
+def parse_config_value(value: str):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=4, help='amount of concurrent clients')
+    parser.add_argument('--requests', type=int, default=200, help='amount of requests to send in total')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds the simulated inverter takes to answer a read')
+    parser.add_argument('--jitter', type=float, default=0, help='seconds the latency varies by')
+    parser.add_argument('--max-connections', type=int, default=None, help='connections the simulated inverter accepts')
+    parser.add_argument('--equipment', default='inverter', help='equipment to request registers of')
+    parser.add_argument('--registers', default=DEFAULT_REGISTERS, help='comma separated list of registers to request')
+    parser.add_argument('--preset', action='store_true', help='request the registers as preset instead of listing them in every request')
+    parser.add_argument('--config', action='append', default=[], metavar='NAME=VALUE', help='application configuration, e.g. READ_MAX_GAP=10')
+    parser.add_argument('--modbus', action='store_true', help='compare sequential and pipelined Modbus reads of the registers instead of HTTP requests')
+    parser.add_argument('--pipeline-window', type=int, default=4, help='requests outstanding at once when comparing pipelined Modbus reads')
+    parser.add_argument('--max-p99', type=float, default=None, help='fail if the p99 latency exceeds this amount of seconds')
+    parser.add_argument('--json', action='store_true', help='print the result as JSON')
+    args = parser.parse_args()
+
+    if args.modbus:
+        return compare_modbus_reads(args)
+
+    from application import create_app
+
+    with ModbusSimulator(args.latency, args.jitter, args.max_connections) as simulator:
+        config = {
+            'INVERTER_HOST': simulator.host,
+            'INVERTER_PORT': simulator.port,
+            'ACCEPTED_API_KEYS': 'benchmark',
+            'LOG_LEVEL': 'WARNING'
+        }
+        if args.preset:
+            config['PRESETS'] = [f'benchmark={args.equipment}:{args.registers.replace(",", ";")}']
+        config.update((name, parse_config_value(value)) for name, value in (item.split('=', 1) for item in args.config))
+        server = make_server('127.0.0.1', 0, create_app(config), threaded=True)
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        # Reads at startup are not accounted to the requests
+        from application import routes
+        routes.utilities.warmed_up.wait()
+        reads = simulator.reads
+        body = {'preset': 'benchmark'} if args.preset else {'equipment': args.equipment, 'registers': args.registers.split(',')}
+        result = run_benchmark('127.0.0.1', server.server_port, body, args.concurrency, args.requests, 'benchmark')
+        result['reads_per_request'] = (simulator.reads - reads) / args.requests
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f'{result["requests"]} requests, concurrency {result["concurrency"]}, {result["errors"]} errors')
+        print(f'p50 {result["p50"] * 1000:.1f} ms, p99 {result["p99"] * 1000:.1f} ms, {result["throughput"]:.1f} requests/s, '
+              f'{result["reads_per_request"]:.2f} inverter reads per request')
+
+    if result['errors'] > 0 or (args.max_p99 is not None and result['p99'] > args.max_p99):
+        return 1
+    return 0
+
+
+def compare_modbus_reads(args) -> int:
+    from application.planner import plan_reads
+    from application.util import Equipment, EQUIPMENT_REGISTERS
+
+    config = dict((name, parse_config_value(value)) for name, value in (item.split('=', 1) for item in args.config))
+    register_members = EQUIPMENT_REGISTERS[Equipment(args.equipment)].__members__
+    blocks = plan_reads([register_members[name] for name in args.registers.split(',')], config.get('READ_MAX_GAP', 0))
+
+    results = []
+    for window in (1, args.pipeline_window):
+        with ModbusSimulator(args.latency, args.jitter, args.max_connections) as simulator:
+            results.append(run_modbus_benchmark(simulator.host, simulator.port, blocks, window, args.requests))
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for result in results:
+            print(f'window {result["window"]}{"" if result["pipelining"] or result["window"] == 1 else " (fell back to sequential)"}: '
+                  f'{result["rounds"]} rounds of {result["blocks"]} blocks, p50 {result["p50"] * 1000:.1f} ms, p99 {result["p99"] * 1000:.1f} ms, '
+                  f'{result["throughput"]:.1f} rounds/s')
+
+    if args.max_p99 is not None and results[-1]['p99'] > args.max_p99:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import heapq
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Optional
+
+from sun2000_modbus.datatypes import DataType
+from sun2000_modbus.registers import InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister
+
+from sun2000mock import MockedRawResponses, encode_raw_value
+
+READ_HOLDING_REGISTERS = 0x03
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+
+
+def simulated_raw_value(register):
+    """Return the mocked raw value of the given register if defined, otherwise a plausible value derived from its definition."""
+    if register in MockedRawResponses:
+        return MockedRawResponses[register]
+
+    register_definition = register.value
+    if register_definition.data_type == DataType.STRING:
+        return register.name[:register_definition.quantity * 2]
+    if register_definition.data_type == DataType.BITFIELD16:
+        return '0' * 16
+    if register_definition.data_type == DataType.BITFIELD32:
+        return '0' * 32
+    if register_definition.data_type == DataType.MULTIDATA:
+        return bytes(register_definition.quantity * 2)
+    if register_definition.mapping is not None and register_definition.gain == 1:
+        # A raw value having a mapping
+        return next((key for key in register_definition.mapping if isinstance(key, int)), register_definition.address % 1000)
+    return register_definition.address % 1000
+
+
+class SimulatorHandler(socketserver.BaseRequestHandler):
+    server: 'SimulatorServer'
+
+    def setup(self) -> None:
+        # Responses are sent as soon as they are due instead of waiting for earlier ones to be acknowledged
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Responses not sent yet, as tuples of the time they are due, a sequence number and the response
+        self.responses = []
+        self.sequence = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def handle(self) -> None:
+        simulator = self.server.simulator
+        if not simulator.open_connection():
+            return
+
+        # Requests are received while earlier ones are still being answered, each response is sent once its latency passed
+        threading.Thread(target=self.send_responses, name='modbus-simulator-responses', daemon=True).start()
+        try:
+            while True:
+                header = self.receive(7)
+                if header is None:
+                    return
+                transaction_id, protocol_id, length, unit = struct.unpack('>HHHB', header)
+                pdu = self.receive(length - 1)
+                if pdu is None:
+                    return
+
+                response_pdu = simulator.handle_request(pdu)
+                response = struct.pack('>HHHB', transaction_id, protocol_id, len(response_pdu) + 1, unit) + response_pdu
+                with self.condition:
+                    if len(self.responses) > 0 and not simulator.pipelining:
+                        # Like firmware not supporting pipelining, the connection is closed on a request sent before the previous one was answered
+                        simulator.rejected_pipelines += 1
+                        return
+                    heapq.heappush(self.responses, (time.monotonic() + simulator.delay(), self.sequence, response))
+                    self.sequence += 1
+                    self.condition.notify()
+        except OSError:
+            return
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify()
+            simulator.close_connection()
+
+    def send_responses(self) -> None:
+        while True:
+            with self.condition:
+                while not self.closed and (len(self.responses) == 0 or self.responses[0][0] > time.monotonic()):
+                    self.condition.wait(self.responses[0][0] - time.monotonic() if len(self.responses) > 0 else None)
+                if self.closed:
+                    return
+                response = heapq.heappop(self.responses)[2]
+            try:
+                self.request.sendall(response)
+            except OSError:
+                return
+
+    def receive(self, size: int) -> Optional[bytes]:
+        data = b''
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if len(chunk) == 0:
+                return None
+            data += chunk
+        return data
+
+
+class SimulatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    simulator: 'ModbusSimulator'
+
+
+class ModbusSimulator:
+    """Local Modbus TCP server simulating a Sun2000 inverter, serving every register of sun2000_modbus.registers.
+
+    Each request is answered after latency seconds, varied by up to jitter seconds. Requests sent before earlier requests of the connection were answered
+    are answered once their own latency passed, i.e. out of order with jitter. If not pipelining, such a request closes the connection instead.
+    Connections beyond max_connections are closed right away. If strict, reading addresses no register is defined at is answered with an exception
+    response like the inverter does.
+    """
+    latency: float
+    jitter: float
+    max_connections: Optional[int]
+    strict: bool
+    pipelining: bool
+    reads: int
+    rejected_connections: int
+    rejected_pipelines: int
+
+    def __init__(self, latency: float = 0, jitter: float = 0, max_connections: int = None, strict: bool = False, pipelining: bool = True,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_connections = max_connections
+        self.strict = strict
+        self.pipelining = pipelining
+        self.reads = 0
+        self.rejected_connections = 0
+        self.rejected_pipelines = 0
+
+        self._memory = bytearray(0x20000)
+        self._defined = bytearray(0x10000)
+        for register_type in (InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister):
+            for register in register_type:
+                self.set_raw_value(register, simulated_raw_value(register))
+
+        self._lock = threading.Lock()
+        self._connections = 0
+        self._server = SimulatorServer((host, port), SimulatorHandler)
+        self._server.simulator = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def set_raw_value(self, register, raw_value) -> None:
+        address = register.value.address
+        quantity = register.value.quantity
+        self._memory[address * 2:(address + quantity) * 2] = encode_raw_value(register, raw_value).ljust(quantity * 2, b'\0')[:quantity * 2]
+        self._defined[address:address + quantity] = b'\1' * quantity
+
+    def start(self) -> 'ModbusSimulator':
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), name='modbus-simulator', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'ModbusSimulator':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def open_connection(self) -> bool:
+        with self._lock:
+            if self.max_connections is not None and self._connections >= self.max_connections:
+                self.rejected_connections += 1
+                return False
+            self._connections += 1
+            return True
+
+    def close_connection(self) -> None:
+        with self._lock:
+            self._connections -= 1
+
+    def delay(self) -> float:
+        return max(self.latency + random.uniform(-self.jitter, self.jitter), 0)
+
+    def handle_request(self, pdu: bytes) -> bytes:
+        with self._lock:
+            self.reads += 1
+
+        function_code = pdu[0]
+        if function_code != READ_HOLDING_REGISTERS or len(pdu) != 5:
+            return bytes((function_code | 0x80, ILLEGAL_FUNCTION))
+
+        address, quantity = struct.unpack('>HH', pdu[1:5])
+        if quantity < 1 or quantity > 125 or address + quantity > 0x10000:
+            return bytes((function_code | 0x80, ILLEGAL_DATA_ADDRESS))
+        if self.strict and not all(self._defined[address:address + quantity]):
+            return bytes((function_code | 0x80, ILLEGAL_DATA_ADDRESS))
+
+        return bytes((function_code, quantity * 2)) + self._memory[address * 2:(address + quantity) * 2]
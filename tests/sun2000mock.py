@@ -1,3 +1,5 @@
+from pymodbus.exceptions import ModbusIOException
+from sun2000_modbus.datatypes import DataType
 from sun2000_modbus.registers import InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister
 
 
@@ -22,5 +24,55 @@ MockedRawResponses = {
 }
 
 
+# Every read sent to the (mocked) inverter, as tuple of start address and quantity
+ReadRequests = []
+
+
 def mock_read_raw_value(self, register):
+    ReadRequests.append((register.value.address, register.value.quantity))
     return MockedRawResponses[register]
+
+
+def encode_raw_value(register, raw_value) -> bytes:
+    length = register.value.quantity * 2
+    data_type = register.value.data_type
+    if data_type == DataType.STRING:
+        return raw_value.encode('utf-8').ljust(length, b'\0')
+    elif data_type in (DataType.UINT16_BE, DataType.UINT32_BE):
+        return raw_value.to_bytes(length, byteorder='big', signed=False)
+    elif data_type in (DataType.INT16_BE, DataType.INT32_BE):
+        return raw_value.to_bytes(length, byteorder='big', signed=True)
+    elif data_type in (DataType.BITFIELD16, DataType.BITFIELD32):
+        return int(raw_value, 2).to_bytes(length, byteorder='big')
+    return raw_value
+
+
+def mock_read_range(self, start_address, quantity=0, end_address=0):
+    if end_address != 0:
+        quantity = end_address - start_address + 1
+    ReadRequests.append((start_address, quantity))
+    payload = bytearray(quantity * 2)
+    for register, raw_value in MockedRawResponses.items():
+        offset = (register.value.address - start_address) * 2
+        if 0 <= offset and register.value.address + register.value.quantity <= start_address + quantity:
+            payload[offset:offset + register.value.quantity * 2] = encode_raw_value(register, raw_value)
+    return bytes(payload)
+
+
+def mock_read_range_without_battery(self, start_address, quantity=0, end_address=0):
+    # Battery registers are not answered if no battery is installed
+    if any(register.value.address in range(start_address, start_address + quantity) for register in BatteryEquipmentRegister):
+        raise ModbusIOException('Inverter unit did not respond')
+    return mock_read_range(self, start_address, quantity, end_address)
+
+
+async def async_connect_success(self):
+    return True
+
+
+async def async_connect_fail(self):
+    return False
+
+
+async def mock_read_holding_registers(self, address, quantity):
+    return mock_read_range(self, address, quantity)
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import unittest
+from typing import Tuple, Optional
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+import sun2000mock
+from pymodbus.exceptions import ModbusIOException
+
+from application import create_asgi_app
+
+
+def asgi_request(app, method: str, path: str, query: dict = None, headers: dict = None, body: dict = None) -> Tuple[int, Optional[dict]]:
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': urlencode(query or {}).encode('latin-1'),
+        'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in (headers or {}).items()]
+    }
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode('utf-8') if body is not None else b''}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+
+    response_body = sent[1]['body']
+    return sent[0]['status'], json.loads(response_body) if len(response_body) > 0 else None
+
+
+@patch(
+    'application.modbus.AsyncModbusClient.connect', sun2000mock.async_connect_success
+)
+@patch(
+    'application.modbus.AsyncModbusClient.read_holding_registers', sun2000mock.mock_read_holding_registers
+)
+class AsgiTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        test_config = {
+            'INVERTER_HOST': '1.2.3.4',
+            'INVERTER_PORT': 502,
+            'ACCEPTED_API_KEYS': '12345,98765',
+            'LOG_LEVEL': 'DEBUG'
+        }
+        self.app = create_asgi_app(test_config)
+
+    def test_unauthorized_access_returns_401(self) -> None:
+        status, body = asgi_request(self.app, 'GET', '/registers', query={'equipment': 'inverter'})
+
+        self.assertEqual(401, status)
+        self.assertEqual({'message': 'No or invalid API-key provided'}, body)
+
+    def test_calling_GET_registers_returns_registers_for_requested_equipment(self) -> None:
+        status, body = asgi_request(self.app, 'GET', '/registers', query={'equipment': 'battery'}, headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, status)
+        self.assertEqual('battery', body['equipment'])
+        self.assertIn('SOC', body['registers'])
+        self.assertNotIn('Model', body['registers'])
+
+        status, body = asgi_request(self.app, 'GET', '/registers', query={'equipment': 'invalid_equipment'}, headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, status)
+        self.assertEqual({'message': 'Invalid value for equipment'}, body)
+
+    def test_calling_POST_registervalues_returns_requested_register_values(self) -> None:
+        sun2000mock.ReadRequests.clear()
+        status, body = asgi_request(self.app, 'POST', '/register-values', headers={'x-api-key': '12345'},
+                                    body={'equipment': 'inverter', 'registers': ['Model', 'RatedPower', 'DeviceStatus']})
+
+        expected_response_json = {
+            'equipment': 'inverter',
+            'registers': [
+                {
+                    'name': 'Model',
+                    'type': 'string',
+                    'value': 'SUN2000',
+                    'age': 0
+                },
+                {
+                    'name': 'RatedPower',
+                    'type': 'number',
+                    'unit': 'W',
+                    'value': '10000',
+                    'gain': 1,
+                    'age': 0
+                },
+                {
+                    'name': 'DeviceStatus',
+                    'type': 'number',
+                    'value': '512',
+                    'gain': 1,
+                    'mappedValue': 'On-grid',
+                    'age': 0
+                }
+            ]
+        }
+
+        self.assertEqual(200, status)
+        self.assertEqual(expected_response_json, body)
+        self.assertEqual([(30000, 15), (30073, 2), (32089, 1)], sun2000mock.ReadRequests)
+
+        # Static registers are served from cache afterwards
+        sun2000mock.ReadRequests.clear()
+        status, body = asgi_request(self.app, 'POST', '/register-values', headers={'x-api-key': '12345'},
+                                    body={'equipment': 'inverter', 'registers': ['Model', 'RatedPower', 'DeviceStatus']})
+
+        self.assertEqual(200, status)
+        self.assertEqual([(32089, 1)], sun2000mock.ReadRequests)
+
+    def test_invalid_requests_to_POST_registervalues_return_400(self) -> None:
+        status, body = asgi_request(self.app, 'POST', '/register-values', headers={'x-api-key': '12345'}, body={'equipment': 'inverter'})
+
+        self.assertEqual(400, status)
+        self.assertEqual({'message': 'No value for registers'}, body)
+
+        status, body = asgi_request(self.app, 'POST', '/register-values', headers={'x-api-key': '12345'},
+                                    body={'equipment': 'inverter', 'registers': ['Model', 'SN', 'RunningStatus']})
+
+        self.assertEqual(400, status)
+        self.assertEqual({'message': 'At least one invalid register passed'}, body)
+
+    def test_calling_POST_registervalues_when_inverter_connection_fails_returns_502(self) -> None:
+        with patch('application.modbus.AsyncModbusClient.connect', sun2000mock.async_connect_fail):
+            status, body = asgi_request(self.app, 'POST', '/register-values', headers={'x-api-key': '12345'},
+                                        body={'equipment': 'inverter', 'registers': ['Model']})
+
+        self.assertEqual(502, status)
+        self.assertEqual({'message': 'Connection to inverter could not be established'}, body)
+
+    def test_calling_POST_registervalues_when_inverter_read_fails_returns_502(self) -> None:
+        async def read_fail(client, address, quantity):
+            raise ModbusIOException('No response received')
+
+        with patch('application.modbus.AsyncModbusClient.read_holding_registers', read_fail):
+            status, body = asgi_request(self.app, 'POST', '/register-values', headers={'x-api-key': '12345'},
+                                        body={'equipment': 'inverter', 'registers': ['Model']})
+
+        self.assertEqual(502, status)
+        self.assertTrue(body['message'].startswith('Reading registers from inverter failed: '))
+
+    def test_calling_GET_health_returns_connection_state(self) -> None:
+        status, body = asgi_request(self.app, 'GET', '/health')
+
+        self.assertEqual(200, status)
+        self.assertEqual({'status': 'unavailable', 'inverters': [{'name': 'default', 'lastReadAge': None}]}, body)
+
+        status, body = asgi_request(self.app, 'GET', '/health/live')
+        self.assertEqual((200, {'status': 'alive'}), (status, body))
+
+        status, body = asgi_request(self.app, 'GET', '/health/ready')
+        self.assertEqual((503, {'ready': False, 'reason': 'Inverter not connected'}), (status, body))
+
+        with patch('application.modbus.AsyncModbusClient.is_connected', lambda client: True):
+            asgi_request(self.app, 'POST', '/register-values', headers={'x-api-key': '12345'}, body={'equipment': 'inverter', 'registers': ['Model']})
+            status, body = asgi_request(self.app, 'GET', '/health')
+            self.assertEqual('ok', body['status'])
+            self.assertEqual(0, body['inverters'][0]['lastReadAge'])
+
+            status, body = asgi_request(self.app, 'GET', '/health/ready')
+            self.assertEqual((200, {'ready': True}), (status, body))
+
+    @patch(
+        'application.modbus.AsyncModbusClient.connect', sun2000mock.async_connect_fail
+    )
+    def test_startup_completes_when_inverter_is_unreachable(self) -> None:
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            # Let the connection attempt in the background run before shutting down
+            await asyncio.sleep(0)
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.app({'type': 'lifespan'}, receive, send))
+
+        self.assertEqual([{'type': 'lifespan.startup.complete'}, {'type': 'lifespan.shutdown.complete'}], sent)
@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import patch
+
+import sun2000mock
+import werkzeug.exceptions
+from flask import Flask
+from sun2000_modbus.registers import MeterEquipmentRegister, BatteryEquipmentRegister
+
+from application.breaker import CircuitBreaker, BreakerState
+from application.util import Util
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_breaker_opens_after_threshold_consecutive_failures(self) -> None:
+        breaker = CircuitBreaker(3, 60, lambda: False)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+
+        self.assertEqual(BreakerState.CLOSED, breaker.state)
+
+        breaker.record_failure()
+
+        self.assertEqual(BreakerState.OPEN, breaker.state)
+        self.assertEqual({'breaker': 'open', 'failures': 3}, {key: value for key, value in breaker.snapshot().items() if key != 'lastReadAge'})
+
+        breaker.record_success()
+
+        self.assertEqual(BreakerState.CLOSED, breaker.state)
+        self.assertEqual(0, breaker.snapshot()['lastReadAge'])
+
+    def test_breaker_without_threshold_never_opens(self) -> None:
+        breaker = CircuitBreaker(0, 60, lambda: False)
+
+        for _ in range(10):
+            breaker.record_failure()
+
+        self.assertEqual(BreakerState.CLOSED, breaker.state)
+        self.assertIsNone(breaker.snapshot()['lastReadAge'])
+
+
+@patch(
+    'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+)
+class BreakerStaleTest(unittest.TestCase):
+
+    def create_utilities(self, serve_stale: bool) -> Util:
+        app = Flask(__name__)
+        app.config.from_mapping({
+            'INVERTER_HOST': '1.2.3.4',
+            'INVERTER_PORT': 502,
+            'ACCEPTED_API_KEYS': '12345,98765',
+            'LOG_LEVEL': 'DEBUG',
+            'BREAKER_THRESHOLD': 1,
+            'BREAKER_PROBE_INTERVAL': 60,
+            'BREAKER_SERVE_STALE': serve_stale
+        })
+        utilities = Util(app)
+        utilities.warmed_up.wait()
+        return utilities
+
+    def test_open_breaker_fails_fast(self) -> None:
+        utilities = self.create_utilities(False)
+        utilities.get_registers_data([MeterEquipmentRegister.CPhaseVoltage])
+        utilities.connection.breaker.record_failure()
+
+        with patch('sun2000_modbus.inverter.Sun2000.read_range') as read_range:
+            with self.assertRaises(werkzeug.exceptions.BadGateway):
+                utilities.get_registers_data([MeterEquipmentRegister.CPhaseVoltage])
+
+        read_range.assert_not_called()
+        self.assertEqual('unavailable', utilities.get_health()['status'])
+        self.assertEqual('open', utilities.get_health()['inverters'][0]['breaker'])
+
+    def test_open_breaker_serves_stale_values(self) -> None:
+        utilities = self.create_utilities(True)
+        utilities.get_registers_data([MeterEquipmentRegister.CPhaseVoltage])
+        utilities.connection.breaker.record_failure()
+
+        registers_data = utilities.get_registers_data([MeterEquipmentRegister.CPhaseVoltage, MeterEquipmentRegister.BPhaseVoltage], partial=True,
+                                                      report_age=True)
+
+        self.assertEqual([
+            {'name': 'CPhaseVoltage', 'type': 'number', 'value': '2356', 'gain': 10, 'unit': 'V', 'stale': True, 'age': 0},
+            {'name': 'BPhaseVoltage', 'error': 'Connection to inverter interrupted, circuit breaker is open'}
+        ], registers_data)
+
+    def test_unanswered_registers_do_not_open_breaker(self) -> None:
+        utilities = self.create_utilities(False)
+
+        with patch('sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range_without_battery), \
+                patch('sun2000_modbus.inverter.Sun2000.disconnect') as disconnect:
+            registers_data = utilities.get_registers_data([BatteryEquipmentRegister.SOC, MeterEquipmentRegister.CPhaseVoltage], partial=True)
+
+        self.assertEqual({'name': 'SOC', 'error': 'Modbus Error: [Input/Output] Inverter unit did not respond'}, registers_data[0])
+        self.assertEqual('2356', registers_data[1]['value'])
+        self.assertEqual('closed', utilities.connection.breaker.snapshot()['breaker'])
+        disconnect.assert_not_called()
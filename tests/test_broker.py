@@ -0,0 +1,103 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import sun2000mock
+import werkzeug.exceptions
+from sun2000_modbus.registers import InverterEquipmentRegister
+
+from application import create_broker
+from application.broker import BrokerClient
+
+
+@patch(
+    'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+)
+class BrokerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.address = os.path.join(self.directory.name, 'broker.sock')
+        self.broker_thread = None
+
+    def tearDown(self) -> None:
+        if self.broker_thread is not None:
+            self.broker.stop()
+            self.broker_thread.join()
+        self.directory.cleanup()
+
+    def start_broker(self) -> None:
+        self.broker = create_broker({
+            'INVERTER_HOST': '1.2.3.4',
+            'INVERTER_PORT': 502,
+            'ACCEPTED_API_KEYS': ['12345', '98765'],
+            'LOG_LEVEL': 'DEBUG',
+            'BROKER_ADDRESS': self.address
+        })
+        self.broker.utilities.warmed_up.wait()
+        self.broker_thread = threading.Thread(target=self.broker.serve_forever, daemon=True)
+        self.broker_thread.start()
+        for _ in range(50):
+            if os.path.exists(self.address):
+                return
+            time.sleep(0.01)
+
+    def test_workers_read_registers_through_broker(self) -> None:
+        self.start_broker()
+        client = BrokerClient(self.address, b'12345,98765')
+
+        registers_data = client.call('get_registers_data', [InverterEquipmentRegister.Model, InverterEquipmentRegister.DeviceStatus])
+
+        self.assertEqual('SUN2000', registers_data[0]['value'])
+        self.assertEqual('On-grid', registers_data[1]['mappedValue'])
+        client.close()
+
+    def test_only_brokered_methods_may_be_called(self) -> None:
+        self.start_broker()
+        client = BrokerClient(self.address, b'12345,98765')
+
+        with self.assertRaises(werkzeug.exceptions.BadRequest):
+            client.call('validate_auth_header')
+        client.close()
+
+    def test_calls_of_other_threads_do_not_wait_for_slow_calls(self) -> None:
+        self.start_broker()
+        client = BrokerClient(self.address, b'12345,98765')
+        started = threading.Event()
+        release = threading.Event()
+
+        def get_presets():
+            started.set()
+            release.wait(5)
+            return []
+
+        with patch.object(self.broker.utilities, 'get_presets', get_presets):
+            slow_call = threading.Thread(target=client.call, args=('get_presets',))
+            slow_call.start()
+            started.wait(5)
+
+            health = client.call('get_health')
+
+            self.assertTrue(slow_call.is_alive())
+            release.set()
+            slow_call.join()
+
+        self.assertIn('status', health)
+        client.close()
+
+    def test_unreachable_broker_aborts_with_502(self) -> None:
+        client = BrokerClient(self.address, b'12345,98765')
+
+        with self.assertRaises(werkzeug.exceptions.BadGateway) as e:
+            client.call('get_registers_data', [InverterEquipmentRegister.Model])
+
+        self.assertEqual('Inverter broker could not be reached', e.exception.description)
@@ -0,0 +1,44 @@
+import unittest
+
+from sun2000_modbus.registers import MeterEquipmentRegister
+
+from application.cache import SnapshotCache
+
+
+class SnapshotCacheTest(unittest.TestCase):
+
+    def test_changes_are_numbered_by_increasing_sequence(self) -> None:
+        cache = SnapshotCache()
+        cache.put(MeterEquipmentRegister.APhaseVoltage, {'name': 'APhaseVoltage', 'value': '2351'})
+        cache.put(MeterEquipmentRegister.BPhaseVoltage, {'name': 'BPhaseVoltage', 'value': '2348'})
+        # Reading an unchanged value keeps its sequence
+        cache.put(MeterEquipmentRegister.APhaseVoltage, {'name': 'APhaseVoltage', 'value': '2351'})
+
+        version, entries = cache.get_versioned_entries([MeterEquipmentRegister.APhaseVoltage, MeterEquipmentRegister.BPhaseVoltage,
+                                                        MeterEquipmentRegister.CPhaseVoltage])
+
+        self.assertEqual(f'{cache.epoch}-2', version)
+        self.assertEqual([1, 2], [entry.sequence for entry in entries[:2]])
+        self.assertIsNone(entries[2])
+
+        cache.put(MeterEquipmentRegister.APhaseVoltage, {'name': 'APhaseVoltage', 'value': '2352'})
+
+        self.assertEqual(3, cache.entries[MeterEquipmentRegister.APhaseVoltage].sequence)
+        self.assertEqual(f'{cache.epoch}-3', cache.version)
+
+    def test_version_depends_on_given_registers_only(self) -> None:
+        cache = SnapshotCache()
+        cache.put(MeterEquipmentRegister.APhaseVoltage, {'name': 'APhaseVoltage', 'value': '2351'})
+        cache.put(MeterEquipmentRegister.BPhaseVoltage, {'name': 'BPhaseVoltage', 'value': '2348'})
+        cache.put(MeterEquipmentRegister.BPhaseVoltage, {'name': 'BPhaseVoltage', 'value': '2349'})
+
+        self.assertEqual(f'{cache.epoch}-1', cache.get_versioned_entries([MeterEquipmentRegister.APhaseVoltage])[0])
+        self.assertEqual(f'{cache.epoch}-0', cache.get_versioned_entries([MeterEquipmentRegister.CPhaseVoltage])[0])
+
+    def test_versions_of_other_epochs_are_invalid(self) -> None:
+        cache = SnapshotCache()
+
+        self.assertEqual(12, cache.parse_sequence(f'{cache.epoch}-12'))
+        self.assertIsNone(cache.parse_sequence(f'{SnapshotCache().epoch}-12'))
+        self.assertIsNone(cache.parse_sequence(f'{cache.epoch}-x'))
+        self.assertIsNone(cache.parse_sequence('12'))
@@ -0,0 +1,156 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import werkzeug.exceptions
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+from application.connection import InverterConnection
+
+
+class FakeSun2000:
+
+    def __init__(self, reachable: bool = True):
+        self.reachable = reachable
+        self.connected = False
+        self.connect_calls = 0
+        # The socket was closed by the inverter, which shows only on the next read
+        self.dropped = False
+
+    def connect(self):
+        self.connect_calls += 1
+        self.connected = self.reachable
+        self.dropped = False
+
+    def disconnect(self):
+        self.connected = False
+
+    def isConnected(self):
+        return self.connected
+
+    def read_range(self, start_address, quantity=0, end_address=0):
+        if not self.connected or self.dropped:
+            raise ConnectionException('Not connected')
+        return bytes(quantity * 2)
+
+
+class InverterConnectionTest(unittest.TestCase):
+
+    def create_connection(self, reachable: bool = True, **kwargs) -> InverterConnection:
+        connection = InverterConnection('1.2.3.4', 502, **kwargs)
+        connection.sun2000 = FakeSun2000(reachable)
+        return connection
+
+    def test_connection_is_reused_between_sessions(self) -> None:
+        connection = self.create_connection()
+
+        for _ in range(3):
+            with connection.session():
+                pass
+
+        self.assertEqual(1, connection.sun2000.connect_calls)
+        self.assertEqual({'connects': 1, 'reconnects': 0, 'reuses': 2, 'failures': 0}, connection.metrics)
+
+    def test_connection_is_closed_after_session_without_keep_alive(self) -> None:
+        connection = self.create_connection(keep_alive=False)
+
+        for _ in range(2):
+            with connection.session():
+                pass
+
+        self.assertFalse(connection.sun2000.isConnected())
+        self.assertEqual(2, connection.sun2000.connect_calls)
+
+    def test_broken_connection_is_reestablished_by_next_session(self) -> None:
+        connection = self.create_connection()
+
+        with self.assertRaises(ConnectionException):
+            with connection.session():
+                raise ConnectionException('Connection reset')
+        with connection.session():
+            pass
+
+        self.assertEqual({'connects': 1, 'reconnects': 1, 'reuses': 0, 'failures': 0}, connection.metrics)
+
+    def test_unanswered_read_keeps_connection_and_breaker(self) -> None:
+        connection = self.create_connection(breaker_threshold=1)
+
+        with self.assertRaises(ModbusIOException):
+            with connection.session():
+                raise ModbusIOException('Inverter unit did not respond')
+        with connection.session():
+            pass
+
+        self.assertEqual({'connects': 1, 'reconnects': 0, 'reuses': 1, 'failures': 0}, connection.metrics)
+        self.assertEqual('closed', connection.breaker.snapshot()['breaker'])
+
+    def test_dropped_connection_is_reestablished_and_read_retried(self) -> None:
+        connection = self.create_connection()
+
+        with connection.session() as session:
+            self.assertEqual(bytes(2), session.read_range(32089, 1))
+        connection.sun2000.dropped = True
+        with connection.session() as session:
+            self.assertEqual(bytes(2), session.read_range(32089, 1))
+
+        self.assertEqual({'connects': 1, 'reconnects': 1, 'reuses': 1, 'failures': 0}, connection.metrics)
+
+        # A fresh connection failing is not retried
+        connection.sun2000.connected = False
+        with self.assertRaises(ConnectionException):
+            with connection.session() as session:
+                connection.sun2000.dropped = True
+                session.read_range(32089, 1)
+        self.assertEqual(3, connection.sun2000.connect_calls)
+
+    @patch('time.monotonic', return_value=100.0)
+    def test_reconnecting_is_backed_off_after_failed_attempt(self, monotonic) -> None:
+        connection = self.create_connection(reachable=False, backoff=2, max_backoff=3)
+
+        with self.assertRaises(werkzeug.exceptions.BadGateway):
+            with connection.session():
+                pass
+        self.assertEqual(1, connection.sun2000.connect_calls)
+
+        # Within the backoff period no connection attempt is made
+        monotonic.return_value = 101.0
+        self.assertFalse(connection.connect())
+        self.assertEqual(1, connection.sun2000.connect_calls)
+
+        # After the backoff period the connection is attempted again, the backoff doubling up to max_backoff
+        monotonic.return_value = 102.0
+        self.assertFalse(connection.connect())
+        self.assertEqual(2, connection.sun2000.connect_calls)
+        monotonic.return_value = 104.5
+        self.assertFalse(connection.connect())
+        self.assertEqual(2, connection.sun2000.connect_calls)
+
+        connection.sun2000.reachable = True
+        monotonic.return_value = 105.0
+        self.assertTrue(connection.connect())
+        self.assertEqual({'connects': 1, 'reconnects': 0, 'reuses': 0, 'failures': 2}, connection.metrics)
+
+    def test_breaker_opens_after_consecutive_failures_and_closes_after_probe(self) -> None:
+        connection = self.create_connection(reachable=False, backoff=0, breaker_threshold=2, probe_interval=0.05)
+
+        for _ in range(2):
+            with self.assertRaises(werkzeug.exceptions.BadGateway):
+                with connection.session():
+                    pass
+        self.assertTrue(connection.breaker.is_open())
+
+        # Sessions fail fast while the breaker is open
+        with self.assertRaises(werkzeug.exceptions.BadGateway) as e:
+            with connection.session():
+                pass
+        self.assertEqual('Connection to inverter interrupted, circuit breaker is open', e.exception.description)
+
+        connection.sun2000.reachable = True
+        deadline = time.monotonic() + 2
+        while connection.breaker.is_open() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertFalse(connection.breaker.is_open())
+        self.assertEqual(0, connection.breaker.failures)
+        with connection.session():
+            pass
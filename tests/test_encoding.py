@@ -0,0 +1,41 @@
+import json
+import unittest
+
+from sun2000_modbus.registers import InverterEquipmentRegister
+
+from application import encoding
+
+REGISTERS = [InverterEquipmentRegister.Model, InverterEquipmentRegister.ActivePower]
+REGISTERS_DATA = [
+    {'name': 'Model', 'type': 'string', 'value': 'SUN2000', 'age': 12.5},
+    {'name': 'ActivePower', 'type': 'number', 'value': '-42', 'gain': 1, 'unit': 'W', 'age': 0, 'stale': True}
+]
+
+
+class EncodingTest(unittest.TestCase):
+
+    def test_columnar_json_serializes_values_on_top_of_template(self) -> None:
+        encoding.get_columnar_template.cache_clear()
+        encoded = encoding.encode_columnar_json('inverter', REGISTERS, REGISTERS_DATA, {'inverter': 'roof', 'version': '1a2b-7'})
+        encoding.encode_columnar_json('inverter', REGISTERS, REGISTERS_DATA)
+
+        self.assertEqual({
+            'equipment': 'inverter',
+            'registers': ['Model', 'ActivePower'],
+            'gains': [None, 1],
+            'units': [None, 'W'],
+            'values': ['SUN2000', -42],
+            'mappedValues': [None, None],
+            'ages': [12.5, 0],
+            'stale': [False, True],
+            'inverter': 'roof',
+            'version': '1a2b-7'
+        }, json.loads(encoded))
+        self.assertEqual(1, encoding.get_columnar_template.cache_info().hits)
+
+    @unittest.skipIf(encoding.msgpack is None, 'msgpack is not installed')
+    def test_msgpack_contains_same_columns_as_columnar_json(self) -> None:
+        encoded = encoding.encode_msgpack('inverter', REGISTERS, REGISTERS_DATA, {'version': '1a2b-7'})
+
+        self.assertEqual(json.loads(encoding.encode_columnar_json('inverter', REGISTERS, REGISTERS_DATA, {'version': '1a2b-7'})),
+                         encoding.msgpack.unpackb(encoded))
@@ -0,0 +1,237 @@
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import sun2000mock
+from flask import Flask
+
+from application.exporter import Exporter, InfluxSink, MqttSink, DiskBuffer, format_line_protocol
+from application.poller import Poller
+from application.util import Util
+
+
+def create_record(timestamp: float, value: float) -> dict:
+    return {'timestamp': timestamp, 'inverter': 'default', 'values': [['inverter', 'ActivePower', value], ['inverter', 'Model', 'SUN2000']]}
+
+
+class InfluxStandIn(ThreadingHTTPServer):
+    """Local stand-in of an InfluxDB write endpoint, collecting the lines written and failing while down is set."""
+
+    def __init__(self):
+        self.lines = []
+        self.down = False
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(handler) -> None:
+                body = handler.rfile.read(int(handler.headers['Content-Length'])).decode()
+                if self.down:
+                    handler.send_response(503)
+                else:
+                    self.lines += body.split('\n')
+                    handler.send_response(204)
+                handler.end_headers()
+
+            def log_message(handler, *args) -> None:
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/api/v2/write?org=home&bucket=solar'
+
+
+class MqttStandIn:
+    """Local stand-in of an MQTT broker, acknowledging connections and publishes and collecting the messages published."""
+
+    def __init__(self):
+        self.messages = []
+        self.server = socket.create_server(('127.0.0.1', 0))
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self.server.getsockname()[1]
+
+    def serve(self) -> None:
+        connection, _ = self.server.accept()
+        with connection:
+            stream = connection.makefile('rb')
+            while True:
+                header = stream.read(1)
+                if not header:
+                    return
+                length, shift = 0, 0
+                while True:
+                    digit = stream.read(1)[0]
+                    length |= (digit & 0x7F) << shift
+                    shift += 7
+                    if digit & 0x80 == 0:
+                        break
+                body = stream.read(length)
+                if header[0] == 0x10:
+                    connection.sendall(bytes([0x20, 2, 0, 0]))
+                elif header[0] & 0xF0 == 0x30:
+                    topic_length = struct.unpack('>H', body[:2])[0]
+                    self.messages.append((body[2:2 + topic_length].decode(), body[4 + topic_length:].decode(), bool(header[0] & 0x01)))
+                    connection.sendall(bytes([0x40, 2]) + body[2 + topic_length:4 + topic_length])
+
+
+class ExporterTest(unittest.TestCase):
+
+    def wait_for(self, condition) -> None:
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_records_are_formatted_in_line_protocol(self) -> None:
+        record = {'timestamp': 1672531200.5, 'inverter': 'roof top', 'values': [['inverter', 'ActivePower', 1.5], ['inverter', 'Model', 'SUN2000 "KTL"'],
+                                                                                 ['meter', 'ActivePower', -2]]}
+
+        self.assertEqual(['sun2000,inverter=roof\\ top,equipment=inverter ActivePower=1.5,Model="SUN2000 \\"KTL\\"" 1672531200500000000',
+                          'sun2000,inverter=roof\\ top,equipment=meter ActivePower=-2.0 1672531200500000000'], format_line_protocol([record]))
+
+    def test_records_are_written_to_influx_in_batches(self) -> None:
+        influx = InfluxStandIn()
+        exporter = Exporter(InfluxSink(influx.url), batch_size=2)
+        for index in range(3):
+            exporter.submit(create_record(1000 + index, index))
+        exporter.start()
+
+        self.wait_for(lambda: exporter.sent == 3)
+        exporter.stop()
+
+        self.assertEqual(3, exporter.sent)
+        self.assertEqual(['sun2000,inverter=default,equipment=inverter ActivePower=0.0,Model="SUN2000" 1000000000000',
+                          'sun2000,inverter=default,equipment=inverter ActivePower=1.0,Model="SUN2000" 1001000000000',
+                          'sun2000,inverter=default,equipment=inverter ActivePower=2.0,Model="SUN2000" 1002000000000'], influx.lines)
+        influx.shutdown()
+
+    def test_records_are_buffered_on_disk_while_sink_is_down(self) -> None:
+        influx = InfluxStandIn()
+        influx.down = True
+        with tempfile.TemporaryDirectory() as directory:
+            buffer = DiskBuffer(os.path.join(directory, 'influx.jsonl'), 1024 * 1024)
+            exporter = Exporter(InfluxSink(influx.url), queue_size=1, buffer=buffer, backoff=0.2)
+            exporter.start()
+            exporter.submit(create_record(1000, 0))
+            self.wait_for(lambda: exporter.failures == 1)
+
+            # Records not delivered are kept in memory as long as the queue has room
+            self.assertEqual(0, len(buffer))
+            self.assertEqual(1, exporter.snapshot()['queued'])
+
+            exporter.submit(create_record(1001, 1))
+            self.wait_for(lambda: len(buffer) == 1)
+
+            self.assertEqual(0, exporter.sent)
+            self.assertEqual([1000], [record['timestamp'] for record in DiskBuffer(buffer.path, buffer.max_size).load()])
+
+            # Buffered records are delivered in order once the sink is up again
+            influx.down = False
+            self.wait_for(lambda: exporter.sent == 2)
+            exporter.submit(create_record(1002, 2))
+            self.wait_for(lambda: exporter.sent == 3)
+            exporter.stop()
+
+            self.assertEqual(0, len(buffer))
+            self.assertFalse(os.path.exists(buffer.path))
+        self.assertEqual(['1000000000000', '1001000000000', '1002000000000'], [line.split(' ')[-1] for line in influx.lines])
+        influx.shutdown()
+
+    def test_full_queue_applies_backpressure(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            buffer = DiskBuffer(os.path.join(directory, 'influx.jsonl'), 200)
+            exporter = Exporter(InfluxSink('http://127.0.0.1:1/write'), queue_size=1, buffer=buffer)
+
+            self.assertTrue(exporter.submit(create_record(1000, 0)))
+            started = time.perf_counter()
+            self.assertFalse(exporter.submit(create_record(1001, 1), timeout=0.1))
+            self.assertGreaterEqual(time.perf_counter() - started, 0.1)
+
+            # Records not fitting into the disk buffer are dropped
+            self.assertFalse(exporter.submit(create_record(1002, 2)))
+            self.assertEqual({'sink': 'influx', 'queued': 1, 'buffered': 1, 'sent': 0, 'dropped': 1, 'failures': 0}, exporter.snapshot())
+
+    def test_values_are_published_to_mqtt(self) -> None:
+        broker = MqttStandIn()
+        exporter = Exporter(MqttSink('127.0.0.1', broker.port, 'solar'))
+        exporter.submit(create_record(1000, 1.5))
+        exporter.start()
+
+        self.wait_for(lambda: exporter.sent == 1)
+        exporter.stop()
+        broker.server.close()
+
+        self.assertEqual([('solar/default/inverter/ActivePower', '1.5', True), ('solar/default/inverter/Model', 'SUN2000', True)], broker.messages)
+
+    def test_mqtt_client_id_is_unique_per_process(self) -> None:
+        self.assertEqual(f'sun2000-rest-{socket.gethostname()}-{os.getpid()}', MqttSink('127.0.0.1').client_id)
+        self.assertEqual('sun2000-roof', MqttSink('127.0.0.1', client_id='sun2000-roof').client_id)
+
+
+@patch(
+    'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+)
+@patch.object(Exporter, 'start')
+class PollerExportTest(unittest.TestCase):
+
+    def create_utilities(self, directory: str) -> Util:
+        app = Flask(__name__)
+        app.config.from_mapping({
+            'INVERTER_HOST': '1.2.3.4',
+            'INVERTER_PORT': 502,
+            'ACCEPTED_API_KEYS': '12345,98765',
+            'LOG_LEVEL': 'DEBUG',
+            'POLL_INTERVAL': 5,
+            'POLL_INVERTER_REGISTERS': ['Model', 'DeviceStatus'],
+            'EXPORT_INFLUX_URL': 'http://127.0.0.1:1/write',
+            'EXPORT_BUFFER_PATH': directory
+        })
+        utilities = Util(app)
+        utilities.warmed_up.wait()
+        return utilities
+
+    def test_polled_registers_are_exported(self, start) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            utilities = self.create_utilities(directory)
+            poller = Poller(utilities)
+            poller.poll()
+            poller.stop()
+
+        self.assertEqual(1, len(poller.exporters))
+        start.assert_called_once()
+        record = poller.exporters[0].queue.get_nowait()
+        self.assertEqual('default', record['inverter'])
+        self.assertEqual([['inverter', 'Model', 'SUN2000'], ['inverter', 'DeviceStatus', 512.0]], record['values'])
+        self.assertEqual('influx', utilities.get_instrumentation()['exporters'][0]['sink'])
+
+    def test_only_one_process_exports(self, start) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            poller = Poller(self.create_utilities(directory))
+            other_poller = Poller(self.create_utilities(directory))
+
+            # Exporters are created by the first process polling only
+            self.assertEqual([], poller.exporters)
+            self.assertTrue(poller.is_exporting())
+            self.assertFalse(other_poller.is_exporting())
+            other_poller.poll()
+            self.assertEqual([], other_poller.exporters)
+
+            # The lock is taken over once the exporting process is gone
+            poller.stop()
+            self.assertTrue(other_poller.is_exporting())
+            other_poller.stop()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from sun2000_modbus.registers import InverterEquipmentRegister
+
+from application.history import RingBuffer, HistoryStore, downsample
+
+
+class HistoryTest(unittest.TestCase):
+
+    def test_ring_buffer_overwrites_oldest_values_when_full(self) -> None:
+        buffer = RingBuffer(3)
+        for timestamp in range(5):
+            buffer.append(timestamp, timestamp * 10)
+
+        self.assertEqual(3, len(buffer))
+        self.assertEqual([(2, 20), (3, 30), (4, 40)], buffer.points(0, 10))
+        self.assertEqual([(3, 30)], buffer.points(3, 3))
+
+    def test_memory_mapped_ring_buffer_survives_restart(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            store = HistoryStore(10, directory)
+            store.record(InverterEquipmentRegister.ActivePower, 1000, 4200)
+            store.record(InverterEquipmentRegister.ActivePower, 1005, 4300)
+
+            restarted_store = HistoryStore(10, directory)
+
+            self.assertEqual([{'timestamp': 1000, 'value': 4200}, {'timestamp': 1005, 'value': 4300}],
+                             restarted_store.query(InverterEquipmentRegister.ActivePower, 0, 2000))
+            self.assertTrue(os.path.exists(os.path.join(directory, 'InverterEquipmentRegister.ActivePower')))
+
+            # Changing the capacity discards the persisted values
+            self.assertEqual([], HistoryStore(20, directory).query(InverterEquipmentRegister.ActivePower, 0, 2000))
+
+    def test_history_is_disabled_with_capacity_0(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            HistoryStore(10, directory).record(InverterEquipmentRegister.ActivePower, 1000, 4200)
+
+            store = HistoryStore(0, directory)
+            store.record(InverterEquipmentRegister.ActivePower, 1005, 4300)
+
+            self.assertIsNone(store.query(InverterEquipmentRegister.ActivePower, 0, 2000))
+
+    def test_only_one_process_records_to_persisted_history(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            writer = HistoryStore(10, directory)
+            writer.record(InverterEquipmentRegister.ActivePower, 1000, 4200)
+            other = HistoryStore(10, directory)
+            other.record(InverterEquipmentRegister.ActivePower, 1000, 4200)
+
+            self.assertFalse(other.is_writer())
+            self.assertEqual([{'timestamp': 1000, 'value': 4200}], other.query(InverterEquipmentRegister.ActivePower, 0, 2000))
+
+            # The lock is taken over once the writer is gone
+            writer._writer_lock.close()
+            self.assertTrue(other.is_writer())
+
+    def test_unrecorded_register_has_no_history(self) -> None:
+        store = HistoryStore(10)
+
+        self.assertIsNone(store.query(InverterEquipmentRegister.ActivePower, 0, 2000))
+
+    def test_values_are_downsampled_into_buckets(self) -> None:
+        points = [(100, 1), (105, 3), (110, 5), (125, 7), (129, 9)]
+
+        self.assertEqual([
+            {'timestamp': 100, 'min': 1, 'max': 3, 'avg': 2},
+            {'timestamp': 110, 'min': 5, 'max': 5, 'avg': 5},
+            {'timestamp': 120, 'min': 7, 'max': 9, 'avg': 8}
+        ], downsample(points, 100, 10))
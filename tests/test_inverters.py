@@ -0,0 +1,103 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import sun2000mock
+from flask import Flask
+from sun2000_modbus.registers import InverterEquipmentRegister
+
+from application.inverters import parse_inverters
+from application.util import Util
+
+# Reads sent to the (mocked) inverters, as tuple of host, unit and start address
+InverterReads = []
+OfflineHosts = {'10.0.0.3'}
+
+
+def connect_online(self):
+    return self.inverter.host not in OfflineHosts
+
+
+def slow_read_range(self, start_address, quantity=0, end_address=0):
+    InverterReads.append((self.inverter.host, self.unit, start_address))
+    time.sleep(0.2)
+    return sun2000mock.mock_read_range(self, start_address, quantity, end_address)
+
+
+@patch(
+    'sun2000_modbus.inverter.Sun2000.connect', connect_online
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.isConnected', connect_online
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+)
+class InvertersTest(unittest.TestCase):
+
+    def create_utilities(self, inverters) -> Util:
+        app = Flask(__name__)
+        app.config.from_mapping({
+            'INVERTER_HOST': '1.2.3.4',
+            'INVERTER_PORT': 502,
+            'ACCEPTED_API_KEYS': '12345,98765',
+            'LOG_LEVEL': 'DEBUG',
+            'INVERTERS': inverters
+        })
+        utilities = Util(app)
+        utilities.warmed_up.wait()
+        return utilities
+
+    def test_inverters_are_parsed(self) -> None:
+        self.assertEqual([('first', '10.0.0.1', 502, 0), ('second', '10.0.0.2', 6607, 1)], parse_inverters(['first=10.0.0.1', 'second=10.0.0.2:6607:1'], 502))
+
+        for entries in (['first'], ['=10.0.0.1'], ['first=10.0.0.1:port'], ['first=10.0.0.1:502:1:2']):
+            with self.assertRaises(ValueError):
+                parse_inverters(entries, 502)
+
+        with self.assertRaises(ValueError):
+            parse_inverters(['first=10.0.0.1', 'first=10.0.0.2'], 502)
+
+    def test_invalid_inverters_exit(self) -> None:
+        with self.assertRaises(SystemExit) as e:
+            self.create_utilities(['first=10.0.0.1', 'first=10.0.0.2'])
+
+        self.assertEqual('Error: Inverter names configured are not unique', e.exception.code)
+
+    def test_inverters_are_addressed_by_name(self) -> None:
+        utilities = self.create_utilities(['first=10.0.0.1', 'second=10.0.0.2:502:1'])
+
+        self.assertEqual(['first', 'second'], list(utilities.inverters))
+        self.assertIs(utilities.inverters['first'].connection, utilities.connection)
+
+        with patch('sun2000_modbus.inverter.Sun2000.read_range', slow_read_range):
+            InverterReads.clear()
+            utilities.get_registers_data([InverterEquipmentRegister.ActivePower], inverter_name='second')
+            utilities.get_registers_data([InverterEquipmentRegister.ActivePower])
+
+        self.assertEqual([('10.0.0.2', 1, 32080), ('10.0.0.1', 0, 32080)], InverterReads)
+
+    def test_all_inverters_are_read_concurrently(self) -> None:
+        utilities = self.create_utilities(['first=10.0.0.1', 'second=10.0.0.2', 'offline=10.0.0.3'])
+
+        with patch('sun2000_modbus.inverter.Sun2000.read_range', slow_read_range):
+            InverterReads.clear()
+            started = time.perf_counter()
+            inverters_registers_data = utilities.get_inverters_registers_data([InverterEquipmentRegister.ActivePower, InverterEquipmentRegister.Model])
+            duration = time.perf_counter() - started
+
+        # Latency is the one of the slowest inverter instead of the sum of all inverters
+        self.assertLess(duration, 0.35)
+        self.assertEqual(['first', 'second', 'offline'], list(inverters_registers_data))
+        self.assertEqual('SUN2000', inverters_registers_data['first'][1]['value'])
+        self.assertEqual('SUN2000', inverters_registers_data['second'][1]['value'])
+        self.assertEqual([{'name': 'ActivePower', 'error': 'Connection to inverter could not be established'},
+                          {'name': 'Model', 'error': 'Connection to inverter could not be established'}], inverters_registers_data['offline'])
+        self.assertEqual({('10.0.0.1', 0, 32080), ('10.0.0.2', 0, 32080)}, set(InverterReads))
+
+    def test_unreachable_inverters_do_not_block_startup(self) -> None:
+        utilities = self.create_utilities(['offline=10.0.0.3', 'first=10.0.0.1'])
+
+        self.assertEqual({'ready': False, 'reason': 'Inverter not read yet'}, utilities.get_readiness())
+        self.assertEqual({}, utilities.inverters['offline'].cache.entries)
+        self.assertIn(InverterEquipmentRegister.Model, utilities.inverters['first'].cache.entries)
@@ -3,8 +3,12 @@ import unittest
 from unittest.mock import patch
 
 import sun2000mock
+from flask import Flask
+from pymodbus.exceptions import ModbusIOException
+from sun2000_modbus.registers import MeterEquipmentRegister, InverterEquipmentRegister
 
 from application import create_app
+from application.util import Util
 
 
 class MainTest(unittest.TestCase):
@@ -15,6 +19,9 @@ class MainTest(unittest.TestCase):
     @patch(
         'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
     )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
     def setUp(self) -> None:
         test_config = {
             'INVERTER_HOST': '1.2.3.4',
@@ -25,6 +32,11 @@ class MainTest(unittest.TestCase):
         app = create_app(test_config)
         self.client = app.test_client()
 
+        # The application is created once per process, values cached by previous tests are discarded
+        from application import routes
+        routes.utilities.warmed_up.wait()
+        routes.utilities.cache.clear()
+
     def test_unauthorized_access_to_GET_registers_returns_401(self) -> None:
         response = self.client.get('/registers', query_string={'equipment': 'inverter'})
 
@@ -107,6 +119,24 @@ class MainTest(unittest.TestCase):
         self.assertIn('BPhaseVoltage', response.get_json()['registers'])
         self.assertIn('ABLineVoltage', response.get_json()['registers'])
 
+    def test_calling_GET_registers_with_current_etag_returns_304(self) -> None:
+        response = self.client.get('/registers', query_string={'equipment': 'meter'}, headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertIsNotNone(response.headers.get('ETag'))
+
+        etag = response.headers.get('ETag')
+        response = self.client.get('/registers', query_string={'equipment': 'meter'}, headers={'x-api-key': '12345', 'If-None-Match': etag})
+
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.get_data())
+
+        # The ETag differs per equipment
+        response = self.client.get('/registers', query_string={'equipment': 'battery'}, headers={'x-api-key': '12345', 'If-None-Match': etag})
+
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers.get('ETag'))
+
     def test_providing_no_or_invalid_equipment_calling_POST_registervalues_returns_400(self) -> None:
         registers = ['Model']
 
@@ -155,6 +185,27 @@ class MainTest(unittest.TestCase):
         self.assertEqual(400, response.status_code)
         self.assertEqual({'message': 'At least one invalid register passed'}, response.get_json())
 
+        # Passing null for the registers
+        response = self.client.post('/register-values', data=json.dumps({'equipment': 'inverter', 'registers': None}), content_type='application/json',
+                                    headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'message': 'No value for registers'}, response.get_json())
+
+        # Passing a number instead of a list of registers
+        response = self.client.post('/register-values', data=json.dumps({'equipment': 'inverter', 'registers': 5}), content_type='application/json',
+                                    headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'message': 'At least one invalid register passed'}, response.get_json())
+
+        # Passing a list of registers containing a number
+        response = self.client.post('/register-values', data=json.dumps({'equipment': 'inverter', 'registers': ['Model', 5]}),
+                                    content_type='application/json', headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'message': 'At least one invalid register passed'}, response.get_json())
+
     @patch(
         'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
     )
@@ -164,6 +215,9 @@ class MainTest(unittest.TestCase):
     @patch(
         'sun2000_modbus.inverter.Sun2000.read_raw_value', sun2000mock.mock_read_raw_value
     )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
     def test_calling_POST_registervalues_for_inverter_equipment_returns_requested_register_values(self) -> None:
         registers = ['Model', 'RatedPower', 'State1', 'DeviceStatus', 'QUCharacteristicCurve']
         response = self.client.post('/register-values', data=json.dumps({'equipment': 'inverter', 'registers': registers}), content_type='application/json',
@@ -175,31 +229,36 @@ class MainTest(unittest.TestCase):
                 {
                     'name': 'Model',
                     'type': 'string',
-                    'value': 'SUN2000'
+                    'value': 'SUN2000',
+                    'age': 0
                 },
                 {
                     'name': 'RatedPower',
                     'type': 'number',
                     'unit': 'W',
                     'value': '10000',
-                    'gain': 1
+                    'gain': 1,
+                    'age': 0
                 },
                 {
                     'name': 'State1',
                     'type': 'string',
-                    'value': '0000000000000110'
+                    'value': '0000000000000110',
+                    'age': 0
                 },
                 {
                     'name': 'DeviceStatus',
                     'type': 'number',
                     'value': '512',
                     'gain': 1,
-                    'mappedValue': 'On-grid'
+                    'mappedValue': 'On-grid',
+                    'age': 0
                 },
                 {
                     'name': 'QUCharacteristicCurve',
                     'type': 'string',
-                    'value': '000403a201b403ca000004060000042efe4c000000000000000000000000000000000000000000000000'
+                    'value': '000403a201b403ca000004060000042efe4c000000000000000000000000000000000000000000000000',
+                    'age': 0
                 }
             ]
         }
@@ -216,6 +275,9 @@ class MainTest(unittest.TestCase):
     @patch(
         'sun2000_modbus.inverter.Sun2000.read_raw_value', sun2000mock.mock_read_raw_value
     )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
     def test_calling_POST_registervalues_for_battery_equipment_returns_requested_register_values(self) -> None:
         registers = ['TotalCharge', 'SwitchToOffGrid']
         response = self.client.post('/register-values', data=json.dumps({'equipment': 'battery', 'registers': registers}), content_type='application/json',
@@ -229,14 +291,16 @@ class MainTest(unittest.TestCase):
                     'type': 'number',
                     'unit': 'kWh',
                     'value': '548542',
-                    'gain': 100
+                    'gain': 100,
+                    'age': 0
                 },
                 {
                     'name': 'SwitchToOffGrid',
                     'type': 'number',
                     'value': '0',
                     'gain': 1,
-                    'mappedValue': 'Switch from grid-tied to off-grid'
+                    'mappedValue': 'Switch from grid-tied to off-grid',
+                    'age': 0
                 }
             ]
         }
@@ -253,6 +317,9 @@ class MainTest(unittest.TestCase):
     @patch(
         'sun2000_modbus.inverter.Sun2000.read_raw_value', sun2000mock.mock_read_raw_value
     )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
     def test_calling_POST_registervalues_for_meter_equipment_returns_requested_register_values(self) -> None:
         registers = ['MeterType', 'CPhaseVoltage']
         response = self.client.post('/register-values', data=json.dumps({'equipment': 'meter', 'registers': registers}), content_type='application/json',
@@ -266,14 +333,16 @@ class MainTest(unittest.TestCase):
                     'type': 'number',
                     'value': '1',
                     'gain': 1,
-                    'mappedValue': 'three-phase'
+                    'mappedValue': 'three-phase',
+                    'age': 0
                 },
                 {
                     'name': 'CPhaseVoltage',
                     'type': 'number',
                     'unit': 'V',
                     'value': '2356',
-                    'gain': 10
+                    'gain': 10,
+                    'age': 0
                 }
 
             ]
@@ -282,6 +351,74 @@ class MainTest(unittest.TestCase):
         self.assertEqual(200, response.status_code)
         self.assertEqual(expected_response_json, response.get_json())
 
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_raw_value', sun2000mock.mock_read_raw_value
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
+    def test_calling_POST_registervalues_reads_mapped_registers_only_once(self) -> None:
+        sun2000mock.ReadRequests.clear()
+        registers = ['State1', 'DeviceStatus']
+        response = self.client.post('/register-values', data=json.dumps({'equipment': 'inverter', 'registers': registers}), content_type='application/json',
+                                    headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('On-grid', response.get_json()['registers'][1]['mappedValue'])
+        self.assertEqual([(32000, 1), (32089, 1)], sun2000mock.ReadRequests)
+
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
+    def test_calling_POST_registervalues_accepting_columnar_json_returns_compact_response(self) -> None:
+        registers = ['MeterType', 'CPhaseVoltage']
+        response = self.client.post('/register-values', data=json.dumps({'equipment': 'meter', 'registers': registers}), content_type='application/json',
+                                    headers={'x-api-key': '12345', 'accept': 'application/vnd.sun2000.columnar+json'})
+
+        expected_response_json = {
+            'equipment': 'meter',
+            'registers': ['MeterType', 'CPhaseVoltage'],
+            'gains': [1, 10],
+            'units': [None, 'V'],
+            'values': [1, 2356],
+            'mappedValues': ['three-phase', None],
+            'ages': [0, 0],
+            'stale': [False, False]
+        }
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/vnd.sun2000.columnar+json', response.mimetype)
+        self.assertEqual(expected_response_json, json.loads(response.data))
+        self.assertEqual('Accept', response.headers['Vary'])
+
+        # The JSON representation of the same registers has its own ETag
+        columnar_etag = response.headers['ETag']
+        response = self.client.post('/register-values', data=json.dumps({'equipment': 'meter', 'registers': registers}), content_type='application/json',
+                                    headers={'x-api-key': '12345', 'If-None-Match': columnar_etag})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/json', response.mimetype)
+        self.assertNotEqual(columnar_etag, response.headers['ETag'])
+        self.assertEqual('Accept', response.headers['Vary'])
+
+        response = self.client.post('/register-values', data=json.dumps({'equipment': 'meter', 'registers': registers}), content_type='application/json',
+                                    headers={'x-api-key': '12345', 'accept': 'application/vnd.sun2000.columnar+json', 'If-None-Match': columnar_etag})
+
+        self.assertEqual(304, response.status_code)
+        self.assertEqual('Accept', response.headers['Vary'])
+
     @patch(
         'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_fail
     )
@@ -289,32 +426,449 @@ class MainTest(unittest.TestCase):
         'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_fail
     )
     def test_calling_POST_registervalues_when_inverter_connection_fails_returns_502(self) -> None:
-        registers = ['Model']
+        registers = ['ActivePower']
         response = self.client.post('/register-values', data=json.dumps({'equipment': 'inverter', 'registers': registers}), content_type='application/json',
                                     headers={'x-api-key': '12345'})
 
         self.assertEqual(502, response.status_code)
         self.assertEqual({'message': 'Connection to inverter could not be established'}, response.get_json())
 
-    def test_calling_GET_health_returns_204(self) -> None:
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
+    def test_calling_POST_registervalues_since_version_returns_changed_registers_only(self) -> None:
+        def post(body: dict, headers: dict = None):
+            return self.client.post('/register-values', data=json.dumps(dict(body, equipment='inverter', registers=['DeviceStatus', 'ActivePower'])),
+                                    content_type='application/json', headers=dict(headers or {}, **{'x-api-key': '12345'}))
+
+        response = post({'since': None})
+
+        self.assertEqual(200, response.status_code)
+        version = response.get_json()['version']
+        self.assertEqual(['DeviceStatus', 'ActivePower'], [register['name'] for register in response.get_json()['registers']])
+        self.assertEqual(version, response.headers['X-Registers-Version'])
+        etag = response.headers['ETag']
+
+        response = post({'since': version})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'equipment': 'inverter', 'registers': [], 'version': version}, response.get_json())
+        self.assertEqual(etag, response.headers['ETag'])
+
+        response = post({}, {'If-None-Match': etag})
+
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.get_data())
+
+        # Changes of other registers leave the version and ETag untouched
+        self.client.post('/register-values', data=json.dumps({'equipment': 'meter', 'registers': ['CPhaseVoltage']}), content_type='application/json',
+                         headers={'x-api-key': '12345'})
+        response = post({'since': version}, {'If-None-Match': etag})
+
+        self.assertEqual(304, response.status_code)
+
+        with patch.dict(sun2000mock.MockedRawResponses, {InverterEquipmentRegister.DeviceStatus: 513}):
+            response = post({'since': version}, {'If-None-Match': etag})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([('DeviceStatus', '513')], [(register['name'], register['value']) for register in response.get_json()['registers']])
+        self.assertNotEqual(version, response.get_json()['version'])
+        self.assertNotEqual(etag, response.headers['ETag'])
+
+        # Versions of other processes or before a restart are answered with all registers
+        response = post({'since': 'unknown-1'})
+
+        self.assertEqual(2, len(response.get_json()['registers']))
+
+        response = post({'since': 5})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'message': 'Invalid value for since'}, response.get_json())
+
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
+    def test_calling_POST_registervalues_with_preset_returns_preset_register_values(self) -> None:
+        response = self.client.put('/presets/voltages', data=json.dumps({'equipment': 'meter', 'registers': ['CPhaseVoltage', 'MeterType']}),
+                                   content_type='application/json', headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'name': 'voltages', 'equipment': 'meter', 'registers': ['CPhaseVoltage', 'MeterType']}, response.get_json())
+
+        response = self.client.get('/presets', headers={'x-api-key': '12345'})
+
+        self.assertIn({'name': 'voltages', 'equipment': 'meter', 'registers': ['CPhaseVoltage', 'MeterType']}, response.get_json()['presets'])
+
+        response = self.client.post('/register-values', data=json.dumps({'preset': 'voltages'}), content_type='application/json',
+                                    headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('meter', response.get_json()['equipment'])
+        self.assertEqual([('CPhaseVoltage', '2356'), ('MeterType', '1')],
+                         [(register['name'], register['value']) for register in response.get_json()['registers']])
+
+        for preset in ('unknown', ['voltages']):
+            response = self.client.post('/register-values', data=json.dumps({'preset': preset}), content_type='application/json',
+                                        headers={'x-api-key': '12345'})
+
+            self.assertEqual(400, response.status_code)
+            self.assertEqual({'message': 'Invalid value for preset'}, response.get_json())
+
+        response = self.client.put('/presets/voltages', data=json.dumps({'equipment': 'meter', 'registers': ['Unknown']}), content_type='application/json',
+                                   headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, response.status_code)
+
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.disconnect', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range_without_battery
+    )
+    def test_calling_POST_registervaluesbatch_returns_partial_results(self) -> None:
+        equipments = [
+            {'equipment': 'inverter', 'registers': ['RatedPower', 'InvalidRegister']},
+            {'equipment': 'battery', 'registers': ['TotalCharge']},
+            {'equipment': 'meter', 'registers': ['CPhaseVoltage']},
+            {'equipment': 'invalid_equipment', 'registers': ['CPhaseVoltage']},
+            {'equipment': 'meter'}
+        ]
+        response = self.client.post('/register-values/batch', data=json.dumps({'equipments': equipments}), content_type='application/json',
+                                    headers={'x-api-key': '12345'})
+
+        expected_response_json = {
+            'equipments': [
+                {
+                    'equipment': 'inverter',
+                    'registers': [
+                        {'name': 'RatedPower', 'type': 'number', 'value': '10000', 'gain': 1, 'unit': 'W', 'age': 0},
+                        {'name': 'InvalidRegister', 'error': 'Invalid register'}
+                    ]
+                },
+                {
+                    'equipment': 'battery',
+                    'registers': [
+                        {'name': 'TotalCharge', 'error': 'Modbus Error: [Input/Output] Inverter unit did not respond'}
+                    ]
+                },
+                {
+                    'equipment': 'meter',
+                    'registers': [
+                        {'name': 'CPhaseVoltage', 'type': 'number', 'value': '2356', 'gain': 10, 'unit': 'V', 'age': 0}
+                    ]
+                },
+                {'equipment': 'invalid_equipment', 'error': 'Invalid value for equipment'},
+                {'equipment': 'meter', 'error': 'No value for registers'}
+            ]
+        }
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(expected_response_json, response.get_json())
+
+    def test_providing_non_string_equipment_calling_POST_registervaluesbatch_returns_error_for_equipment(self) -> None:
+        equipments = [
+            {'equipment': 5, 'registers': ['RatedPower']},
+            {'equipment': ['inverter'], 'registers': ['RatedPower']}
+        ]
+        response = self.client.post('/register-values/batch', data=json.dumps({'equipments': equipments}), content_type='application/json',
+                                    headers={'x-api-key': '12345'})
+
+        expected_response_json = {
+            'equipments': [
+                {'equipment': 5, 'error': 'Invalid value for equipment'},
+                {'equipment': ['inverter'], 'error': 'Invalid value for equipment'}
+            ]
+        }
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(expected_response_json, response.get_json())
+
+    def test_providing_no_equipments_calling_POST_registervaluesbatch_returns_400(self) -> None:
+        response = self.client.post('/register-values/batch', data=json.dumps({}), content_type='application/json', headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'message': 'No value for equipments'}, response.get_json())
+
+        response = self.client.post('/register-values/batch', data=json.dumps({'equipments': ['meter']}), content_type='application/json',
+                                    headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'message': 'Invalid value for equipments'}, response.get_json())
+
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
+    def test_calling_GET_registervaluesstream_streams_requested_register_values(self) -> None:
+        response = self.client.get('/register-values/stream', query_string={'equipment': 'meter', 'registers': 'MeterType,CPhaseVoltage'},
+                                   headers={'x-api-key': '12345'}, buffered=False)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('text/event-stream; charset=utf-8', response.content_type)
+
+        event = next(response.response).decode('utf-8')
+        response.close()
+
+        self.assertTrue(event.startswith('event: values\ndata: '))
+        self.assertEqual({
+            'equipment': 'meter',
+            'registers': [
+                {
+                    'name': 'MeterType',
+                    'type': 'number',
+                    'value': '1',
+                    'gain': 1,
+                    'mappedValue': 'three-phase'
+                },
+                {
+                    'name': 'CPhaseVoltage',
+                    'type': 'number',
+                    'unit': 'V',
+                    'value': '2356',
+                    'gain': 10
+                }
+            ]
+        }, json.loads(event[len('event: values\ndata: '):]))
+
+    def test_providing_invalid_parameters_calling_GET_registervaluesstream_returns_400(self) -> None:
+        response = self.client.get('/register-values/stream', query_string={'equipment': 'meter'}, headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'message': 'No value for registers'}, response.get_json())
+
+        for interval in ('0', 'nan', 'inf'):
+            response = self.client.get('/register-values/stream', query_string={'equipment': 'meter', 'registers': 'MeterType', 'interval': interval},
+                                       headers={'x-api-key': '12345'})
+
+            self.assertEqual(400, response.status_code)
+            self.assertEqual({'message': 'Invalid value for interval'}, response.get_json())
+
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
+    def test_calling_inverters_endpoints_addresses_configured_inverters(self) -> None:
+        response = self.client.get('/inverters', headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'inverters': [{'name': 'default', 'host': '1.2.3.4', 'port': 502, 'unit': 0}]}, response.get_json())
+
+        response = self.client.post('/inverters/register-values', data=json.dumps({'equipment': 'meter', 'registers': ['CPhaseVoltage']}),
+                                    content_type='application/json', headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({
+            'equipment': 'meter',
+            'inverters': [
+                {'inverter': 'default', 'registers': [{'name': 'CPhaseVoltage', 'type': 'number', 'value': '2356', 'gain': 10, 'unit': 'V', 'age': 0}]}
+            ]
+        }, response.get_json())
+
+        response = self.client.post('/register-values', data=json.dumps({'equipment': 'meter', 'registers': ['CPhaseVoltage'], 'inverter': 'default'}),
+                                    content_type='application/json', headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('default', response.get_json()['inverter'])
+
+        response = self.client.post('/register-values', data=json.dumps({'equipment': 'meter', 'registers': ['CPhaseVoltage'], 'inverter': 'unknown'}),
+                                    content_type='application/json', headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'message': 'Invalid value for inverter'}, response.get_json())
+
+        response = self.client.post('/register-values', data=json.dumps({'equipment': 'meter', 'registers': ['CPhaseVoltage'], 'inverter': ['default']}),
+                                    content_type='application/json', headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'message': 'Invalid value for inverter'}, response.get_json())
+
+    def test_calling_POST_endpoints_with_non_object_body_returns_400(self) -> None:
+        for path in ('/register-values', '/register-values/batch', '/presets/live-power', '/inverters/register-values'):
+            method = self.client.put if path.startswith('/presets') else self.client.post
+            response = method(path, data=json.dumps(['meter']), content_type='application/json', headers={'x-api-key': '12345'})
+
+            self.assertEqual(400, response.status_code)
+            self.assertEqual({'message': 'Invalid request body'}, response.get_json())
+
+    def test_calling_GET_registerhistory_returns_recorded_values(self) -> None:
+        from application import routes
+
+        response = self.client.get('/register-history', query_string={'equipment': 'meter', 'register': 'BPhaseVoltage'}, headers={'x-api-key': '12345'})
+
+        self.assertEqual(404, response.status_code)
+        self.assertEqual({'message': 'No history recorded for register'}, response.get_json())
+
+        routes.utilities.history.record(MeterEquipmentRegister.BPhaseVoltage, 1000, 2351)
+        routes.utilities.history.record(MeterEquipmentRegister.BPhaseVoltage, 1005, 2349)
+        routes.utilities.history.record(MeterEquipmentRegister.BPhaseVoltage, 1010, 2355)
+
+        response = self.client.get('/register-history', query_string={'equipment': 'meter', 'register': 'BPhaseVoltage', 'start': 1000, 'end': 1005},
+                                   headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({
+            'equipment': 'meter',
+            'register': 'BPhaseVoltage',
+            'gain': 10,
+            'unit': 'V',
+            'values': [{'timestamp': 1000, 'value': 2351}, {'timestamp': 1005, 'value': 2349}]
+        }, response.get_json())
+
+        response = self.client.get('/register-history',
+                                   query_string={'equipment': 'meter', 'register': 'BPhaseVoltage', 'start': 1000, 'end': 1010, 'step': 10},
+                                   headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([{'timestamp': 1000, 'min': 2349, 'max': 2351, 'avg': 2350}, {'timestamp': 1010, 'min': 2355, 'max': 2355, 'avg': 2355}],
+                         response.get_json()['values'])
+
+        response = self.client.get('/register-history', query_string={'equipment': 'meter', 'register': 'BPhaseVoltage', 'step': 'invalid'},
+                                   headers={'x-api-key': '12345'})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'message': 'Invalid value for step'}, response.get_json())
+
+    def test_calling_GET_metrics_returns_metrics_in_text_exposition_format(self) -> None:
+        response = self.client.get('/metrics')
+
+        self.assertEqual(401, response.status_code)
+
+        response = self.client.get('/metrics', headers={'authorization': 'Bearer 98765'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('text/plain; version=0.0.4; charset=utf-8', response.content_type)
+        self.assertIn('# TYPE sun2000_modbus_read_duration_seconds histogram', response.get_data(as_text=True))
+        self.assertIn('# TYPE sun2000_modbus_reads_total counter', response.get_data(as_text=True))
+
+    def test_read_error_calling_GET_metrics_still_returns_instrumentation(self) -> None:
+        from application import routes
+        with patch.object(routes.poller, 'registers', [MeterEquipmentRegister.CPhaseVoltage]), \
+                patch('sun2000_modbus.inverter.Sun2000.read_range', side_effect=ModbusIOException('Inverter unit did not respond')):
+            response = self.client.get('/metrics', headers={'authorization': 'Bearer 98765'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertIn('sun2000_up 0', response.get_data(as_text=True).splitlines())
+        self.assertIn('# TYPE sun2000_modbus_reads_total counter', response.get_data(as_text=True))
+
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
+    def test_timing_enabled_calling_POST_registervalues_reports_phases(self) -> None:
+        from application import routes
+        with patch.object(routes.utilities, 'timing_enabled', True):
+            response = self.client.post('/register-values', data=json.dumps({'equipment': 'meter', 'registers': ['CPhaseVoltage']}),
+                                        content_type='application/json', headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        phases = [metric.split(';')[0] for metric in response.headers['Server-Timing'].split(', ')]
+        self.assertEqual(['auth', 'validation', 'cache', 'connect', 'read', 'decode', 'serialize', 'total'], phases)
+
+        response = self.client.get('/stats', headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertFalse(response.get_json()['enabled'])
+        stats = response.get_json()['paths']['/register-values']
+        self.assertEqual(1, stats['read']['count'])
+        self.assertEqual(2, stats['validation']['count'])
+        self.assertIsNotNone(stats['total']['p99'])
+
+        # Requests are not timed while timing is disabled
+        response = self.client.get('/registers', query_string={'equipment': 'inverter'}, headers={'x-api-key': '12345'})
+
+        self.assertNotIn('Server-Timing', response.headers)
+
+        response = self.client.get('/stats/profile', headers={'x-api-key': '12345'})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('No requests profiled, sample rate is 0\n', response.get_data(as_text=True))
+
+        for limit in ('0', 'nan', 'inf', 'invalid'):
+            response = self.client.get('/stats/profile', query_string={'limit': limit}, headers={'x-api-key': '12345'})
+
+            self.assertEqual(400, response.status_code)
+            self.assertEqual({'message': 'Invalid value for limit'}, response.get_json())
+
+    def test_calling_GET_health_live_and_ready_returns_200(self) -> None:
+        response = self.client.get('/health/live')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'status': 'alive'}, response.get_json())
+
+        response = self.client.get('/health/ready')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'ready': True}, response.get_json())
+
+        from application import routes
+        with patch.object(routes.utilities.connection.breaker, 'last_success', None):
+            response = self.client.get('/health/ready')
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual({'ready': False, 'reason': 'Inverter not read yet'}, response.get_json())
+
+    def test_calling_GET_health_returns_breaker_state(self) -> None:
         response = self.client.get('/health')
 
-        self.assertEqual(204, response.status_code)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('ok', response.get_json()['status'])
+        self.assertEqual('default', response.get_json()['inverters'][0]['name'])
+        self.assertEqual('closed', response.get_json()['inverters'][0]['breaker'])
+        self.assertIn('lastReadAge', response.get_json()['inverters'][0])
 
 
 class ConnectionFailTest(unittest.TestCase):
 
+    def tearDown(self) -> None:
+        # The inverter is retried in the background until it was reached
+        self.utilities.stop_warm_up()
+        self.assertFalse(self.utilities.warm_up.is_alive())
+
     @patch(
         'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_fail
     )
-    def test_connection_to_inverter_fails_application_exits(self) -> None:
-        test_config = {
+    def test_connection_to_inverter_fails_application_starts_not_ready(self) -> None:
+        app = Flask(__name__)
+        app.config.from_mapping({
             'INVERTER_HOST': '1.2.3.4',
             'INVERTER_PORT': 502,
             'ACCEPTED_API_KEYS': '12345,98765',
             'LOG_LEVEL': 'DEBUG'
-        }
-        with self.assertRaises(SystemExit) as e:
-            create_app(test_config)
+        })
+        self.utilities = Util(app)
+        self.utilities.warmed_up.wait()
 
-        self.assertEqual('Connection to inverter could not be established', e.exception.code)
+        self.assertEqual({'ready': False, 'reason': 'Inverter not read yet'}, self.utilities.get_readiness())
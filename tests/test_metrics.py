@@ -0,0 +1,48 @@
+import unittest
+
+from sun2000_modbus.registers import InverterEquipmentRegister, MeterEquipmentRegister
+
+from application import metrics
+from application.metrics import ReadMetrics
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_registers_are_rendered_with_gain_and_unit_applied(self) -> None:
+        registers_data = [
+            ('meter', MeterEquipmentRegister.CPhaseVoltage, {'name': 'CPhaseVoltage', 'type': 'number', 'value': '2356', 'gain': 10, 'unit': 'V'}),
+            ('inverter', InverterEquipmentRegister.DeviceStatus, {'name': 'DeviceStatus', 'type': 'number', 'value': '512', 'gain': 1}),
+            ('inverter', InverterEquipmentRegister.Model, {'name': 'Model', 'type': 'string', 'value': 'SUN2000'})
+        ]
+        read_metrics = ReadMetrics()
+        instrumentation = read_metrics.snapshot()
+        instrumentation.update({'connection': {'connects': 1, 'reconnects': 0},
+                                'exporters': [{'sink': 'influx', 'queued': 2, 'buffered': 0, 'sent': 40, 'dropped': 1, 'failures': 3}]})
+
+        lines = metrics.render(registers_data, instrumentation).splitlines()
+
+        self.assertIn('sun2000_register_value{equipment="meter",register="CPhaseVoltage",unit="V"} 235.6', lines)
+        self.assertIn('sun2000_register_value{equipment="inverter",register="DeviceStatus"} 512.0', lines)
+        self.assertFalse(any('register="Model"' in line for line in lines))
+        self.assertIn('sun2000_connection_events_total{event="connects"} 1', lines)
+        self.assertIn('sun2000_export_queued{sink="influx"} 2', lines)
+        self.assertIn('sun2000_export_dropped_total{sink="influx"} 1', lines)
+
+    def test_read_instrumentation_is_rendered_as_histogram_and_counters(self) -> None:
+        read_metrics = ReadMetrics()
+        read_metrics.observe(0.03)
+        read_metrics.observe(0.2)
+        read_metrics.observe(20, error=True)
+        instrumentation = read_metrics.snapshot()
+        instrumentation.update({'connection': {}, 'exporters': []})
+
+        lines = metrics.render([], instrumentation).splitlines()
+
+        self.assertIn('sun2000_modbus_read_duration_seconds_bucket{le="0.025"} 0', lines)
+        self.assertIn('sun2000_modbus_read_duration_seconds_bucket{le="0.05"} 1', lines)
+        self.assertIn('sun2000_modbus_read_duration_seconds_bucket{le="0.25"} 2', lines)
+        self.assertIn('sun2000_modbus_read_duration_seconds_bucket{le="10"} 2', lines)
+        self.assertIn('sun2000_modbus_read_duration_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn('sun2000_modbus_read_duration_seconds_count 3', lines)
+        self.assertIn('sun2000_modbus_reads_total 3', lines)
+        self.assertIn('sun2000_modbus_read_errors_total 1', lines)
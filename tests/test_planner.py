@@ -0,0 +1,59 @@
+import unittest
+
+from sun2000_modbus.registers import InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister
+
+from application.planner import plan_reads, MAX_BLOCK_QUANTITY
+
+
+class PlannerTest(unittest.TestCase):
+
+    def test_adjacent_registers_are_merged_into_one_block(self) -> None:
+        registers = [InverterEquipmentRegister.PV2Voltage, InverterEquipmentRegister.PV1Voltage, InverterEquipmentRegister.PV1Current]
+
+        blocks = plan_reads(registers)
+
+        self.assertEqual(1, len(blocks))
+        self.assertEqual(32016, blocks[0].address)
+        self.assertEqual(3, blocks[0].quantity)
+        self.assertEqual([InverterEquipmentRegister.PV1Voltage, InverterEquipmentRegister.PV1Current, InverterEquipmentRegister.PV2Voltage],
+                         blocks[0].registers)
+
+    def test_registers_separated_by_more_than_max_gap_are_read_in_separate_blocks(self) -> None:
+        # State1 (32000) and State2 (32002) are separated by a gap of one register
+        registers = [InverterEquipmentRegister.State1, InverterEquipmentRegister.State2]
+
+        self.assertEqual(2, len(plan_reads(registers, max_gap=0)))
+
+        blocks = plan_reads(registers, max_gap=1)
+        self.assertEqual(1, len(blocks))
+        self.assertEqual(3, blocks[0].quantity)
+
+    def test_registers_of_several_equipments_are_planned_in_address_order(self) -> None:
+        registers = [MeterEquipmentRegister.MeterType, BatteryEquipmentRegister.RunningStatus, InverterEquipmentRegister.Model]
+
+        blocks = plan_reads(registers)
+
+        self.assertEqual(sorted(register.value.address for register in registers), [block.address for block in blocks])
+
+    def test_blocks_do_not_exceed_maximum_quantity(self) -> None:
+        registers = list(BatteryEquipmentRegister)
+
+        blocks = plan_reads(registers, max_gap=1000)
+
+        self.assertGreater(len(blocks), 1)
+        for block in blocks:
+            self.assertLessEqual(block.quantity, MAX_BLOCK_QUANTITY)
+        self.assertEqual(len(registers), sum(len(block.registers) for block in blocks))
+
+    def test_duplicate_registers_are_read_once(self) -> None:
+        blocks = plan_reads([InverterEquipmentRegister.Model, InverterEquipmentRegister.Model])
+
+        self.assertEqual(1, len(blocks))
+        self.assertEqual([InverterEquipmentRegister.Model], blocks[0].registers)
+
+    def test_register_values_are_decoded_from_block_payload(self) -> None:
+        blocks = plan_reads([InverterEquipmentRegister.PV1Voltage, InverterEquipmentRegister.PV1Current])
+        payload = b'\x0b\xb8\xff\x9c'
+
+        self.assertEqual(3000, blocks[0].decode(payload, InverterEquipmentRegister.PV1Voltage))
+        self.assertEqual(-100, blocks[0].decode(payload, InverterEquipmentRegister.PV1Current))
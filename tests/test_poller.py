@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+
+import sun2000mock
+from flask import Flask
+from sun2000_modbus.registers import InverterEquipmentRegister
+
+from application.poller import Poller
+from application.util import Util
+
+
+@patch(
+    'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+)
+class PollerTest(unittest.TestCase):
+
+    def create_utilities(self, **config) -> Util:
+        app = Flask(__name__)
+        app.config.from_mapping({
+            'INVERTER_HOST': '1.2.3.4',
+            'INVERTER_PORT': 502,
+            'ACCEPTED_API_KEYS': '12345,98765',
+            'LOG_LEVEL': 'DEBUG',
+            'POLL_INTERVAL': 5,
+            'POLL_INVERTER_REGISTERS': ['Model', 'DeviceStatus'],
+            **config
+        })
+        utilities = Util(app)
+        utilities.warmed_up.wait()
+        return utilities
+
+    def test_polled_registers_are_served_from_cache(self) -> None:
+        utilities = self.create_utilities()
+        Poller(utilities).poll()
+
+        sun2000mock.ReadRequests.clear()
+        registers_data = utilities.get_registers_data([InverterEquipmentRegister.DeviceStatus, InverterEquipmentRegister.Model])
+
+        self.assertEqual([], sun2000mock.ReadRequests)
+        self.assertEqual('On-grid', registers_data[0]['mappedValue'])
+        self.assertEqual('SUN2000', registers_data[1]['value'])
+
+    def test_registers_not_polled_or_outdated_are_read_from_inverter(self) -> None:
+        utilities = self.create_utilities(CACHE_MAX_AGE=-1)
+        Poller(utilities).poll()
+
+        sun2000mock.ReadRequests.clear()
+        utilities.get_registers_data([InverterEquipmentRegister.DeviceStatus])
+        self.assertEqual([(32089, 1)], sun2000mock.ReadRequests)
+
+        utilities = self.create_utilities()
+        Poller(utilities).poll()
+
+        sun2000mock.ReadRequests.clear()
+        utilities.get_registers_data([InverterEquipmentRegister.DeviceStatus, InverterEquipmentRegister.State1])
+        self.assertEqual([(32000, 1)], sun2000mock.ReadRequests)
+
+    def test_cache_is_not_used_when_polling_is_disabled(self) -> None:
+        utilities = self.create_utilities(POLL_INTERVAL=0)
+        utilities.get_registers_data([InverterEquipmentRegister.DeviceStatus])
+
+        sun2000mock.ReadRequests.clear()
+        utilities.get_registers_data([InverterEquipmentRegister.DeviceStatus])
+        self.assertEqual([(32089, 1)], sun2000mock.ReadRequests)
+
+    def test_invalid_polling_register_exits(self) -> None:
+        utilities = self.create_utilities(POLL_BATTERY_REGISTERS=['Model'])
+
+        with self.assertRaises(SystemExit) as e:
+            Poller(utilities)
+
+        self.assertEqual('Error: Invalid register Model configured for polling equipment battery', e.exception.code)
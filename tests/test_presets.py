@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch
+
+import sun2000mock
+import werkzeug.exceptions
+from flask import Flask
+from sun2000_modbus.registers import InverterEquipmentRegister
+
+from application.presets import parse_presets
+from application.util import Util
+
+
+@patch(
+    'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+)
+class PresetsTest(unittest.TestCase):
+
+    def create_utilities(self, presets) -> Util:
+        app = Flask(__name__)
+        app.config.from_mapping({
+            'INVERTER_HOST': '1.2.3.4',
+            'INVERTER_PORT': 502,
+            'ACCEPTED_API_KEYS': '12345,98765',
+            'LOG_LEVEL': 'DEBUG',
+            'READ_MAX_GAP': 10,
+            'PRESETS': presets
+        })
+        utilities = Util(app)
+        utilities.warmed_up.wait()
+        return utilities
+
+    def test_presets_are_parsed(self) -> None:
+        self.assertEqual([('live-power', 'inverter', ['ActivePower', 'DeviceStatus'])], parse_presets(['live-power=inverter:ActivePower;DeviceStatus']))
+
+        for entries in (['live-power'], ['=inverter:ActivePower'], ['live-power=inverter'], ['live power=inverter:ActivePower']):
+            with self.assertRaises(ValueError):
+                parse_presets(entries)
+
+    def test_invalid_presets_exit(self) -> None:
+        with self.assertRaises(SystemExit) as e:
+            self.create_utilities(['live-power=inverter:ActivePower;Unknown'])
+
+        self.assertEqual("Error: Invalid equipment or register 'Unknown' configured for presets", e.exception.code)
+
+    def test_presets_are_read_by_plan(self) -> None:
+        utilities = self.create_utilities(['live-power=inverter:DeviceStatus;ActivePower'])
+        preset = utilities.presets['live-power']
+
+        self.assertEqual([(32080, 10)], [block.key for block in preset.blocks])
+
+        sun2000mock.ReadRequests.clear()
+        equipment_value, registers, version, changed_registers, registers_data = utilities.get_preset_changes('live-power')
+
+        self.assertEqual('inverter', equipment_value)
+        self.assertEqual([InverterEquipmentRegister.DeviceStatus, InverterEquipmentRegister.ActivePower], registers)
+        self.assertEqual(registers, changed_registers)
+        self.assertEqual(['512', '0'], [register_data['value'] for register_data in registers_data])
+        self.assertEqual([(32080, 10)], sun2000mock.ReadRequests)
+
+        _, _, _, changed_registers, _ = utilities.get_preset_changes('live-power', version)
+
+        self.assertEqual([], changed_registers)
+
+        with self.assertRaises(werkzeug.exceptions.BadRequest):
+            utilities.get_preset_changes('unknown')
+
+    def test_presets_are_defined_at_runtime(self) -> None:
+        utilities = self.create_utilities([])
+
+        self.assertEqual({'name': 'status', 'equipment': 'inverter', 'registers': ['DeviceStatus']},
+                         utilities.define_preset('status', [InverterEquipmentRegister.DeviceStatus]))
+        self.assertEqual([{'name': 'status', 'equipment': 'inverter', 'registers': ['DeviceStatus']}], utilities.get_presets())
+
+        with self.assertRaises(werkzeug.exceptions.BadRequest):
+            utilities.define_preset('no/name', [InverterEquipmentRegister.DeviceStatus])
@@ -0,0 +1,179 @@
+import asyncio
+import socket
+import threading
+import time
+import unittest
+
+from flask import Flask, jsonify
+from pymodbus.exceptions import ModbusIOException
+from sun2000_modbus.inverter import Sun2000
+from sun2000_modbus.registers import InverterEquipmentRegister, BatteryEquipmentRegister
+from werkzeug.serving import make_server
+
+from application.modbus import AsyncModbusClient
+from benchmark import percentile, run_benchmark
+from simulator import ModbusSimulator
+
+
+class SimulatorTest(unittest.TestCase):
+
+    def test_registers_are_served_to_sun2000_client(self) -> None:
+        with ModbusSimulator() as simulator:
+            sun2000 = Sun2000(simulator.host, simulator.port, wait=0)
+            self.assertTrue(sun2000.connect())
+
+            self.assertEqual('SUN2000', sun2000.read_raw_value(InverterEquipmentRegister.Model))
+            self.assertEqual('On-grid', sun2000.read_formatted(InverterEquipmentRegister.DeviceStatus))
+            self.assertEqual(548542, sun2000.read_raw_value(BatteryEquipmentRegister.TotalCharge))
+            self.assertEqual(3, simulator.reads)
+            sun2000.disconnect()
+
+    def test_registers_are_served_to_async_client_with_latency(self) -> None:
+        async def read(simulator: ModbusSimulator):
+            client = AsyncModbusClient(simulator.host, simulator.port, wait=0)
+            self.assertTrue(await client.connect())
+            try:
+                started = time.perf_counter()
+                payload = await client.read_holding_registers(30000, 15)
+                return payload, time.perf_counter() - started
+            finally:
+                await client.close()
+
+        with ModbusSimulator(latency=0.05) as simulator:
+            payload, duration = asyncio.run(read(simulator))
+
+        self.assertEqual(b'SUN2000', payload.rstrip(b'\0'))
+        self.assertGreaterEqual(duration, 0.05)
+
+    def test_undefined_addresses_are_rejected_if_strict(self) -> None:
+        async def read(simulator: ModbusSimulator):
+            client = AsyncModbusClient(simulator.host, simulator.port, wait=0)
+            await client.connect()
+            try:
+                return await client.read_holding_registers(100, 2)
+            finally:
+                await client.close()
+
+        with ModbusSimulator() as simulator:
+            self.assertEqual(bytes(4), asyncio.run(read(simulator)))
+
+        with ModbusSimulator(strict=True) as simulator:
+            with self.assertRaises(ModbusIOException):
+                asyncio.run(read(simulator))
+
+    def test_pipelined_requests_are_matched_to_their_responses(self) -> None:
+        async def read(simulator: ModbusSimulator, window: int):
+            client = AsyncModbusClient(simulator.host, simulator.port, wait=0, window=window)
+            await client.connect()
+            try:
+                started = time.perf_counter()
+                payloads = await asyncio.gather(*(client.read_holding_registers(address, quantity) for address, quantity in
+                                                  ((30000, 15), (32080, 2), (32089, 1), (37100, 2))))
+                return payloads, time.perf_counter() - started, client.pipelining
+            finally:
+                await client.close()
+
+        # With jitter the responses arrive out of order
+        with ModbusSimulator(latency=0.1, jitter=0.05) as simulator:
+            payloads, duration, pipelining = asyncio.run(read(simulator, 4))
+
+        self.assertEqual(b'SUN2000', payloads[0].rstrip(b'\0'))
+        self.assertEqual([30, 4, 2, 4], [len(payload) for payload in payloads])
+        self.assertTrue(pipelining)
+        self.assertLess(duration, 0.3)
+
+        # The window bounds the requests outstanding at once
+        with ModbusSimulator(latency=0.1) as simulator:
+            _, duration, _ = asyncio.run(read(simulator, 2))
+
+        self.assertGreaterEqual(duration, 0.2)
+
+    def test_pipelining_falls_back_to_sequential_requests_if_rejected(self) -> None:
+        async def read(simulator: ModbusSimulator):
+            client = AsyncModbusClient(simulator.host, simulator.port, wait=0, window=4, max_rejections=2, probe_interval=0.5)
+            await client.connect()
+
+            async def read_round():
+                payloads = await asyncio.gather(*(client.read_holding_registers(address, quantity) for address, quantity in ((30000, 15), (32080, 2))))
+                return [len(payload) for payload in payloads], simulator.rejected_pipelines, client.pipelining
+
+            try:
+                rounds = [await read_round()]
+                # Pipelined requests being answered reset the rejections
+                simulator.pipelining = True
+                rounds.append(await read_round())
+                simulator.pipelining = False
+                rounds += [await read_round(), await read_round(), await read_round()]
+                # Pipelining is probed again after the probe interval, falling back on the first rejection
+                await asyncio.sleep(0.5)
+                rounds.append(await read_round())
+
+                receiver = client._receiver
+                await client.close()
+                self.assertTrue(receiver.done())
+                return rounds
+            finally:
+                await client.close()
+
+        with ModbusSimulator(latency=0.05, pipelining=False) as simulator:
+            rounds = asyncio.run(read(simulator))
+
+        self.assertEqual([([30, 4], 1, True), ([30, 4], 1, True), ([30, 4], 2, True), ([30, 4], 3, False), ([30, 4], 3, False), ([30, 4], 4, False)], rounds)
+
+    def test_repeated_requests_are_not_pipelined_with_other_requests(self) -> None:
+        async def read(simulator: ModbusSimulator):
+            client = AsyncModbusClient(simulator.host, simulator.port, wait=0, window=4, max_rejections=1)
+            await client.connect()
+
+            async def read_later(address: int, quantity: int) -> bytes:
+                # Sent while the rejected requests are repeated
+                await asyncio.sleep(0.02)
+                return await client.read_holding_registers(address, quantity)
+
+            try:
+                payloads = await asyncio.gather(client.read_holding_registers(30000, 15), client.read_holding_registers(32080, 2), read_later(32089, 1))
+                return [len(payload) for payload in payloads], simulator.rejected_pipelines, client.pipelining
+            finally:
+                await client.close()
+
+        with ModbusSimulator(latency=0.05, pipelining=False) as simulator:
+            result = asyncio.run(read(simulator))
+
+        self.assertEqual(([30, 4, 2], 1, False), result)
+
+    def test_connections_beyond_limit_are_closed(self) -> None:
+        with ModbusSimulator(max_connections=1) as simulator:
+            first = socket.create_connection((simulator.host, simulator.port))
+            second = socket.create_connection((simulator.host, simulator.port))
+            second.settimeout(5)
+
+            self.assertEqual(b'', second.recv(1))
+            self.assertEqual(1, simulator.rejected_connections)
+            first.close()
+            second.close()
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_percentiles_are_nearest_rank(self) -> None:
+        values = [float(value) for value in range(100, 0, -1)]
+
+        self.assertEqual(50, percentile(values, 0.5))
+        self.assertEqual(99, percentile(values, 0.99))
+        self.assertEqual(5, percentile([5], 0.99))
+
+    def test_benchmark_reports_latency_and_throughput(self) -> None:
+        app = Flask(__name__)
+        app.post('/register-values')(lambda: jsonify({}))
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            result = run_benchmark('127.0.0.1', server.server_port, {'equipment': 'inverter', 'registers': ['Model']}, 2, 10, '12345')
+        finally:
+            server.shutdown()
+
+        self.assertEqual(10, result['requests'])
+        self.assertEqual(0, result['errors'])
+        self.assertLessEqual(result['p50'], result['p99'])
+        self.assertGreater(result['throughput'], 0)
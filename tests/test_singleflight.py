@@ -0,0 +1,100 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import sun2000mock
+from flask import Flask
+from sun2000_modbus.registers import InverterEquipmentRegister
+
+from application.singleflight import SingleFlight
+from application.util import Util
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_keys_in_flight_are_joined(self) -> None:
+        flights = SingleFlight()
+
+        led, joined = flights.join(['a', 'b'])
+        self.assertEqual(['a', 'b'], list(led))
+        self.assertEqual({}, joined)
+
+        led, joined = flights.join(['b', 'c'])
+        self.assertEqual(['c'], list(led))
+        self.assertEqual(['b'], list(joined))
+
+        flights.land('b', 'result')
+        self.assertEqual('result', joined['b'].wait())
+
+        # Landed keys are not in flight anymore
+        led, joined = flights.join(['b'])
+        self.assertEqual(['b'], list(led))
+
+    def test_errors_are_raised_to_all_callers(self) -> None:
+        flights = SingleFlight()
+        flights.join(['a'])
+        _, joined = flights.join(['a'])
+
+        flights.land('a', error=ValueError('Inverter is not connected'))
+
+        with self.assertRaises(ValueError):
+            joined['a'].wait()
+
+
+class SharedReadTest(unittest.TestCase):
+
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+    )
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+    )
+    def setUp(self) -> None:
+        app = Flask(__name__)
+        app.config.from_mapping({
+            'INVERTER_HOST': '1.2.3.4',
+            'INVERTER_PORT': 502,
+            'ACCEPTED_API_KEYS': '12345,98765',
+            'LOG_LEVEL': 'DEBUG'
+        })
+        self.utilities = Util(app)
+        self.utilities.warmed_up.wait()
+
+    @patch(
+        'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+    )
+    def test_concurrent_requests_share_one_read_per_block(self) -> None:
+        reading = threading.Event()
+        release = threading.Event()
+
+        def slow_read_range(sun2000, start_address, quantity=0, end_address=0):
+            reading.set()
+            release.wait()
+            return sun2000mock.mock_read_range(sun2000, start_address, quantity, end_address)
+
+        results = []
+
+        def request():
+            results.append(self.utilities.read_registers_data([InverterEquipmentRegister.Model]))
+
+        sun2000mock.ReadRequests.clear()
+        with patch('sun2000_modbus.inverter.Sun2000.read_range', slow_read_range):
+            threads = [threading.Thread(target=request) for _ in range(3)]
+            threads[0].start()
+            reading.wait()
+            for thread in threads[1:]:
+                thread.start()
+            # Give the other requests time to join the in-flight read
+            time.sleep(0.1)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual([(30000, 15)], sun2000mock.ReadRequests)
+        self.assertEqual(3, len(results))
+        for result in results:
+            self.assertEqual('SUN2000', result[0]['value'])
@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from sun2000_modbus.registers import MeterEquipmentRegister
+
+from application.streaming import Subscription, StreamHub
+from application.util import Equipment
+
+
+def register_data(name: str, value: str) -> dict:
+    return {'name': name, 'type': 'number', 'value': value}
+
+
+class SubscriptionTest(unittest.TestCase):
+
+    def test_only_changed_values_are_sent(self) -> None:
+        subscription = Subscription(Equipment.METER, [MeterEquipmentRegister.APhaseVoltage, MeterEquipmentRegister.BPhaseVoltage])
+
+        subscription.publish([register_data('APhaseVoltage', '2351'), register_data('BPhaseVoltage', '2349')])
+        self.assertEqual(('values', {'equipment': 'meter', 'registers': [register_data('APhaseVoltage', '2351'), register_data('BPhaseVoltage', '2349')]}),
+                         subscription.next_event(0))
+
+        subscription.publish([register_data('APhaseVoltage', '2351'), register_data('BPhaseVoltage', '2350')])
+        self.assertEqual(('values', {'equipment': 'meter', 'registers': [register_data('BPhaseVoltage', '2350')]}), subscription.next_event(0))
+
+        subscription.publish([register_data('APhaseVoltage', '2351'), register_data('BPhaseVoltage', '2350')])
+        self.assertIsNone(subscription.next_event(0))
+
+    @patch('time.monotonic', return_value=100.0)
+    def test_all_values_are_sent_after_interval(self, monotonic) -> None:
+        subscription = Subscription(Equipment.METER, [MeterEquipmentRegister.APhaseVoltage, MeterEquipmentRegister.BPhaseVoltage], interval=10)
+
+        subscription.publish([register_data('APhaseVoltage', '2351'), register_data('BPhaseVoltage', '2349')])
+        self.assertEqual(2, len(subscription.next_event(0)[1]['registers']))
+
+        monotonic.return_value = 105.0
+        subscription.publish([register_data('APhaseVoltage', '2351'), register_data('BPhaseVoltage', '2349')])
+        self.assertIsNone(subscription.next_event(0))
+
+        monotonic.return_value = 110.0
+        self.assertEqual(2, len(subscription.next_event(0)[1]['registers']))
+
+    def test_read_errors_are_sent(self) -> None:
+        subscription = Subscription(Equipment.METER, [MeterEquipmentRegister.APhaseVoltage])
+
+        subscription.publish(error='Connection to inverter could not be established')
+
+        self.assertEqual(('error', {'message': 'Connection to inverter could not be established'}), subscription.next_event(0))
+
+
+class StreamHubTest(unittest.TestCase):
+
+    def test_subscriptions_beyond_maximum_are_rejected(self) -> None:
+        utilities = MagicMock()
+        utilities.get_registers_data.side_effect = lambda registers: [register_data(register.name, '2351') for register in registers]
+        hub = StreamHub(utilities, 60, 1)
+
+        first = Subscription(Equipment.METER, [MeterEquipmentRegister.APhaseVoltage])
+        self.assertTrue(hub.subscribe(first))
+        self.assertFalse(hub.subscribe(Subscription(Equipment.METER, [MeterEquipmentRegister.APhaseVoltage])))
+
+        hub.unsubscribe(first)
+        self.assertTrue(hub.subscribe(Subscription(Equipment.METER, [MeterEquipmentRegister.APhaseVoltage])))
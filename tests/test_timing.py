@@ -0,0 +1,87 @@
+import unittest
+
+from application import timing
+from application.timing import RequestTiming, RollingHistogram, TimingStats, Profiler
+
+
+class TimingTest(unittest.TestCase):
+
+    def test_phases_are_not_timed_without_request_timing(self) -> None:
+        with timing.phase('read') as phase:
+            pass
+
+        self.assertIsNone(phase)
+
+    def test_phases_of_current_request_are_timed(self) -> None:
+        request_timing = RequestTiming()
+        token = timing.current_timing.set(request_timing)
+        try:
+            with timing.phase('read'):
+                pass
+            with timing.phase('decode'):
+                pass
+            with timing.phase('read'):
+                pass
+        finally:
+            timing.current_timing.reset(token)
+
+        self.assertEqual(['read', 'decode', 'read'], [name for name, _ in request_timing.observations])
+        self.assertEqual(2, request_timing.totals()['read'][1])
+
+        request_timing = RequestTiming()
+        request_timing.add('read', 0.0123)
+        request_timing.add('read', 0.001)
+        request_timing.add('serialize', 0.0005)
+
+        self.assertEqual('read;dur=13.30;desc="2x", serialize;dur=0.50, total;dur=20.00', request_timing.server_timing(0.02))
+
+    def test_rolling_histogram_forgets_values_outside_window(self) -> None:
+        histogram = RollingHistogram(60, slots=6)
+        histogram.observe(0.003, now=1000)
+        histogram.observe(0.04, now=1030)
+        histogram.observe(20, now=1030)
+
+        snapshot = histogram.snapshot(now=1031)
+
+        self.assertEqual(3, snapshot['count'])
+        self.assertEqual(0.05, snapshot['p50'])
+        self.assertIsNone(snapshot['p99'])
+        self.assertIn((0.05, 2), snapshot['buckets'])
+
+        snapshot = histogram.snapshot(now=1065)
+
+        self.assertEqual(2, snapshot['count'])
+        self.assertEqual(0.05, snapshot['p50'])
+        self.assertNotIn((0.005, 1), snapshot['buckets'])
+
+        histogram.observe(0.0001, now=1100)
+
+        self.assertEqual(1, histogram.snapshot(now=1100)['count'])
+        self.assertIsNone(histogram.snapshot(now=1200)['p50'])
+
+    def test_stats_are_kept_per_path_and_phase(self) -> None:
+        stats = TimingStats(300)
+        request_timing = RequestTiming()
+        request_timing.add('read', 0.02)
+        request_timing.add('read', 0.03)
+
+        stats.record('/register-values', request_timing, 0.06)
+        snapshot = stats.snapshot()
+
+        self.assertEqual(300, snapshot['window'])
+        self.assertEqual(2, snapshot['paths']['/register-values']['read']['count'])
+        self.assertEqual(1, snapshot['paths']['/register-values']['total']['count'])
+
+    def test_sampled_requests_are_profiled(self) -> None:
+        self.assertIsNone(Profiler(0).start())
+
+        profiler = Profiler(1)
+        profile = profiler.start()
+        sorted(range(1000), key=lambda value: -value)
+        profiler.stop(profile)
+
+        report = profiler.report(5)
+
+        self.assertEqual(1, profiler.samples)
+        self.assertTrue(report.startswith('1 requests profiled\n'))
+        self.assertIn('function calls', report)
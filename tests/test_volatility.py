@@ -0,0 +1,78 @@
+import math
+import unittest
+from unittest.mock import patch
+
+import sun2000mock
+from flask import Flask
+from sun2000_modbus.registers import InverterEquipmentRegister, BatteryEquipmentRegister, MeterEquipmentRegister
+
+from application.util import Util
+from application.volatility import Volatility, classify
+
+
+@patch(
+    'sun2000_modbus.inverter.Sun2000.connect', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.isConnected', sun2000mock.connect_success
+)
+@patch(
+    'sun2000_modbus.inverter.Sun2000.read_range', sun2000mock.mock_read_range
+)
+class VolatilityTest(unittest.TestCase):
+
+    def create_utilities(self, **config) -> Util:
+        app = Flask(__name__)
+        app.config.from_mapping({
+            'INVERTER_HOST': '1.2.3.4',
+            'INVERTER_PORT': 502,
+            'ACCEPTED_API_KEYS': '12345,98765',
+            'LOG_LEVEL': 'DEBUG',
+            **config
+        })
+        utilities = Util(app)
+        utilities.warmed_up.wait()
+        return utilities
+
+    def test_registers_are_classified_by_definition(self) -> None:
+        self.assertEqual(Volatility.STATIC, classify(InverterEquipmentRegister.Model))
+        self.assertEqual(Volatility.STATIC, classify(InverterEquipmentRegister.RatedPower))
+        self.assertEqual(Volatility.STATIC, classify(BatteryEquipmentRegister.Unit1SN))
+        self.assertEqual(Volatility.SLOW, classify(BatteryEquipmentRegister.TotalCharge))
+        self.assertEqual(Volatility.SLOW, classify(BatteryEquipmentRegister.WorkingModeSettings))
+        self.assertEqual(Volatility.FAST, classify(InverterEquipmentRegister.ActivePower))
+        self.assertEqual(Volatility.FAST, classify(InverterEquipmentRegister.DeviceStatus))
+        self.assertEqual(Volatility.FAST, classify(MeterEquipmentRegister.CPhaseVoltage))
+
+    def test_static_inverter_registers_are_read_once_at_startup(self) -> None:
+        sun2000mock.ReadRequests.clear()
+        utilities = self.create_utilities()
+
+        self.assertEqual([(30000, 35), (30070, 13)], sun2000mock.ReadRequests)
+
+        sun2000mock.ReadRequests.clear()
+        registers_data = utilities.get_registers_data([InverterEquipmentRegister.Model, InverterEquipmentRegister.DeviceStatus], report_age=True)
+
+        self.assertEqual([(32089, 1)], sun2000mock.ReadRequests)
+        self.assertEqual('SUN2000', registers_data[0]['value'])
+        self.assertLess(registers_data[0]['age'], 1)
+        self.assertEqual(0, registers_data[1]['age'])
+
+    def test_cache_ttls_and_overrides_are_configurable(self) -> None:
+        utilities = self.create_utilities(CACHE_SLOW_TTL=30, CACHE_FAST_TTL=2, CACHE_VOLATILITY=['inverter.Model=fast', 'meter.MeterType=static'])
+
+        self.assertEqual(2, utilities.cache_policy.max_ages[InverterEquipmentRegister.Model])
+        self.assertEqual(math.inf, utilities.cache_policy.max_ages[MeterEquipmentRegister.MeterType])
+        self.assertEqual(30, utilities.cache_policy.max_ages[BatteryEquipmentRegister.TotalCharge])
+
+        utilities.get_registers_data([BatteryEquipmentRegister.TotalCharge, InverterEquipmentRegister.DeviceStatus])
+
+        sun2000mock.ReadRequests.clear()
+        utilities.get_registers_data([BatteryEquipmentRegister.TotalCharge, InverterEquipmentRegister.DeviceStatus])
+        self.assertEqual([], sun2000mock.ReadRequests)
+
+    def test_invalid_volatility_override_exits(self) -> None:
+        with self.assertRaises(SystemExit) as e:
+            self.create_utilities(CACHE_VOLATILITY=['inverter.Model=sometimes'])
+
+        self.assertEqual('Error: Invalid cache volatility inverter.Model=sometimes configured', e.exception.code)